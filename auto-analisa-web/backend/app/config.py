@@ -30,6 +30,21 @@ class Settings(BaseSettings):
     LLM_PRICE_INPUT_USD_PER_MTOK: float = 0.625
     LLM_PRICE_OUTPUT_USD_PER_MTOK: float = 5.0
 
+    # Universe snapshot scheduler (premiumIndex for all USDM symbols + OI history); 0 disables
+    UNIVERSE_SNAPSHOT_INTERVAL_S: int = 60
+
+    # Market metadata index (tick/step/flags for spot + USDT-M); background refresh, 0 disables
+    MARKET_META_REFRESH_S: int = 3600
+
+    # Batch refresh of active analysis cards (one plan per symbol+trade_type); 0 disables
+    ANALYSIS_BATCH_REFRESH_S: int = 900
+    ANALYSIS_BATCH_CONCURRENCY: int = 4
+
+    # BTC dominance source: synthetic | file (BTCD_FILE csv/json) | coingecko (market_cap_snapshots)
+    BTCD_SOURCE: str = "synthetic"
+    BTCD_FILE: str | None = None
+    BTCD_REFRESH_S: int = 900
+
     # CORS
     CORS_ORIGINS: str = "*"  # comma-separated. Use * for local
 
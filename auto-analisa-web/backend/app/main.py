@@ -1,9 +1,11 @@
 from fastapi import FastAPI, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from sqlalchemy.ext.asyncio import AsyncSession
 from contextlib import asynccontextmanager
+import asyncio
 
-from .storage.db import init_db
+from .storage.db import init_db, SessionLocal
 from .storage import repo
 from .services.locks import LockService
 from .config import settings
@@ -21,8 +23,52 @@ except Exception:  # pragma: no cover
 async def lifespan(app: FastAPI):
     # Startup: init DB, redis etc.
     await init_db()
+    tasks = []
+    if settings.UNIVERSE_SNAPSHOT_INTERVAL_S > 0:
+        from .services.context.universe_service import UNIVERSE, active_futures_symbols
+
+        tasks.append(asyncio.create_task(UNIVERSE.run(
+            SessionLocal,
+            interval_s=settings.UNIVERSE_SNAPSHOT_INTERVAL_S,
+            symbols_provider=lambda: active_futures_symbols(SessionLocal),
+        )))
+    if rcli is not None:
+        from .services.budget import SETTINGS_CACHE
+
+        # cross-worker invalidation of the cached Settings row
+        tasks.append(asyncio.create_task(SETTINGS_CACHE.listen(rcli)))
+    if settings.MARKET_META_REFRESH_S > 0:
+        from .services.market_meta import META
+
+        tasks.append(asyncio.create_task(META.run(interval_s=settings.MARKET_META_REFRESH_S)))
+    if settings.ANALYSIS_BATCH_REFRESH_S > 0:
+        from .workers.analyze_worker import run_batch_refresh
+
+        tasks.append(asyncio.create_task(run_batch_refresh(
+            SessionLocal,
+            interval_s=settings.ANALYSIS_BATCH_REFRESH_S,
+            concurrency=settings.ANALYSIS_BATCH_CONCURRENCY,
+        )))
+    from .services.context.btcd_service import provider_from_settings
+    from .services.context.context_rules import BTCD
+
+    provider = provider_from_settings(settings.BTCD_SOURCE, settings.BTCD_FILE, SessionLocal)
+    if provider is not None:
+        BTCD.set_provider(provider)
+        tasks.append(asyncio.create_task(BTCD.run(
+            SessionLocal,
+            interval_s=settings.BTCD_REFRESH_S,
+            record=settings.BTCD_SOURCE.strip().lower() == "coingecko",
+        )))
     yield
-    # Shutdown: nothing for now
+    # Shutdown: stop background schedulers
+    for t in tasks:
+        t.cancel()
+    from .services.http_client import aclose_http
+    from .services.futures_batch import shutdown_pool
+
+    await aclose_http()
+    shutdown_pool()
 
 
 app = FastAPI(title="Auto Analisa Web", lifespan=lifespan)
@@ -40,6 +86,9 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# gzip larger JSON payloads (chart series); SSE is excluded by Starlette, streamed NDJSON
+# sets an identity Content-Encoding to opt out
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 locks = LockService(rcli)
 
 
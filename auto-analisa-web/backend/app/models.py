@@ -1,6 +1,7 @@
 from sqlalchemy.orm import declarative_base, Mapped, mapped_column
 from sqlalchemy import (
     Integer,
+    BigInteger,
     String,
     DateTime,
     Date,
@@ -241,10 +242,24 @@ class LLMUsage(Base):
     input_tokens: Mapped[int] = mapped_column(Integer, default=0)
     output_tokens: Mapped[int] = mapped_column(Integer, default=0)
     cost_usd: Mapped[float] = mapped_column(Float, default=0.0)
+    # completions served from llm_response_cache and what they would have cost
+    cache_hits: Mapped[int] = mapped_column(Integer, default=0)
+    saved_usd: Mapped[float] = mapped_column(Float, default=0.0)
     created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=lambda: dt.datetime.now(dt.timezone.utc))
     updated_at: Mapped[dt.datetime | None] = mapped_column(DateTime, default=None)
 
 
+class LLMResponseCache(Base):
+    """Provider responses keyed by the hash of (endpoint, model, messages, schema, options)."""
+
+    __tablename__ = "llm_response_cache"
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)  # sha256 hex
+    model: Mapped[str] = mapped_column(String(64), default="")
+    response: Mapped[dict] = mapped_column(JSON, default=dict)
+    created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=dt.datetime.utcnow)
+    expires_at: Mapped[dt.datetime] = mapped_column(DateTime, index=True)
+
+
 # Simple in-app notifications (admin-facing)
 class Notification(Base):
     __tablename__ = "notifications"
@@ -285,10 +300,9 @@ class FuturesMeta(Base):
     created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=dt.datetime.utcnow)
 
 
-class FuturesSignalsCache(Base):
-    __tablename__ = "futures_signals_cache"
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    symbol: Mapped[str] = mapped_column(String(32), index=True)
+class FuturesSignalsColumns:
+    """Metric columns shared by the signals history, latest and hourly rollup tables."""
+
     funding_now: Mapped[float | None] = mapped_column(Float, default=None)
     funding_next: Mapped[float | None] = mapped_column(Float, default=None)
     next_funding_time: Mapped[str | None] = mapped_column(String(32), default=None)  # ISO8601
@@ -307,4 +321,85 @@ class FuturesSignalsCache(Base):
     depth10bp_bid: Mapped[float | None] = mapped_column(Float, default=None)
     depth10bp_ask: Mapped[float | None] = mapped_column(Float, default=None)
     ob_imbalance: Mapped[float | None] = mapped_column(Float, default=None)
+
+
+class FuturesSignalsCache(FuturesSignalsColumns, Base):
+    __tablename__ = "futures_signals_cache"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    symbol: Mapped[str] = mapped_column(String(32), index=True)
     created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=dt.datetime.utcnow)
+
+    __table_args__ = (Index("ix_futures_signals_symbol_created", "symbol", "created_at"),)
+
+
+class FuturesSignalsLatest(FuturesSignalsColumns, Base):
+    """Latest signals row per symbol, upserted on every refresh (O(1) reads)."""
+
+    __tablename__ = "futures_signals_latest"
+    symbol: Mapped[str] = mapped_column(String(32), primary_key=True)
+    created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=dt.datetime.utcnow)
+
+
+class FuturesSignalsHourly(FuturesSignalsColumns, Base):
+    """Hourly rollup of ``futures_signals_cache`` (means; last value for funding time).
+
+    ``n`` counts the raw rows folded in; ``counts`` maps each metric to its non-null samples.
+    """
+
+    __tablename__ = "futures_signals_hourly"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    symbol: Mapped[str] = mapped_column(String(32))
+    hour: Mapped[dt.datetime] = mapped_column(DateTime)
+    n: Mapped[int] = mapped_column(Integer, default=0)
+    counts: Mapped[dict] = mapped_column(JSON, default=dict)
+
+    __table_args__ = (UniqueConstraint("symbol", "hour", name="uq_futures_signals_hourly"),)
+
+
+class OpenInterestHistory(Base):
+    """Rolling open-interest samples written by the universe snapshot scheduler."""
+
+    __tablename__ = "open_interest_history"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    symbol: Mapped[str] = mapped_column(String(32))
+    ts: Mapped[dt.datetime] = mapped_column(DateTime)
+    oi: Mapped[float] = mapped_column(Float)
+
+    __table_args__ = (Index("ix_oi_history_symbol_ts", "symbol", "ts"),)
+
+
+class MarketCapSnapshot(Base):
+    """BTC and total crypto market cap samples; BTC dominance = btc_mcap / total_mcap."""
+
+    __tablename__ = "market_cap_snapshots"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    ts: Mapped[dt.datetime] = mapped_column(DateTime, index=True)
+    btc_mcap: Mapped[float] = mapped_column(Float)
+    total_mcap: Mapped[float] = mapped_column(Float)
+
+
+class SessionHourStat(Base):
+    """Daily return aggregates per (symbol, tf, UTC day, WIB hour) for session statistics.
+
+    ``day`` is the UTC epoch day of the candles; ``first_ts`` / ``last_ts`` are the open times
+    (epoch ms) of the first and last closed candles folded into the store; ``sample`` holds
+    the day's returns for that hour (bounded reservoir), used for bootstrap confidence
+    intervals.
+    """
+
+    __tablename__ = "session_hour_stats"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    symbol: Mapped[str] = mapped_column(String(32))
+    tf: Mapped[str] = mapped_column(String(8))
+    day: Mapped[int] = mapped_column(Integer, default=0)
+    hour: Mapped[int] = mapped_column(Integer)
+    n: Mapped[int] = mapped_column(Integer, default=0)
+    sum: Mapped[float] = mapped_column(Float, default=0.0)
+    sumsq: Mapped[float] = mapped_column(Float, default=0.0)
+    pos: Mapped[int] = mapped_column(Integer, default=0)
+    first_ts: Mapped[int] = mapped_column(BigInteger, default=0)
+    last_ts: Mapped[int] = mapped_column(BigInteger, default=0)
+    sample: Mapped[list] = mapped_column(JSON, default=list)
+    updated_at: Mapped[dt.datetime] = mapped_column(DateTime, default=dt.datetime.utcnow)
+
+    __table_args__ = (UniqueConstraint("symbol", "tf", "day", "hour", name="uq_session_hour_stat"),)
@@ -1,5 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+import asyncio
 import os
+import httpx
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 
@@ -8,7 +10,9 @@ from app.config import settings as app_settings
 from app.auth import get_current_user
 from app.models import Settings, ApiUsage, PasswordChangeRequest, User, MacroDaily, Notification
 from app.services.budget import (
+    SETTINGS_CACHE,
     get_or_init_settings,
+    load_settings_row,
     month_key,
     add_usage,
     check_budget_and_maybe_off,
@@ -17,6 +21,8 @@ from app.auth import hash_pw
 from app import services
 from datetime import datetime, timezone
 from app.services.parity import fvg_parity_stats, zones_parity_stats
+from app.services.prompt_compact import PROMPT_STATS
+from app.services.llm_gateway import LLMError
 from app.services import futures as futures_svc
 import pandas as pd
 
@@ -32,7 +38,7 @@ async def require_admin(user=Depends(get_current_user)):
 
 @router.get("/settings")
 async def get_settings(db: AsyncSession = Depends(get_db), user=Depends(require_admin)):
-    s = await get_or_init_settings(db)
+    s = await load_settings_row(db)
     # Provide both legacy and aliased fields for FE compatibility
     llm_model = (os.getenv("OPENAI_MODEL", "gpt-5-chat-latest"))
     return {
@@ -252,9 +258,10 @@ def _apply_settings_payload(s, payload: dict):
 
 @router.post("/settings")
 async def update_settings(payload: dict, db: AsyncSession = Depends(get_db), user=Depends(require_admin)):
-    s = await get_or_init_settings(db)
+    s = await load_settings_row(db)
     _apply_settings_payload(s, payload)
     await db.commit()
+    await SETTINGS_CACHE.invalidate()
     # Return the latest snapshot to help clients reflect instantly
     return {
         "ok": True,
@@ -291,9 +298,10 @@ async def update_settings(payload: dict, db: AsyncSession = Depends(get_db), use
 
 @router.put("/settings")
 async def put_settings(payload: dict, db: AsyncSession = Depends(get_db), user=Depends(require_admin)):
-    s = await get_or_init_settings(db)
+    s = await load_settings_row(db)
     _apply_settings_payload(s, payload)
     await db.commit()
+    await SETTINGS_CACHE.invalidate()
     return {
         "llm_enabled": s.use_llm,
         "llm_model": os.getenv("OPENAI_MODEL", "gpt-5-chat-latest"),
@@ -338,7 +346,9 @@ async def usage(db: AsyncSession = Depends(get_db), user=Depends(require_admin))
     q = await db.execute(select(ApiUsage).where(ApiUsage.month_key == mk))
     rows = q.scalars().all()
     total = sum(r.usd_cost for r in rows)
-    return {"month_key": mk, "count": len(rows), "total_usd": total}
+    # per-endpoint prompt sizes since this process started (estimated before/after compaction,
+    # billed prompt tokens)
+    return {"month_key": mk, "count": len(rows), "total_usd": total, "prompt_tokens": PROMPT_STATS.snapshot()}
 
 
 @router.get("/password_requests")
@@ -384,7 +394,7 @@ async def reject_pwd(rid: int, db: AsyncSession = Depends(get_db), admin=Depends
 
 
 @router.post("/macro/generate")
-async def generate_macro(db: AsyncSession = Depends(get_db), user=Depends(require_admin), slot: str | None = None):
+async def generate_macro(request: Request, db: AsyncSession = Depends(get_db), user=Depends(require_admin), slot: str | None = None):
     # Hormati toggle LLM dan budget; beri pesan ramah jika OFF
     s = await get_or_init_settings(db)
     allowed, reason = await services.llm.should_use_llm(db)
@@ -405,7 +415,8 @@ async def generate_macro(db: AsyncSession = Depends(get_db), user=Depends(requir
     )
 
     try:
-        text, usage = services.llm.ask_llm(prompt)
+        # fixed prompt whose answer depends on today's news: never served from the cache
+        text, usage = await services.llm.ask_llm(prompt, request=request, cache=False)
         # Catat biaya penggunaan ke budget tracking
         await add_usage(
             db,
@@ -418,35 +429,31 @@ async def generate_macro(db: AsyncSession = Depends(get_db), user=Depends(requir
         )
         # Jika melewati limit, auto-off
         await check_budget_and_maybe_off(db)
-    except Exception as e:  # pragma: no cover
-        msg = str(e).lower()
+    except HTTPException:
+        raise
+    except LLMError as e:
+        code = (e.code or e.type or "").lower()
+        msg = e.message.lower()
         # Kunci API tidak valid / unauthorized → berikan pesan yang jelas
-        if "401" in msg or "unauthorized" in msg or "invalid api key" in msg or "authentication" in msg:
+        if e.status_code in (401, 403) or code == "invalid_api_key":
             raise HTTPException(409, detail=(
                 "LLM belum dikonfigurasi dengan benar: OPENAI_API_KEY tidak valid atau tidak berizin."
             ))
         # Model tidak mendukung JSON strict response_format
-        if "response_format" in msg and ("unsupported" in msg or "not supported" in msg):
+        if e.param == "response_format" or (e.status_code == 400 and "response_format" in msg):
             raise HTTPException(409, detail=(
                 "Model LLM tidak mendukung JSON strict. Set OPENAI_JSON_STRICT=0 atau ganti model."
             ))
         # Model tidak ditemukan
-        if "model" in msg and "not found" in msg:
+        if code == "model_not_found" or (e.status_code == 404 and "model" in msg):
             raise HTTPException(409, detail=(
                 "Model LLM tidak ditemukan. Periksa OPENAI_MODEL dan izin akses model."
             ))
-        # Timeout / koneksi
-        if "timeout" in msg or "timed out" in msg:
-            raise HTTPException(504, detail=(
-                "Timeout mengakses LLM. Coba lagi atau naikkan LLM_TIMEOUT_S."
-            ))
-        if "connection" in msg or "dns" in msg or "ssl" in msg:
-            raise HTTPException(502, detail=(
-                "Gagal koneksi ke LLM (jaringan/DNS/SSL). Periksa koneksi server."
-            ))
-        if "insufficient_quota" in msg or " 429" in msg or "rate limit" in msg:
-            s.use_llm = False
+        if e.status_code == 429 or code in ("insufficient_quota", "rate_limit_exceeded"):
+            row = await load_settings_row(db)
+            row.use_llm = False
             await db.commit()
+            await SETTINGS_CACHE.invalidate()
             raise HTTPException(
                 503,
                 detail=(
@@ -454,6 +461,16 @@ async def generate_macro(db: AsyncSession = Depends(get_db), user=Depends(requir
                     "Silakan tambah kredit/limit lalu aktifkan kembali di halaman Admin."
                 ),
             )
+        raise HTTPException(502, detail="Gagal mengakses LLM. Coba lagi nanti.")
+    except (TimeoutError, asyncio.TimeoutError):
+        raise HTTPException(504, detail=(
+            "Timeout mengakses LLM. Coba lagi atau naikkan LLM_TIMEOUT_S."
+        ))
+    except httpx.TransportError:
+        raise HTTPException(502, detail=(
+            "Gagal koneksi ke LLM (jaringan/DNS/SSL). Periksa koneksi server."
+        ))
+    except Exception:  # pragma: no cover
         # Error lain: tampilkan pesan generik agar tidak bocor detail
         raise HTTPException(502, detail="Gagal mengakses LLM. Coba lagi nanti.")
     today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
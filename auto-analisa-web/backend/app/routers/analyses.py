@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, desc, func
 from app.deps import get_db
@@ -7,17 +7,26 @@ from app.models import Analysis, Plan, LLMVerification, Settings
 from app.services.budget import get_or_init_settings, add_usage, check_budget_and_maybe_off
 from app.services.planner import build_spot2_from_plan
 from app.services.llm import should_use_llm, ask_llm
-from app.services.usage import get_today_usage, inc_usage
+from app.services.usage import get_today_usage, inc_usage, record_llm_usage
 from app.workers.analyze_worker import refresh_analysis_rules_only
 from app.services.market import fetch_bundle
 from app.main import locks
 from app.services.validator import normalize_and_validate, validate_spot2
-from app.services.rounding import round_spot2_prices
+from app.services.rounding import precision_for, round_spot2_prices
+from app.services.prompt_compact import PROMPT_STATS, compact_json
+from app.services.sse import sse_response
+from typing import Any, Callable, Dict, Optional, Tuple
 import os, json, time
 from app.config import settings
 
 router = APIRouter(prefix="/api/analyses", tags=["analyses"])
 
+# SPOT-II+ fields the tuner/verifier schema works with; the rest of spot2 stays out of prompts
+SPOT2_PROMPT_KEYS = (
+    "symbol", "trade_type", "regime", "mode", "bias", "sr", "entries", "invalid", "invalids", "tp",
+    "trailing", "time_exit", "buyback", "macro_gate", "metrics", "notes", "warnings", "rencana_jual_beli",
+)
+
 
 def _norm_trade_type(value: str | None) -> str:
     try:
@@ -194,25 +203,37 @@ async def refresh_rules(aid: int, db: AsyncSession = Depends(get_db), user=Depen
 
 
 @router.post("/{aid}/verify")
-async def verify_llm(aid: int, db: AsyncSession = Depends(get_db), user=Depends(require_user)):
+async def verify_llm(
+    aid: int,
+    request: Request,
+    stream: int = Query(0, ge=0, le=1),
+    db: AsyncSession = Depends(get_db),
+    user=Depends(require_user),
+):
+    if stream:
+        return await sse_response(
+            lambda db, on_delta: perform_verify_llm(db, aid, user, request=request, on_delta=on_delta)
+        )
+    out, _usage = await perform_verify_llm(db, aid, user, request=request)
+    return out
+
+
+async def perform_verify_llm(
+    db: AsyncSession,
+    aid: int,
+    user: Any,
+    request: Request | None = None,
+    on_delta: Optional[Callable[..., None]] = None,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Tuner + verifier pass over an analysis; returns (response body, usage).
+    ``on_delta(text, stage=...)`` receives both completions as they are generated."""
     a = await db.get(Analysis, aid)
     if not a:
         raise HTTPException(404, "Not found")
     if a.user_id != user.id and getattr(user, "role", "user") != "admin":
         raise HTTPException(403, "Forbidden")
-    # rate-limit per user and analysis
-    if not await locks.acquire(f"rate:verify:{user.id}", ttl=10):
-        raise HTTPException(429, detail={
-            "error_code": "rate_limited",
-            "message": "Terlalu sering, coba lagi sebentar.",
-            "retry_hint": "Coba lagi setelah ±10 detik."
-        })
-    if not await locks.acquire(f"rate:verify:{user.id}:{aid}", ttl=15):
-        raise HTTPException(429, detail={
-            "error_code": "rate_limited",
-            "message": "Terlalu sering untuk analisa ini, coba lagi sebentar.",
-            "retry_hint": "Coba lagi setelah ±15 detik."
-        })
+    # no per-user 429 here: a double click or a second tab sends the same prompts, which the
+    # LLM gateway attaches to the completion already in flight instead of paying twice
 
     # check LLM toggle and budget
     allowed, reason = await should_use_llm(db)
@@ -268,6 +289,7 @@ async def verify_llm(aid: int, db: AsyncSession = Depends(get_db), user=Depends(
             kind="spot",
         )
         await db.commit()
+        cached_usage = {"prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0, "cache_hit": True}
         return {
             "verification": {
                 "id": last.id,
@@ -285,7 +307,7 @@ async def verify_llm(aid: int, db: AsyncSession = Depends(get_db), user=Depends(
                 "created_at": last.created_at,
                 "cached": True,
             }
-        }
+        }, cached_usage
 
     # prepare snapshot for LLM
     p = a.payload_json or {}
@@ -316,6 +338,9 @@ async def verify_llm(aid: int, db: AsyncSession = Depends(get_db), user=Depends(
         except Exception:
             spot2_base = {}
 
+    # prompt payloads are rounded to the symbol tick and cut to what the SPOT-II+ schema uses
+    tick = (precision_for(a.symbol) or {}).get("tickSize")
+
     # Instruct LLM Tuner (fase 1) untuk menghasilkan SPOT-II+ terbaru
     constraints = {
         "rr_min_required": 1.6,
@@ -335,15 +360,24 @@ async def verify_llm(aid: int, db: AsyncSession = Depends(get_db), user=Depends(
         "time_exit{enabled,ttl_min,reason}, buyback[{name,range,note}], macro_gate{avoid_red,prefer_wib,avoid_wib,session_refs,sop_partial_on_red}, "
         "metrics{rr_min,tick_ok,macro_score,macro_score_threshold}, notes[], warnings[]. Pastikan qty_pct total 100 dan TP naik.\n"
         f"GUARDRAILS: {json.dumps(constraints, ensure_ascii=False)}\n"
-        f"SPOT2_INPUT: {json.dumps(spot2_base, ensure_ascii=False)}\n"
-        f"SNAPSHOT_MTF: {json.dumps(snap, ensure_ascii=False)}"
+        f"SPOT2_INPUT: {compact_json('analyses.verify', spot2_base, tick=tick, keep=SPOT2_PROMPT_KEYS)}\n"
+        f"SNAPSHOT_MTF: {compact_json('analyses.verify', snap, tick=tick, trim=('mtf_summary',))}"
     )
     s = await get_or_init_settings(db)
 
-    usage_total = {"prompt_tokens": 0, "completion_tokens": 0}
+    usage_total = {"prompt_tokens": 0, "completion_tokens": 0, "saved_prompt_tokens": 0, "saved_completion_tokens": 0, "cache_hits": 0}
+
+    def _add_usage(u):
+        for k in ("prompt_tokens", "completion_tokens", "saved_prompt_tokens", "saved_completion_tokens"):
+            usage_total[k] += int((u or {}).get(k, 0) or 0)
+        usage_total["cache_hits"] += 1 if (u or {}).get("cache_hit") else 0
 
     try:
-        tuner_text, usage_tuner = ask_llm(tuner_prompt)
+        tuner_text, usage_tuner = await ask_llm(
+            tuner_prompt, request=request, on_delta=(lambda t: on_delta(t, stage="tuner")) if on_delta else None
+        )
+    except HTTPException:
+        raise
     except Exception as e:  # pragma: no cover
         raise HTTPException(502, detail={
             "error_code": "server_error",
@@ -363,8 +397,8 @@ async def verify_llm(aid: int, db: AsyncSession = Depends(get_db), user=Depends(
                 return parsed.get("spot2")
         return None
 
-    usage_total["prompt_tokens"] += int((usage_tuner or {}).get("prompt_tokens", 0))
-    usage_total["completion_tokens"] += int((usage_tuner or {}).get("completion_tokens", 0))
+    _add_usage(usage_tuner)
+    PROMPT_STATS.record_usage("analyses.verify", usage_tuner)
 
     spot2_tuned = _parse_spot2_payload(tuner_text) or None
     tuner_ok = bool(spot2_tuned and isinstance(spot2_tuned.get("entries"), list) and spot2_tuned.get("entries") and isinstance(spot2_tuned.get("tp"), list) and spot2_tuned.get("tp"))
@@ -376,16 +410,20 @@ async def verify_llm(aid: int, db: AsyncSession = Depends(get_db), user=Depends(
         "Anda adalah LLM Verifikator. Nilai apakah rencana SPOT-II+ berikut sudah sesuai guardrails. "
         "Balas JSON {verdict:""confirm|tweak|reject"", reasons:[...], fix?:SPOT2_OBJECT}. Jika perlu perbaikan minor, isi fix dengan objek SPOT-II+.\n"
         f"GUARDRAILS: {json.dumps(constraints, ensure_ascii=False)}\n"
-        f"PLAN_TUNED: {json.dumps(spot2_tuned or spot2_base, ensure_ascii=False)}"
+        f"PLAN_TUNED: {compact_json('analyses.verify', spot2_tuned or spot2_base, tick=tick, keep=SPOT2_PROMPT_KEYS)}"
     )
 
     try:
-        verifier_text, usage_ver = ask_llm(verifier_prompt)
+        verifier_text, usage_ver = await ask_llm(
+            verifier_prompt, request=request, on_delta=(lambda t: on_delta(t, stage="verifier")) if on_delta else None
+        )
+    except HTTPException:
+        raise
     except Exception:
         verifier_text, usage_ver = (json.dumps({"verdict": "confirm", "reasons": []}), {"prompt_tokens": 0, "completion_tokens": 0})
 
-    usage_total["prompt_tokens"] += int((usage_ver or {}).get("prompt_tokens", 0))
-    usage_total["completion_tokens"] += int((usage_ver or {}).get("completion_tokens", 0))
+    _add_usage(usage_ver)
+    PROMPT_STATS.record_usage("analyses.verify", usage_ver)
 
     verdict_payload = {}
     try:
@@ -507,19 +545,7 @@ async def verify_llm(aid: int, db: AsyncSession = Depends(get_db), user=Depends(
 
     # Also update daily aggregated usage with per-MTOK pricing
     try:
-        in_price = float(getattr(settings, "LLM_PRICE_INPUT_USD_PER_MTOK", 0.625))
-        out_price = float(getattr(settings, "LLM_PRICE_OUTPUT_USD_PER_MTOK", 5.0))
-        usd_daily = (prompt_toks / 1_000_000.0) * in_price + (completion_toks / 1_000_000.0) * out_price
-        await inc_usage(
-            db,
-            user_id=user.id,
-            model=model,
-            input_tokens=prompt_toks,
-            output_tokens=completion_toks,
-            cost_usd=usd_daily,
-            add_call=True,
-            kind="spot",
-        )
+        await record_llm_usage(db, user_id=user.id, model=model, usage=usage, kind="spot")
         await db.commit()
     except Exception:
         # best-effort; do not block main flow
@@ -537,7 +563,7 @@ async def verify_llm(aid: int, db: AsyncSession = Depends(get_db), user=Depends(
         suggestions=suggestions,
         fundamentals=fundamentals,
         spot2_json=spot2 if 'spot2' in locals() else {},
-        cached=False,
+        cached=bool(usage_total["cache_hits"]) and not (prompt_toks or completion_toks),
     )
     db.add(vr)
     await db.commit()
@@ -573,7 +599,7 @@ async def verify_llm(aid: int, db: AsyncSession = Depends(get_db), user=Depends(
             "created_at": vr.created_at,
             "cached": False,
         }
-    }
+    }, {**usage_total, "cost_usd": float(usd or 0.0)}
 
 
 @router.post("/{aid}/apply-llm")
@@ -1,9 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.deps import get_db
 from app.auth import require_user
-from app.models import Analysis, FuturesSignalsCache, Settings
+from app.models import Analysis
 from app.services.market import fetch_bundle
 from app.services.rules import Features, score_symbol
 from app.services.planner import build_plan_async, build_spot2_from_plan
@@ -11,8 +11,8 @@ from app.services.futures import latest_signals, fetch_leverage_bracket
 from app.services.sessions import btc_wib_buckets
 from app.services.validator_futures import validate_futures
 from app.services.rounding import round_futures_prices
-from app.services.llm import should_use_llm, ask_llm
-from app.services.usage import get_today_usage, inc_usage
+from app.services.llm import should_use_llm
+from app.services.usage import get_today_usage, record_llm_usage
 from app.services.budget import get_or_init_settings, add_usage, check_budget_and_maybe_off
 from sqlalchemy import select, desc
 import os, json, time
@@ -29,13 +29,6 @@ def _f(x):
         return None
 
 
-def _norm_symbol(sym: str) -> str:
-    s = sym.upper().replace(":USDT", "/USDT")
-    if "/" not in s and s.endswith("USDT"):
-        s = f"{s[:-4]}/USDT"
-    return s
-
-
 async def _ensure_llm_verif_cols(db: AsyncSession) -> None:
     """Ensure llm_verifications has the columns used by futures verify. Safe to run often."""
     try:
@@ -67,11 +60,8 @@ async def _ensure_llm_verif_cols(db: AsyncSession) -> None:
 @router.get("/{symbol}/futures")
 async def get_futures_plan(symbol: str, db: AsyncSession = Depends(get_db), user=Depends(require_user)):
     # Feature-flag
-    s = await db.get(Settings, 1)
-    # if no row id=1, fallback to reading via helper (avoiding import cycle)
-    if not s:
-        from app.services.budget import get_or_init_settings
-        s = await get_or_init_settings(db)
+    from app.services.budget import get_or_init_settings  # cached snapshot (avoiding import cycle)
+    s = await get_or_init_settings(db)
     if not getattr(s, "enable_futures", False):
         raise HTTPException(404, "Futures dinonaktifkan oleh admin")
 
@@ -108,8 +98,8 @@ async def get_futures_plan(symbol: str, db: AsyncSession = Depends(get_db), user
     lev = max(lev_min, min(lev_max, 5))
 
     # Signals cache (best-effort, empty in this skeleton)
-    q = await db.execute(select(FuturesSignalsCache).where(FuturesSignalsCache.symbol == symbol.upper()).order_by(FuturesSignalsCache.created_at.desc()))
-    sig = q.scalars().first()
+    from app.services.futures import get_latest_signals_row
+    sig = await get_latest_signals_row(db, symbol)
     # Auto-refresh sinyal bila kosong atau stale (>15 menit)
     try:
         from datetime import datetime, timezone, timedelta
@@ -253,7 +243,7 @@ async def get_futures_plan(symbol: str, db: AsyncSession = Depends(get_db), user
 
 
 @router.post("/{aid}/futures/verify")
-async def verify_futures_llm(aid: int, db: AsyncSession = Depends(get_db), user=Depends(require_user)):
+async def verify_futures_llm(aid: int, request: Request, db: AsyncSession = Depends(get_db), user=Depends(require_user)):
     a = await db.get(Analysis, aid)
     if not a:
         raise HTTPException(404, "Not found")
@@ -315,23 +305,15 @@ async def verify_futures_llm(aid: int, db: AsyncSession = Depends(get_db), user=
         except Exception:
             tp_scalp_nums = []
     plan_mesin = {"entries": entries_nums, "tp": (tp_scalp_nums or tp_nums), "invalids": invalids, "risk": {"risk_per_trade_pct": float(getattr(s, "futures_risk_per_trade_pct", 0.5) or 0.5), "rr_min": 1.2}}
-    # precision from ccxt (best-effort)
+    # precision from the market-metadata index (best-effort)
     tick = None
     step = None
     quote_precision = None
     try:
-        import ccxt
-        ex = ccxt.binanceusdm()
-        ex.load_markets(reload=False)
-        m = ex.market(_norm_symbol(symbol))
-        price_prec = m.get("precision", {}).get("price")
-        tick = float(10 ** (-price_prec)) if isinstance(price_prec, int) and price_prec > 0 else (float((m.get("limits", {}).get("price") or {}).get("min") or 0) or None)
-        step = float((m.get("limits", {}).get("amount") or {}).get("min") or 0) or None
-        quote_precision = m.get("info", {}).get("quotePrecision")
-        try:
-            quote_precision = int(quote_precision) if quote_precision is not None else None
-        except Exception:
-            quote_precision = None
+        from app.services.market_meta import META
+        m = META.get(symbol, "futures")
+        if m is not None:
+            tick, step, quote_precision = m.tick_size, m.step_size, m.quote_precision
     except Exception:
         tick = None; step = None; quote_precision = None
     from app.routers.llm import VerifyBody, perform_verify
@@ -365,14 +347,11 @@ async def verify_futures_llm(aid: int, db: AsyncSession = Depends(get_db), user=
     )
     # Ensure DB columns exist (handles case when service not restarted after update)
     await _ensure_llm_verif_cols(db)
-    out = await perform_verify(db, user.id, vb)
+    out = await perform_verify(db, user.id, vb, request=request, endpoint="futures.verify")
     usage = out.get("_usage") or {}
     model = os.getenv("OPENAI_MODEL", "gpt-5-chat-latest")
     try:
-        in_price = float(os.getenv("LLM_PRICE_INPUT_USD_PER_MTOK", 0.625))
-        out_price = float(os.getenv("LLM_PRICE_OUTPUT_USD_PER_MTOK", 5.0))
-        usd_daily = (int(usage.get("prompt_tokens") or 0)/1_000_000.0)*in_price + (int(usage.get("completion_tokens") or 0)/1_000_000.0)*out_price
-        await inc_usage(db, user_id=user.id, model=model, input_tokens=int(usage.get("prompt_tokens") or 0), output_tokens=int(usage.get("completion_tokens") or 0), cost_usd=usd_daily, add_call=True, kind="futures")
+        await record_llm_usage(db, user_id=user.id, model=model, usage=usage, kind="futures")
         await db.commit()
     except Exception:
         pass
@@ -396,7 +375,7 @@ async def verify_futures_llm(aid: int, db: AsyncSession = Depends(get_db), user=
         trade_type="futures",
         macro_snapshot=macro_snap,
         ui_contract={"tp_ladder_pct": (out.get("hasil_json") or {}).get("tp_ladder_pct") or [40,60]},
-        cached=False,
+        cached=bool(usage.get("cache_hit")),
     )
     db.add(vr)
     await db.commit()
@@ -411,7 +390,7 @@ async def verify_futures_llm(aid: int, db: AsyncSession = Depends(get_db), user=
             "macro_snapshot": out.get("_macro_snapshot") or {},
             "ui_contract": {"tp_ladder_pct": (out.get("hasil_json") or {}).get("tp_ladder_pct") or [40,60]},
             "created_at": vr.created_at,
-            "cached": False,
+            "cached": vr.cached,
         }
     }
 
@@ -1,63 +1,45 @@
 
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.deps import get_db
 from app.services.market import fetch_bundle
-from app.services.rules import Features
-from app.services.futures import latest_signals
-from app.services.strategy_futures import build_plan_futures
+from app.services.futures import latest_signals, latest_signals_many
+from app.services.futures_batch import iter_batch_plans, run_symbol_plans
 from app.services.llm import should_use_llm
 from app.services.usage import inc_usage, get_today_usage
 from app.services.budget import get_or_init_settings, add_usage, check_budget_and_maybe_off
 from app.auth import require_user
+from app.storage.db import SessionLocal
+import json
 import os
 
 router = APIRouter(prefix="/futures", tags=["futures"])
 
-async def _build_futures(symbol: str, db: AsyncSession, user, use_llm: bool = False):
-    bundle = await fetch_bundle(symbol, tfs=("4h","1h","15m","5m","1m"), market="futures")
-    feat = Features(bundle); feat.enrich()
-    sig = await latest_signals(db, symbol)
-    allow_llm = False
-    deny_reason = None
-    if use_llm:
-        try:
-            allow_llm, deny_reason = await should_use_llm(db)
-        except Exception:
-            allow_llm, deny_reason = False, "LLM unavailable"
-        # Per-user daily limit check for futures kind
-        if allow_llm:
-            try:
-                sset = await get_or_init_settings(db)
-                limit = int(getattr(sset, "llm_daily_limit_futures", 40) or 40)
-                today = await get_today_usage(db, user_id=user.id, kind="futures", limit_override=limit)
-                if int(today.get("remaining") or 0) <= 0:
-                    allow_llm, deny_reason = False, "Limit harian LLM (futures) tercapai"
-            except Exception:
-                # if usage service fails, do not block, just proceed without LLM
-                allow_llm, deny_reason = False, "Daily limit check gagal"
-    plan = build_plan_futures(
-        bundle, feat,
-        side_hint="AUTO",
-        fut_signals=sig,
-        symbol=symbol,
-        use_llm_fixes=bool(use_llm and allow_llm),
-        profile="scalp",
-    )
+async def _llm_gate(db: AsyncSession, user, use_llm: bool) -> tuple[bool, str | None]:
+    """Whether the LLM fix-pass may run for this user (global switch/budget + daily limit)."""
+    if not use_llm:
+        return False, None
     try:
-        swing_variant = build_plan_futures(
-            bundle,
-            feat,
-            side_hint="AUTO",
-            fut_signals=sig,
-            symbol=symbol,
-            use_llm_fixes=False,
-            profile="swing",
-        )
-        if isinstance(plan, dict):
-            plan.setdefault("variants", {})["swing"] = {k: v for k, v in swing_variant.items() if k != "_usage"}
+        allow_llm, deny_reason = await should_use_llm(db)
     except Exception:
-        pass
+        allow_llm, deny_reason = False, "LLM unavailable"
+    # Per-user daily limit check for futures kind
+    if allow_llm:
+        try:
+            sset = await get_or_init_settings(db)
+            limit = int(getattr(sset, "llm_daily_limit_futures", 40) or 40)
+            today = await get_today_usage(db, user_id=user.id, kind="futures", limit_override=limit)
+            if int(today.get("remaining") or 0) <= 0:
+                allow_llm, deny_reason = False, "Limit harian LLM (futures) tercapai"
+        except Exception:
+            # if usage service fails, do not block, just proceed without LLM
+            allow_llm, deny_reason = False, "Daily limit check gagal"
+    return allow_llm, deny_reason
+
+
+async def _finalize(db: AsyncSession, user, symbol: str, plan, sig, use_llm: bool, allow_llm: bool, deny_reason: str | None) -> dict:
     # If LLM used, record token usage (both monthly budget and daily aggregator), then strip _usage from response
     usage = dict(plan.get("_usage") or {}) if isinstance(plan, dict) else {}
     if use_llm and allow_llm and usage:
@@ -126,6 +108,15 @@ async def _build_futures(symbol: str, db: AsyncSession, user, use_llm: bool = Fa
     }
 
 
+async def _build_futures(symbol: str, db: AsyncSession, user, use_llm: bool = False):
+    bundle = await fetch_bundle(symbol, tfs=("4h","1h","15m","5m","1m"), market="futures")
+    sig = await latest_signals(db, symbol)
+    allow_llm, deny_reason = await _llm_gate(db, user, use_llm)
+    # off the event loop, like the batch: the LLM fix-pass hook blocks on its own loop
+    plan = await run_symbol_plans(symbol, bundle, sig, use_llm_fixes=bool(use_llm and allow_llm))
+    return await _finalize(db, user, symbol, plan, sig, use_llm, allow_llm, deny_reason)
+
+
 @router.get("/plan/{symbol}")
 async def build_plan(symbol: str, db: AsyncSession = Depends(get_db), use_llm: bool = Query(False, description="Gunakan LLM fix-pass JSON strict"), user=Depends(require_user)):
     return await _build_futures(symbol, db, user, use_llm=use_llm)
@@ -142,15 +133,47 @@ async def analyze(body: dict, db: AsyncSession = Depends(get_db), user=Depends(r
 
 @router.post("/analyze-batch")
 async def analyze_batch(body: dict, db: AsyncSession = Depends(get_db), user=Depends(require_user)):
-    symbols = [str(s).upper() for s in (body.get("symbols") or []) if s]
+    """Plans for many symbols.
+
+    Signals come from one query, settings/LLM gating is evaluated once, bundles are fetched
+    concurrently and plans are built on the process pool. With ``"stream": true`` results
+    are sent as NDJSON lines in completion order, followed by ``{"done": true, ...}``;
+    otherwise one JSON document in input order.
+    """
+    symbols = list(dict.fromkeys(str(s).upper() for s in (body.get("symbols") or []) if s))
     if not symbols:
         raise HTTPException(422, "symbols[] wajib diisi")
     use_llm = bool(body.get("use_llm") or False)
-    results = []
-    for sym in symbols:
-        try:
-            res = await _build_futures(sym, db, user, use_llm=use_llm)
-        except Exception as e:
-            res = {"ok": False, "symbol": sym, "error": str(e)}
-        results.append(res)
-    return {"ok": True, "count": len(results), "results": results}
+    sigs = await latest_signals_many(db, symbols)
+    allow_llm, deny_reason = await _llm_gate(db, user, use_llm)
+    fix = bool(use_llm and allow_llm)
+
+    async def _results(sdb: AsyncSession):
+        async for sym, plan, err in iter_batch_plans(symbols, sigs, use_llm_fixes=fix):
+            if err is not None:
+                yield {"ok": False, "symbol": sym, "error": str(err)}
+                continue
+            try:
+                yield await _finalize(sdb, user, sym, plan, sigs.get(sym), use_llm, allow_llm, deny_reason)
+            except Exception as e:
+                yield {"ok": False, "symbol": sym, "error": str(e)}
+
+    if body.get("stream"):
+        async def _ndjson():
+            n = 0
+            # own session: the request-scoped one is closed before the body is streamed
+            async with SessionLocal() as sdb:
+                async for res in _results(sdb):
+                    n += 1
+                    yield json.dumps(jsonable_encoder(res), ensure_ascii=False) + "\n"
+            yield json.dumps({"done": True, "count": n}) + "\n"
+
+        # explicit identity encoding: GZipMiddleware only exempts text/event-stream and would
+        # otherwise hold every line in its compressor until the batch finishes
+        return StreamingResponse(
+            _ndjson(), media_type="application/x-ndjson", headers={"Content-Encoding": "identity"}
+        )
+
+    results = {r["symbol"]: r async for r in _results(db)}
+    ordered = [results[s] for s in symbols if s in results]
+    return {"ok": True, "count": len(ordered), "results": ordered}
@@ -1,5 +1,5 @@
 from __future__ import annotations
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from pydantic import BaseModel, Field
 from typing import Any, Dict, Optional, Literal
 from sqlalchemy import select
@@ -11,8 +11,11 @@ from app.auth import require_user
 from app.services.gpt_service import build_prompt, call_gpt
 from app.services.preprompt import evaluate_pre_signal
 from app.services.llm import should_use_llm
-from app.services.usage import get_today_usage, inc_usage
+from app.services.usage import get_today_usage, record_llm_usage
 from app.services.budget import get_or_init_settings
+from app.services.sse import sse_response
+from app.services.prompt_compact import PROMPT_STATS, UNUSED_PROMPT_KEYS, compact_payload
+from app.services.rounding import precision_for
 from app.models import GPTReport
 import os
 
@@ -30,6 +33,11 @@ def _get_mode_ttl(mode: Literal["scalping","swing"]) -> int:
     return int(os.getenv("GPT_TTL_SCALPING_SECONDS", 7200) or 7200)
 
 
+# optional payload sections, dropped in this order when the prompt exceeds the token budget
+# (candle lists are then halved, oldest bars first)
+GPT_PROMPT_TRIM = ("payload.futures.variants", "payload.futures.mtf_summary", "payload.futures.macro")
+
+
 class AnalyzeBody(BaseModel):
     symbol: str
     mode: Literal['scalping', 'swing'] = Field('scalping')
@@ -86,7 +94,13 @@ async def get_latest_report(
 
 
 @router.post("/analyze")
-async def gpt_analyze(body: AnalyzeBody, db: AsyncSession = Depends(get_db), user=Depends(require_user)):
+async def gpt_analyze(
+    body: AnalyzeBody,
+    request: Request,
+    stream: int = Query(0, ge=0, le=1),
+    db: AsyncSession = Depends(get_db),
+    user=Depends(require_user),
+):
     sym = body.symbol.upper()
     allowed, reason = await should_use_llm(db)
     if not allowed:
@@ -99,95 +113,106 @@ async def gpt_analyze(body: AnalyzeBody, db: AsyncSession = Depends(get_db), use
     if today["remaining"] <= 0:
         raise HTTPException(409, detail={"error_code": "quota_exceeded", "message": "Limit harian LLM (futures) tercapai"})
 
-    # Compose payload with opts for the template + pre-decision
-    template_payload = {"payload": body.payload, "opts": (body.opts or {})}
-    pre = None
-    if os.getenv("PREPROMPT_ENABLE", "1") not in ("0", "false", "False"):
+    user_id = user.id
+
+    async def run(db: AsyncSession, on_delta=None):
+        # Compose payload with opts for the template + pre-decision
+        template_payload = {"payload": body.payload, "opts": (body.opts or {})}
+        pre = None
+        if os.getenv("PREPROMPT_ENABLE", "1") not in ("0", "false", "False"):
+            try:
+                pre = evaluate_pre_signal({"payload": body.payload})
+                template_payload["pre"] = pre
+            except Exception:
+                pre = None
+
+        # Optional short-circuit when pre says NO-TRADE
+        strict = os.getenv("PREPROMPT_STRICT_NO_TRADE", "0") in ("1", "true", "True")
+        if strict and pre and pre.get("decision") == "NO-TRADE":
+            data = {
+                "text": {
+                    f"section_{body.mode}": {
+                        "posisi": "NO-TRADE",
+                        "tp": [],
+                        "sl": None,
+                        "strategi_singkat": [
+                            "Tidak ada setup valid berdasarkan pra-skor (anti-bias)",
+                            "Tunggu sweep & reclaim atau break & hold yang jelas",
+                        ],
+                        "fundamental": [],
+                        "bybk": [],
+                        "bo": [],
+                    }
+                },
+                "overlay": {"tf": "15m", "lines": [], "zones": [], "markers": [], "mode": body.mode},
+                "meta": {"engine": os.getenv("OPENAI_MODEL", "gpt-5-chat-latest"), "pre": pre},
+            }
+            usage = {"prompt_tokens": 0, "completion_tokens": 0}
+        else:
+            tick = (body.opts or {}).get("tick_size") or (precision_for(sym) or {}).get("tickSize")
+            template_payload = compact_payload(
+                "gpt.analyze", template_payload, tick=tick, drop=UNUSED_PROMPT_KEYS, trim=GPT_PROMPT_TRIM
+            )
+            prompt = build_prompt(sym, body.mode, template_payload)
+            data, usage = await call_gpt(prompt, request=request, on_delta=on_delta)
+            PROMPT_STATS.record_usage("gpt.analyze", usage)
+        if not isinstance(data, dict) or not data:
+            raise HTTPException(502, detail={"error_code": "bad_llm_output", "message": "Jawaban GPT tidak valid (bukan JSON)"})
+
+        # Count usage best-effort
+        cost = 0.0
+        try:
+            model = os.getenv("OPENAI_MODEL", "gpt-5-chat-latest")
+            cost = await record_llm_usage(db, user_id=user_id, model=model, usage=usage, kind="futures")
+            await db.commit()
+        except Exception:  # pragma: no cover
+            pass
+
+        # Attach meta
         try:
-            pre = evaluate_pre_signal({"payload": body.payload})
-            template_payload["pre"] = pre
+            meta = data.setdefault("meta", {}) if isinstance(data, dict) else {}
+            meta.setdefault("engine", os.getenv("OPENAI_MODEL", "gpt-5-chat-latest"))
+            if pre:
+                meta["pre"] = pre
         except Exception:
-            pre = None
-
-    # Optional short-circuit when pre says NO-TRADE
-    strict = os.getenv("PREPROMPT_STRICT_NO_TRADE", "0") in ("1", "true", "True")
-    if strict and pre and pre.get("decision") == "NO-TRADE":
-        data = {
-            "text": {
-                f"section_{body.mode}": {
-                    "posisi": "NO-TRADE",
-                    "tp": [],
-                    "sl": None,
-                    "strategi_singkat": [
-                        "Tidak ada setup valid berdasarkan pra-skor (anti-bias)",
-                        "Tunggu sweep & reclaim atau break & hold yang jelas",
-                    ],
-                    "fundamental": [],
-                    "bybk": [],
-                    "bo": [],
-                }
-            },
-            "overlay": {"tf": "15m", "lines": [], "zones": [], "markers": [], "mode": body.mode},
-            "meta": {"engine": os.getenv("OPENAI_MODEL", "gpt-5-chat-latest"), "pre": pre},
-        }
-        usage = {"prompt_tokens": 0, "completion_tokens": 0}
-    else:
-        prompt = build_prompt(sym, body.mode, template_payload)
-        data, usage = call_gpt(prompt)
-    if not isinstance(data, dict) or not data:
-        raise HTTPException(502, detail={"error_code": "bad_llm_output", "message": "Jawaban GPT tidak valid (bukan JSON)"})
-
-    # Count usage best-effort
-    try:
-        model = os.getenv("OPENAI_MODEL", "gpt-5-chat-latest")
-        in_price = float(os.getenv("LLM_PRICE_INPUT_USD_PER_MTOK", 0.625))
-        out_price = float(os.getenv("LLM_PRICE_OUTPUT_USD_PER_MTOK", 5.0))
-        usd_daily = (int(usage.get("prompt_tokens") or 0)/1_000_000.0)*in_price + (int(usage.get("completion_tokens") or 0)/1_000_000.0)*out_price
-        await inc_usage(db, user_id=user.id, model=model, input_tokens=int(usage.get("prompt_tokens") or 0), output_tokens=int(usage.get("completion_tokens") or 0), cost_usd=usd_daily, add_call=True, kind="futures")
-        await db.commit()
-    except Exception:  # pragma: no cover
-        pass
-
-    # Attach meta
-    try:
-        meta = data.setdefault("meta", {}) if isinstance(data, dict) else {}
-        meta.setdefault("engine", os.getenv("OPENAI_MODEL", "gpt-5-chat-latest"))
-        if pre:
-            meta["pre"] = pre
-    except Exception:
-        meta = {}
-
-    # Persist ke tabel cache
-    try:
-        overlay = data.get("overlay") if isinstance(data, dict) else {}
-        text = data.get("text") if isinstance(data, dict) else {}
-    except Exception:
-        overlay = {}
-        text = {}
-    report = GPTReport(
-         symbol=sym,
-         mode=body.mode,
-         text=text or {},
-         overlay=overlay or {},
-         meta=meta or {},
-        ttl=_get_mode_ttl(body.mode),
-    )
-    db.add(report)
-    await db.flush()
-    try:
-        await db.commit()
-        await db.refresh(report)
-    except Exception:
-        await db.rollback()
-        raise
-    created = report.created_at or _utcnow()
-    if created.tzinfo is None:
-        created = created.replace(tzinfo=dt.timezone.utc)
-    data["report_id"] = report.id
-    meta_out = data.setdefault("meta", {})
-    meta_out.setdefault("engine", os.getenv("OPENAI_MODEL", "gpt-5-chat-latest"))
-    meta_out["cached_at"] = created.isoformat()
-    meta_out["ttl_seconds"] = int(report.ttl or _get_mode_ttl(body.mode))
-    data["created_at"] = created.isoformat()
-    data["ttl"] = report.ttl or _get_mode_ttl(body.mode)
+            meta = {}
+
+        # Persist ke tabel cache
+        try:
+            overlay = data.get("overlay") if isinstance(data, dict) else {}
+            text = data.get("text") if isinstance(data, dict) else {}
+        except Exception:
+            overlay = {}
+            text = {}
+        report = GPTReport(
+             symbol=sym,
+             mode=body.mode,
+             text=text or {},
+             overlay=overlay or {},
+             meta=meta or {},
+            ttl=_get_mode_ttl(body.mode),
+        )
+        db.add(report)
+        await db.flush()
+        try:
+            await db.commit()
+            await db.refresh(report)
+        except Exception:
+            await db.rollback()
+            raise
+        created = report.created_at or _utcnow()
+        if created.tzinfo is None:
+            created = created.replace(tzinfo=dt.timezone.utc)
+        data["report_id"] = report.id
+        meta_out = data.setdefault("meta", {})
+        meta_out.setdefault("engine", os.getenv("OPENAI_MODEL", "gpt-5-chat-latest"))
+        meta_out["cached_at"] = created.isoformat()
+        meta_out["ttl_seconds"] = int(report.ttl or _get_mode_ttl(body.mode))
+        data["created_at"] = created.isoformat()
+        data["ttl"] = report.ttl or _get_mode_ttl(body.mode)
+        return data, {**usage, "cost_usd": cost}
+
+    if stream:
+        return await sse_response(run)
+    data, _usage = await run(db)
     return data
@@ -1,14 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, Field
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 
 from app.deps import get_db
 from app.auth import require_user
 from app.services.llm import should_use_llm, ask_llm_messages
 from app.services.usage import get_today_usage
 from app.services.budget import get_or_init_settings
-from app.services.usage import inc_usage
+from app.services.usage import record_llm_usage
+from app.services.sse import sse_response
+from app.services.prompt_compact import PROMPT_STATS, UNUSED_PROMPT_KEYS, compact_json
 from app.models import LLMVerification
 from app.services.advisor_futures import auto_suggest_futures
 from datetime import datetime, timezone
@@ -55,6 +57,10 @@ def _wib_window(now: Optional[datetime] = None) -> str:
     return "NETRAL"
 
 
+# optional prompt sections, dropped in this order when the payload exceeds the token budget
+VERIFY_PROMPT_TRIM = ("macro_context.futures_signals", "macro_context.mtf_summary")
+
+
 class VerifyBody(BaseModel):
     symbol: str
     trade_type: str = Field("futures")
@@ -66,7 +72,14 @@ class VerifyBody(BaseModel):
     ui_contract: Optional[Dict[str, Any]] = None
 
 
-async def perform_verify(db: AsyncSession, user_id: str, body: VerifyBody) -> Dict[str, Any]:
+async def perform_verify(
+    db: AsyncSession,
+    user_id: str,
+    body: VerifyBody,
+    request: Request | None = None,
+    on_delta: Optional[Callable[[str], Any]] = None,
+    endpoint: str = "llm.verify",
+) -> Dict[str, Any]:
     # Pre-check LLM availability and quota for futures
     allowed, reason = await should_use_llm(db)
     if not allowed:
@@ -166,11 +179,14 @@ async def perform_verify(db: AsyncSession, user_id: str, body: VerifyBody) -> Di
         "Jangan menambah level baru; pastikan TP ascending dan RR>=rr_min."
     )
     try:
-        text, usage = ask_llm_messages([
+        text, usage = await ask_llm_messages([
             {"role": "system", "content": sys},
-            {"role": "user", "content": json.dumps(user, ensure_ascii=False)},
+            {"role": "user", "content": compact_json(endpoint, user, tick=tick, drop=UNUSED_PROMPT_KEYS, trim=VERIFY_PROMPT_TRIM)},
             {"role": "assistant", "content": asst},
-        ])
+        ], request=request, on_delta=on_delta)
+        PROMPT_STATS.record_usage(endpoint, usage)
+    except HTTPException:
+        raise
     except Exception as e:
         # Gracefully convert provider errors into a 502 for the client
         raise HTTPException(502, detail={
@@ -328,39 +344,54 @@ async def quota(db: AsyncSession = Depends(get_db), user=Depends(require_user)):
 
 
 @router.post("/verify")
-async def verify(body: VerifyBody, db: AsyncSession = Depends(get_db), user=Depends(require_user)):
-    # Perform verification and handle usage bookkeeping
-    out = await perform_verify(db, user.id, body)
-    usage = out.get("_usage") or {}
-    model = os.getenv("OPENAI_MODEL", "gpt-5-chat-latest")
-    try:
-        in_price = float(os.getenv("LLM_PRICE_INPUT_USD_PER_MTOK", 0.625))
-        out_price = float(os.getenv("LLM_PRICE_OUTPUT_USD_PER_MTOK", 5.0))
-        usd_daily = (int(usage.get("prompt_tokens") or 0)/1_000_000.0)*in_price + (int(usage.get("completion_tokens") or 0)/1_000_000.0)*out_price
-        await inc_usage(db, user_id=user.id, model=model, input_tokens=int(usage.get("prompt_tokens") or 0), output_tokens=int(usage.get("completion_tokens") or 0), cost_usd=usd_daily, add_call=True, kind="futures")
-        await db.commit()
-    except Exception:
-        pass
-    # Persist lightweight verification row for audit (analysis_id nullable)
-    try:
-        vr = LLMVerification(
-            analysis_id=None,  # standalone verify
-            user_id=user.id,
-            model=model,
-            prompt_tokens=int(usage.get("prompt_tokens") or 0),
-            completion_tokens=int(usage.get("completion_tokens") or 0),
-            cost_usd=0.0,
-            verdict=(out.get("hasil_json") or {}).get("verdict") or "valid",
-            summary=out.get("ringkas_naratif") or "",
-            futures_json=out.get("hasil_json") or {},
-            trade_type=body.trade_type or "futures",
-            macro_snapshot=out.get("_macro_snapshot") or {},
-            ui_contract=body.ui_contract or {},
-            cached=False,
+async def verify(
+    body: VerifyBody,
+    request: Request,
+    stream: int = Query(0, ge=0, le=1),
+    db: AsyncSession = Depends(get_db),
+    user=Depends(require_user),
+):
+    user_id = user.id
+
+    async def run(db: AsyncSession, on_delta=None):
+        # Perform verification and handle usage bookkeeping
+        out = await perform_verify(db, user_id, body, request=request, on_delta=on_delta)
+        usage = out.get("_usage") or {}
+        model = os.getenv("OPENAI_MODEL", "gpt-5-chat-latest")
+        cost = 0.0
+        try:
+            cost = await record_llm_usage(db, user_id=user_id, model=model, usage=usage, kind="futures")
+            await db.commit()
+        except Exception:
+            pass
+        # Persist lightweight verification row for audit (analysis_id nullable)
+        try:
+            vr = LLMVerification(
+                analysis_id=None,  # standalone verify
+                user_id=user_id,
+                model=model,
+                prompt_tokens=int(usage.get("prompt_tokens") or 0),
+                completion_tokens=int(usage.get("completion_tokens") or 0),
+                cost_usd=0.0,
+                verdict=(out.get("hasil_json") or {}).get("verdict") or "valid",
+                summary=out.get("ringkas_naratif") or "",
+                futures_json=out.get("hasil_json") or {},
+                trade_type=body.trade_type or "futures",
+                macro_snapshot=out.get("_macro_snapshot") or {},
+                ui_contract=body.ui_contract or {},
+                cached=bool(usage.get("cache_hit")),
+            )
+            db.add(vr)
+            await db.commit()
+        except Exception:
+            pass
+        # Return contract
+        return (
+            {"ringkas_naratif": out.get("ringkas_naratif"), "hasil_json": out.get("hasil_json")},
+            {**usage, "cost_usd": cost},
         )
-        db.add(vr)
-        await db.commit()
-    except Exception:
-        pass
-    # Return contract
-    return {"ringkas_naratif": out.get("ringkas_naratif"), "hasil_json": out.get("hasil_json")}
+
+    if stream:
+        return await sse_response(run)
+    out, _usage = await run(db)
+    return out
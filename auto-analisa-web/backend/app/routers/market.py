@@ -1,15 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query
 from app.deps import get_db
 from app.auth import require_user
 from app.main import locks
 from app.services.market import fetch_klines
+from app.services.columnar import series_response
 from app.services.symbols_binance import get_symbols
 
 router = APIRouter(prefix="/api", tags=["market"])
 
 
 @router.get("/ohlcv")
-async def ohlcv(symbol: str, tf: str = "15m", limit: int = 200, market: str = "spot", user=Depends(require_user), db=Depends(get_db)):
+async def ohlcv(
+    symbol: str,
+    tf: str = "15m",
+    limit: int = 200,
+    market: str = "spot",
+    shape: Literal["rows", "columns", "f64"] = Query("rows"),
+    user=Depends(require_user),
+    db=Depends(get_db),
+):
     # rate limit sederhana: 3 detik per user+symbol+tf
     key = f"rate:ohlcv:{user.id}:{symbol}:{tf}:{market}"
     ok = await locks.acquire(key, ttl=3)
@@ -22,18 +33,15 @@ async def ohlcv(symbol: str, tf: str = "15m", limit: int = 200, market: str = "s
             df = await fetch_klines(symbol, tf, limit)
     except Exception as e:  # pragma: no cover
         raise HTTPException(400, f"Failed to fetch OHLCV: {e}")
-    out = [
-        {
-            "t": int(row.ts),
-            "o": float(row.open),
-            "h": float(row.high),
-            "l": float(row.low),
-            "c": float(row.close),
-            "v": float(row.volume),
-        }
-        for _, row in df.iterrows()
-    ]
-    return out
+    arrays = {
+        "t": df["ts"].to_numpy(),
+        "o": df["open"].to_numpy(),
+        "h": df["high"].to_numpy(),
+        "l": df["low"].to_numpy(),
+        "c": df["close"].to_numpy(),
+        "v": df["volume"].to_numpy(),
+    }
+    return series_response(arrays, shape, int_keys=("t",))
 
 
 @router.get("/symbols/{kind}")
@@ -42,7 +50,7 @@ async def symbols(kind: str):
     if kind_norm not in {"spot", "futures"}:
         raise HTTPException(400, "kind harus spot atau futures")
     try:
-        symbols = get_symbols(kind_norm)
+        symbols = await asyncio.to_thread(get_symbols, kind_norm)
     except Exception as e:
         raise HTTPException(500, f"Gagal memuat simbol: {e}")
     return {"ok": True, "kind": kind_norm, "symbols": symbols}
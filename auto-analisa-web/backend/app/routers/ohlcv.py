@@ -1,15 +1,25 @@
 from __future__ import annotations
 
 from fastapi import APIRouter, Query
+from fastapi.responses import Response
 from typing import Literal, Dict, Any
 import time
 
+from ..services.columnar import (
+    F64_MEDIA_TYPE,
+    dumps,
+    encode_f64,
+    epoch_ms,
+    finite_list,
+    int_list,
+    rows_from_columns,
+)
 from ..services.supertrend import compute_supertrend
 from ..services.signal_mtf import load_signal_config, _st_cfg_from_preset, _tf_normalize, _load_tf
 
 router = APIRouter(prefix="/api", tags=["ohlcv"])  # include in main.py
 
-_CACHE: Dict[tuple, tuple[float, Dict[str, Any]]] = {}
+_CACHE: Dict[tuple, tuple[float, bytes, str]] = {}
 
 
 @router.get("/spark")
@@ -19,9 +29,12 @@ async def spark(
     mode: Literal["fast", "medium", "swing"] = Query("fast"),
     kind: Literal["close", "st_line"] = Query("close"),
     limit: int = Query(200, ge=20, le=2000),
+    shape: Literal["rows", "columns", "f64"] = Query("rows"),
 ):
     """Return sparkline-friendly series with OHLCV + Supertrend components.
-    Data indexed by ts ascending order.
+    Data indexed by ts ascending order. ``shape=columns`` returns
+    ``{ts:[epoch_ms], close:[], st_line:[], ...}`` instead of a list of dicts;
+    ``shape=f64`` returns the same columns as raw float64 blocks.
     """
     cfg = load_signal_config()
     tf_norm = _tf_normalize(tf)
@@ -29,38 +42,45 @@ async def spark(
     # (kept simple: we don't know which panel calls this; UI passes correct tf_map)
 
     # cache key
-    key = (symbol.upper(), tf_norm, mode, kind, int(limit))
+    key = (symbol.upper(), tf_norm, mode, kind, int(limit), shape)
     now = time.time()
     ttl = 60.0 if mode == "swing" else 30.0
     if key in _CACHE:
-        ts, payload = _CACHE[key]
+        ts, body, media_type = _CACHE[key]
         if now - ts <= ttl:
-            return payload
+            return Response(body, media_type=media_type)
 
     df = await _load_tf(symbol, tf_norm, market_type="futures", limit=limit)
     stp = _st_cfg_from_preset(cfg, mode, tf_norm)
     st = compute_supertrend(df, period=stp['period'], multiplier=stp['multiplier'], src=stp['src'], change_atr=stp['change_atr'])
-    import math
-    def clean(x: Any) -> Any:
-        try:
-            fx = float(x)
-            if not math.isfinite(fx):
-                return None
-            return fx
-        except Exception:
-            return None
-    data = []
-    for i, (ts, row) in enumerate(df.iterrows()):
-        item = {
-            "ts": ts.isoformat(),
-            "close": clean(row.get("close")),
-            "st_line": clean(st.supertrend.iloc[i]),
-            "st_up": clean(st.up.iloc[i]),
-            "st_dn": clean(st.dn.iloc[i]),
-            "trend": int(st.trend.iloc[i]) if isinstance(st.trend.iloc[i], (int, float)) else 0,
-            "signal": int(st.signal.iloc[i]) if isinstance(st.signal.iloc[i], (int, float)) else 0,
-        }
-        data.append(item)
-    out = {"symbol": symbol.upper(), "tf": tf_norm, "mode": mode, "kind": kind, "data": data}
-    _CACHE[key] = (now, out)
-    return out
+    if shape == "f64":
+        body = encode_f64({
+            "ts": epoch_ms(df.index),
+            "close": df["close"].to_numpy(),
+            "st_line": st.supertrend.to_numpy(),
+            "st_up": st.up.to_numpy(),
+            "st_dn": st.dn.to_numpy(),
+            "trend": st.trend.to_numpy(),
+            "signal": st.signal.to_numpy(),
+        })
+        _CACHE[key] = (now, body, F64_MEDIA_TYPE)
+        return Response(body, media_type=F64_MEDIA_TYPE)
+    cols = {
+        "ts": epoch_ms(df.index),
+        "close": finite_list(df["close"].to_numpy()),
+        "st_line": finite_list(st.supertrend.to_numpy()),
+        "st_up": finite_list(st.up.to_numpy()),
+        "st_dn": finite_list(st.dn.to_numpy()),
+        "trend": int_list(st.trend.to_numpy()),
+        "signal": int_list(st.signal.to_numpy()),
+    }
+    if shape == "columns":
+        data: Any = cols
+    else:
+        # legacy row shape keeps ISO timestamps for older clients
+        cols["ts"] = df.index.strftime("%Y-%m-%dT%H:%M:%S+00:00").tolist()
+        data = rows_from_columns(cols)
+    out = {"symbol": symbol.upper(), "tf": tf_norm, "mode": mode, "kind": kind, "shape": shape, "data": data}
+    body = dumps(out)
+    _CACHE[key] = (now, body, "application/json")
+    return Response(body, media_type="application/json")
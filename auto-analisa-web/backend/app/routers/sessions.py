@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.deps import get_db
-from app.services.sessions import btc_wib_buckets
+from app.services.sessions import btc_wib_buckets, session_buckets
 
 
 router = APIRouter(prefix="/api/sessions", tags=["sessions"])
@@ -9,7 +9,11 @@ router = APIRouter(prefix="/api/sessions", tags=["sessions"])
 
 @router.get("/btc/wib")
 async def btc_wib(tf: str = "1h", days: int = 120, db: AsyncSession = Depends(get_db)):
-    # db kept for possible caching later
+    # aggregates are persisted by the session-stats store (session_hour_stats)
     buckets = await btc_wib_buckets(days=days, timeframe=tf)
     return buckets
 
+
+@router.get("/{symbol}/wib")
+async def symbol_wib(symbol: str, tf: str = "1h", days: int = 120):
+    return await session_buckets(symbol, days=days, timeframe=tf)
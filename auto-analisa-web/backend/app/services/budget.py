@@ -1,17 +1,91 @@
+import asyncio
 import os
+import time
 from datetime import datetime, timezone
+from types import SimpleNamespace
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, inspect as sa_inspect
 
 from app.models import Settings, ApiUsage
 
 
+SETTINGS_CHANNEL = "autoanalisa:settings"
+
+
+class SettingsCache:
+    """In-process read-through cache of the singleton Settings row.
+
+    Readers get a detached snapshot (attribute access like the ORM row). Writers load the
+    live row with :func:`load_settings_row`, commit, then call :meth:`invalidate`, which
+    also publishes on Redis so other workers drop their copy (see :meth:`listen`). Without
+    Redis, other workers pick the change up after ``ttl`` seconds.
+    """
+
+    def __init__(self, ttl_s: float | None = None):
+        self.ttl = float(ttl_s if ttl_s is not None else os.getenv("SETTINGS_CACHE_TTL_S", "30"))
+        self.value: SimpleNamespace | None = None
+        self.expires = 0.0
+        # bumped on every invalidation; a load that raced an invalidation is not stored
+        self.version = 0
+        self.redis = None
+
+    def get(self) -> SimpleNamespace | None:
+        return self.value if self.value is not None and time.time() < self.expires else None
+
+    def put(self, row: Settings, version: int) -> SimpleNamespace:
+        snap = SimpleNamespace(**{a.key: getattr(row, a.key) for a in sa_inspect(Settings).column_attrs})
+        if version == self.version:
+            self.value, self.expires = snap, time.time() + self.ttl
+        return snap
+
+    def invalidate_local(self) -> None:
+        self.version += 1
+        self.value = None
+
+    async def invalidate(self, publish: bool = True) -> None:
+        self.invalidate_local()
+        if publish and self.redis is not None:
+            try:
+                await asyncio.wait_for(self.redis.publish(SETTINGS_CHANNEL, "changed"), timeout=1.0)
+            except Exception:
+                pass
+
+    async def listen(self, redis) -> None:
+        """Background subscriber: drop the local copy when another worker changes settings."""
+        self.redis = redis
+        while True:
+            try:
+                ps = redis.pubsub()
+                await ps.subscribe(SETTINGS_CHANNEL)
+                async for msg in ps.listen():
+                    if msg.get("type") == "message":
+                        self.invalidate_local()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                await asyncio.sleep(5.0)
+
+
+SETTINGS_CACHE = SettingsCache()
+
+
 def month_key(dt: datetime | None = None) -> str:
     dt = dt or datetime.now(timezone.utc)
     return f"{dt.year:04d}-{dt.month:02d}"
 
 
-async def get_or_init_settings(db: AsyncSession) -> Settings:
+async def get_or_init_settings(db: AsyncSession) -> SimpleNamespace:
+    """Read-only snapshot of the Settings row, served from SETTINGS_CACHE.
+    Use :func:`load_settings_row` when the row is going to be modified.
+    """
+    snap = SETTINGS_CACHE.get()
+    if snap is not None:
+        return snap
+    version = SETTINGS_CACHE.version
+    return SETTINGS_CACHE.put(await load_settings_row(db), version)
+
+
+async def load_settings_row(db: AsyncSession) -> Settings:
     """Fetch the singleton Settings row deterministically, creating one if missing.
     If multiple rows exist (from older bugs), always use the lowest id for stability.
     """
@@ -76,10 +150,11 @@ async def add_usage(
     from sqlalchemy import select, func
     q = await db.execute(select(func.sum(ApiUsage.usd_cost)).where(ApiUsage.month_key == mk))
     month_total = float(q.scalar() or 0.0)
-    s = await get_or_init_settings(db)
+    s = await load_settings_row(db)
     s.budget_used_usd = month_total
     await db.commit()
-    return usd, s.budget_used_usd
+    await SETTINGS_CACHE.invalidate(publish=False)
+    return usd, month_total
 
 
 async def check_budget_and_maybe_off(db: AsyncSession) -> bool:
@@ -87,15 +162,19 @@ async def check_budget_and_maybe_off(db: AsyncSession) -> bool:
     Ensures check uses current-month spend, not cumulative.
     """
     from sqlalchemy import select, func
-    s = await get_or_init_settings(db)
+    snap = await get_or_init_settings(db)
     mk = month_key()
     q = await db.execute(select(func.sum(ApiUsage.usd_cost)).where(ApiUsage.month_key == mk))
     month_total = float(q.scalar() or 0.0)
-    # keep settings in sync for UI
-    s.budget_used_usd = month_total
-    if s.auto_off_at_budget and month_total >= s.budget_monthly_usd:
-        s.use_llm = False
+    over = bool(snap.auto_off_at_budget and month_total >= snap.budget_monthly_usd)
+    turn_off = over and bool(snap.use_llm)
+    # only touch the row when something changed (keeps the common path read-only)
+    if turn_off or abs(float(snap.budget_used_usd or 0.0) - month_total) > 1e-9:
+        s = await load_settings_row(db)
+        # keep settings in sync for UI
+        s.budget_used_usd = month_total
+        if over:
+            s.use_llm = False
         await db.commit()
-        return True
-    await db.commit()
-    return False
+        await SETTINGS_CACHE.invalidate(publish=turn_off)
+    return over
@@ -1,7 +1,30 @@
 from __future__ import annotations
 
+import asyncio
 import time
-from typing import Any, Dict, Tuple
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Tuple
+
+
+_TF_SECONDS = {
+    "1m": 60,
+    "5m": 300,
+    "15m": 900,
+    "30m": 1800,
+    "1h": 3600,
+    "4h": 14400,
+    "1d": 86400,
+}
+
+
+def tf_seconds(tf: str, default: int = 3600) -> int:
+    return _TF_SECONDS.get(str(tf).strip().lower(), default)
+
+
+def seconds_to_next_bar(tf: str, now: float | None = None, min_ttl: float = 5.0) -> float:
+    """Seconds until the current candle of ``tf`` closes (UTC-aligned bars)."""
+    step = tf_seconds(tf)
+    t = time.time() if now is None else float(now)
+    return max(float(min_ttl), step - (t % step))
 
 
 class MarketCache:
@@ -18,6 +41,72 @@ class MarketCache:
         self._m[key] = (time.time(), value)
 
 
+class AsyncMemo:
+    """Read-through TTL cache for coroutine results.
+
+    Concurrent callers for the same key share one in-flight computation, so a
+    cold cache is filled once rather than once per caller. The computation runs
+    in its own task: a cancelled caller only stops waiting, and the task is
+    cancelled once no caller is left. Failures are not cached.
+    """
+
+    def __init__(self):
+        self._m: Dict[Hashable, Tuple[float, Any]] = {}
+        # (loop, key) -> [task, waiters]
+        self._inflight: Dict[Tuple[asyncio.AbstractEventLoop, Hashable], List[Any]] = {}
+
+    def peek(self, key: Hashable) -> Any | None:
+        exp, val = self._m.get(key, (0.0, None))
+        return val if time.time() < exp else None
+
+    def set(self, key: Hashable, value: Any, ttl: float) -> None:
+        self._m[key] = (time.time() + float(ttl), value)
+
+    def invalidate(self, key: Hashable | None = None) -> None:
+        if key is None:
+            self._m.clear()
+        else:
+            self._m.pop(key, None)
+
+    def prune(self) -> int:
+        """Drop expired entries (for memos whose keys roll over, e.g. per candle)."""
+        now = time.time()
+        dead = [k for k, (exp, _) in self._m.items() if exp <= now]
+        for k in dead:
+            self._m.pop(k, None)
+        return len(dead)
+
+    async def get_or_compute(self, key: Hashable, ttl: float | Callable[[], float], factory: Callable[[], Awaitable[Any]]) -> Any:
+        exp, val = self._m.get(key, (0.0, None))
+        if val is not None and time.time() < exp:
+            return val
+
+        async def run() -> Any:
+            out = await factory()
+            self.set(key, out, ttl() if callable(ttl) else ttl)
+            return out
+
+        def done(task: asyncio.Future, ent: List[Any]) -> None:
+            if self._inflight.get(slot) is ent:
+                self._inflight.pop(slot, None)
+            if not task.cancelled():
+                task.exception()  # mark retrieved when nobody else is waiting
+
+        slot = (asyncio.get_running_loop(), key)
+        ent = self._inflight.get(slot)
+        if ent is None:
+            ent = [asyncio.ensure_future(run()), 0]
+            self._inflight[slot] = ent
+            ent[0].add_done_callback(lambda t, e=ent: done(t, e))
+        ent[1] += 1
+        try:
+            return await asyncio.shield(ent[0])
+        finally:
+            ent[1] -= 1
+            if ent[1] == 0 and not ent[0].done():
+                ent[0].cancel()
+
+
 class SnapshotStore:
     def __init__(self):
         self._s: Dict[str, Dict[str, Any]] = {}
@@ -27,4 +116,3 @@ class SnapshotStore:
 
     def get(self, sid: str) -> Dict[str, Any] | None:
         return self._s.get(sid)
-
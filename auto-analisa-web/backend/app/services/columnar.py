@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import json
+import struct
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+from fastapi.responses import JSONResponse, Response
+
+# Columnar helpers for chart endpoints: NaN/inf masking on whole arrays instead of per-row clean().
+
+try:  # orjson is optional; fall back to stdlib json when missing
+    import orjson as _orjson
+except Exception:  # pragma: no cover
+    _orjson = None
+
+
+def finite_list(values: Any) -> List[float | None]:
+    """Convert an array-like to a list of floats with NaN/inf replaced by None."""
+    arr = np.asarray(values, dtype="float64")
+    mask = np.isfinite(arr)
+    if mask.all():
+        return arr.tolist()
+    out = arr.astype(object)
+    out[~mask] = None
+    return out.tolist()
+
+
+def int_list(values: Any) -> List[int]:
+    """Convert an array-like to a list of ints (NaN -> 0)."""
+    arr = np.asarray(values, dtype="float64")
+    return np.nan_to_num(arr, nan=0.0, posinf=0.0, neginf=0.0).astype("int64").tolist()
+
+
+def epoch_ms(index_or_values: Any) -> List[int]:
+    """Epoch milliseconds from a DatetimeIndex/Series or raw ms numbers."""
+    if isinstance(index_or_values, (pd.DatetimeIndex, pd.Series)) and pd.api.types.is_datetime64_any_dtype(index_or_values):
+        dt = pd.DatetimeIndex(index_or_values)
+        if dt.tz is not None:
+            dt = dt.tz_convert("UTC").tz_localize(None)
+        return (dt.asi8 // 1_000_000).tolist()
+    return int_list(index_or_values)
+
+
+def rows_from_columns(cols: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """Zip a columnar dict back into the legacy list-of-dicts shape."""
+    keys = list(cols.keys())
+    return [dict(zip(keys, vals)) for vals in zip(*(cols[k] for k in keys))]
+
+
+def dumps(payload: Any) -> bytes:
+    if _orjson is not None:
+        return _orjson.dumps(payload)
+    return json.dumps(payload, separators=(",", ":"), allow_nan=False).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse using orjson when installed, compact stdlib json otherwise."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+# --- Response shapes (``shape`` query of /api/ohlcv and /api/spark) ----------
+# rows    : legacy list of dicts (default)
+# columns : {"key": [...]} columnar JSON
+# f64     : little-endian float64 column blocks (see encode_f64)
+
+F64_MEDIA_TYPE = "application/vnd.autoanalisa.f64"
+F64_MAGIC = b"AAF1"
+
+
+def encode_f64(arrays: Dict[str, Any]) -> bytes:
+    """Encode equal-length columns as raw little-endian float64 blocks.
+
+    Layout: ``AAF1`` | uint32 n_rows | uint16 n_cols | uint16 names_len |
+    comma-joined utf-8 names | zero padding to 8-byte alignment | n_cols * n_rows float64.
+    NaN is kept as NaN so the client can map it to gaps directly.
+    """
+    names = list(arrays.keys())
+    cols = [np.asarray(arrays[k], dtype="<f8") for k in names]
+    n = int(cols[0].size) if cols else 0
+    if any(c.size != n for c in cols):
+        raise ValueError("all columns must have the same length")
+    name_bytes = ",".join(names).encode("utf-8")
+    head = F64_MAGIC + struct.pack("<IHH", n, len(names), len(name_bytes)) + name_bytes
+    head += b"\x00" * (-len(head) % 8)
+    return head + b"".join(c.tobytes() for c in cols)
+
+
+def decode_f64(buf: bytes) -> Dict[str, np.ndarray]:
+    """Inverse of :func:`encode_f64` (used by tests and scripts)."""
+    if buf[:4] != F64_MAGIC:
+        raise ValueError("bad magic")
+    n, k, nl = struct.unpack_from("<IHH", buf, 4)
+    names = buf[12:12 + nl].decode("utf-8").split(",") if k else []
+    off = 12 + nl
+    off += -off % 8
+    data = np.frombuffer(buf, dtype="<f8", offset=off, count=n * k).reshape(k, n) if k else np.empty((0, 0))
+    return {name: data[i] for i, name in enumerate(names)}
+
+
+def series_response(arrays: Dict[str, Any], shape: str, int_keys: Iterable[str] = ()) -> Response:
+    """Serialize equal-length numeric columns in the requested ``shape``."""
+    if shape == "f64":
+        return Response(encode_f64(arrays), media_type=F64_MEDIA_TYPE)
+    ints = set(int_keys)
+    cols = {k: (int_list(v) if k in ints else finite_list(v)) for k, v in arrays.items()}
+    if shape == "columns":
+        return FastJSONResponse(cols)
+    return FastJSONResponse(rows_from_columns(cols))
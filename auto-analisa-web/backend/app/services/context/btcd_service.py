@@ -1,19 +1,161 @@
 from __future__ import annotations
 
+import asyncio
+import csv
+import datetime as dt
+import json
 import os
-from typing import List
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional, Protocol, Tuple
+
 import numpy as np
 
+from ..cache import seconds_to_next_bar, tf_seconds
+
+Point = Tuple[float, float]  # (epoch seconds, dominance %)
+
+
+class BTCDProvider(Protocol):
+    async def load(self, since: float | None = None) -> List[Point]:
+        ...
+
+
+class FileBTCDProvider:
+    """Dominance points from a local CSV (``ts,btcd``) or JSON list of ``{ts, btcd}``.
+
+    ``ts`` may be epoch seconds, epoch milliseconds or ISO8601. Used for fixtures and offline runs.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+
+    @staticmethod
+    def _ts(v: Any) -> float:
+        try:
+            f = float(v)
+            return f / 1000.0 if f > 1e11 else f
+        except (TypeError, ValueError):
+            d = dt.datetime.fromisoformat(str(v).replace("Z", "+00:00"))
+            if d.tzinfo is None:
+                d = d.replace(tzinfo=dt.timezone.utc)
+            return d.timestamp()
+
+    async def load(self, since: float | None = None) -> List[Point]:
+        text = await asyncio.to_thread(self.path.read_text, encoding="utf-8")
+        if self.path.suffix.lower() == ".json":
+            rows = [(r.get("ts"), r.get("btcd", r.get("value"))) for r in json.loads(text)]
+        else:
+            rows = [(r.get("ts"), r.get("btcd", r.get("value"))) for r in csv.DictReader(text.splitlines())]
+        pts = sorted((self._ts(t), float(v)) for t, v in rows if t is not None and v not in (None, ""))
+        return [p for p in pts if since is None or p[0] > since]
+
+
+class SnapshotBTCDProvider:
+    """Dominance derived from the ``market_cap_snapshots`` table (btc_mcap / total_mcap)."""
+
+    def __init__(self, session_factory: Callable[[], Any]):
+        self.session_factory = session_factory
+
+    async def load(self, since: float | None = None) -> List[Point]:
+        from sqlalchemy import select
+        from ...models import MarketCapSnapshot
+
+        stmt = select(MarketCapSnapshot.ts, MarketCapSnapshot.btc_mcap, MarketCapSnapshot.total_mcap).order_by(MarketCapSnapshot.ts)
+        if since is not None:
+            stmt = stmt.where(MarketCapSnapshot.ts > dt.datetime.fromtimestamp(since, tz=dt.timezone.utc).replace(tzinfo=None))
+        async with self.session_factory() as db:
+            q = await db.execute(stmt)
+            out: List[Point] = []
+            for ts, btc, total in q.all():
+                if total and total > 0:
+                    out.append((ts.replace(tzinfo=dt.timezone.utc).timestamp(), 100.0 * float(btc) / float(total)))
+            return out
+
+
+async def record_market_cap_snapshot(session_factory: Callable[[], Any]) -> Point | None:
+    """Poll CoinGecko /global once and store BTC + total market cap; returns the dominance point."""
+    if os.getenv("MARKET_OFFLINE", "").strip().lower() in {"1", "true", "yes", "on"}:
+        return None
+    from ..futures import _http_get_json
+    from ...models import MarketCapSnapshot
+
+    data = await _http_get_json("https://api.coingecko.com/api/v3/global")
+    try:
+        g = (data or {}).get("data") or {}
+        total = float(g["total_market_cap"]["usd"])
+        btc = total * float(g["market_cap_percentage"]["btc"]) / 100.0
+    except Exception:
+        return None
+    now = time.time()
+    async with session_factory() as db:
+        db.add(MarketCapSnapshot(ts=dt.datetime.fromtimestamp(now, tz=dt.timezone.utc).replace(tzinfo=None), btc_mcap=btc, total_mcap=total))
+        try:
+            await db.commit()
+        except Exception:
+            await db.rollback()
+    return (now, 100.0 * btc / total)
+
+
+def _slope_sign(y: np.ndarray) -> int:
+    """Sign of the least-squares slope (closed form, no polyfit)."""
+    n = y.size
+    x = np.arange(n, dtype=float)
+    cov = float(np.dot(x - x.mean(), y - y.mean()))
+    return 1 if cov >= 0 else -1
+
 
 class BTCDService:
-    """Stubby dominance service.
+    """BTC dominance series with a pluggable provider.
 
-    In production, replace with a real BTC dominance feed. For now, we return a
-    synthetic trend using a simple up-trend (+1) when offline. This still allows
-    the context engine to operate deterministically.
+    Points from the provider are kept in a rolling in-memory window (persisted by the provider
+    itself, e.g. ``market_cap_snapshots``). The trend direction per timeframe is cached until
+    the next bar closes, so ``get_trend`` on a warm cache is a dictionary read. Without a
+    provider (or data) the legacy synthetic/flat series is used.
     """
 
+    def __init__(self, provider: Optional[BTCDProvider] = None, maxlen: int = 5000):
+        self.provider = provider
+        self.points: Deque[Point] = deque(maxlen=int(maxlen))
+        self._trend: Dict[str, Tuple[float, int]] = {}
+
+    def set_provider(self, provider: Optional[BTCDProvider]) -> None:
+        self.provider = provider
+        self.points.clear()
+        self._trend.clear()
+
+    def extend(self, pts: List[Point]) -> int:
+        last = self.points[-1][0] if self.points else None
+        n = 0
+        for ts, v in pts:
+            if last is None or ts > last:
+                self.points.append((float(ts), float(v)))
+                last = ts
+                n += 1
+        if n:
+            self._trend.clear()
+        return n
+
+    async def refresh(self) -> int:
+        if self.provider is None:
+            return 0
+        since = self.points[-1][0] if self.points else None
+        return self.extend(await self.provider.load(since))
+
+    def _resampled(self, tf: str, limit: int) -> List[float]:
+        if not self.points:
+            return []
+        step = tf_seconds(tf, default=86400)
+        buckets: Dict[int, float] = {}
+        for ts, v in self.points:
+            buckets[int(ts // step)] = v  # last value per bar
+        return [buckets[k] for k in sorted(buckets)][-int(limit):]
+
     def get_series(self, tf: str = '1D', limit: int = 400) -> List[float]:
+        s = self._resampled(tf, limit)
+        if s:
+            return s
         # Offline synthetic series: mildly trending up 40..45
         if os.getenv("MARKET_OFFLINE", "").strip().lower() in {"1", "true", "yes", "on"}:
             base = 42.0
@@ -22,15 +164,34 @@ class BTCDService:
         return [42.0 for _ in range(int(limit))]
 
     def get_trend(self, tf: str = '1D') -> int:
+        now = time.time()
+        exp, val = self._trend.get(tf, (0.0, 0))
+        if now < exp:
+            return val
         s = self.get_series(tf=tf, limit=120)
-        if not s or len(s) < 3:
-            return 1
-        x = np.arange(len(s))
-        y = np.array(s, dtype=float)
-        # slope sign via simple linear fit
-        try:
-            a, b = np.polyfit(x, y, 1)
-            return 1 if float(a) >= 0 else -1
-        except Exception:
-            return 1
+        val = _slope_sign(np.asarray(s, dtype=float)) if len(s) >= 3 else 1
+        self._trend[tf] = (now + seconds_to_next_bar(tf, now), val)
+        return val
+
+    async def run(self, session_factory: Callable[[], Any] | None = None, interval_s: float = 900.0, record: bool = False) -> None:
+        """Background loop: optionally record a CoinGecko snapshot, then pull new points."""
+        while True:
+            try:
+                if record and session_factory is not None:
+                    await record_market_cap_snapshot(session_factory)
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                pass
+            await asyncio.sleep(float(interval_s))
+
 
+def provider_from_settings(source: str, path: str | None, session_factory: Callable[[], Any] | None) -> Optional[BTCDProvider]:
+    """``synthetic`` (legacy), ``file`` (BTCD_FILE fixture) or ``coingecko`` (snapshot table)."""
+    src = (source or "synthetic").strip().lower()
+    if src == "file" and path:
+        return FileBTCDProvider(path)
+    if src == "coingecko" and session_factory is not None:
+        return SnapshotBTCDProvider(session_factory)
+    return None
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
 from typing import Any, Dict, Tuple
+import asyncio
 import math
 
+from ..cache import AsyncMemo, seconds_to_next_bar
 from .funding_service import FundingService
 from .btcd_service import BTCDService
 from .oi_service import OIService
@@ -15,6 +17,9 @@ from ..scorer import score_supertrend, score_ema50, score_rsi, score_macd
 FUND = FundingService()
 BTCD = BTCDService()
 OI = OIService()
+# Per-component cache: trend scores live until the next trend-TF bar closes; BTCD caches its
+# slope per TF the same way, and funding/OI change keep their own provider TTLs inside FUND/OI.
+_MEMO = AsyncMemo()
 
 
 def _cfg() -> Dict[str, Any]:
@@ -22,10 +27,9 @@ def _cfg() -> Dict[str, Any]:
     return cfg.get('context', {})
 
 
-def funding_score(symbol: str) -> Tuple[int, float]:
+def _funding_bucket(v: float) -> Tuple[int, float]:
     c = _cfg()
     eps = float(c.get('funding', {}).get('eps', 0.00005))
-    v = float(FUND.get(symbol) or 0.0)
     if v > eps:
         return 1, v
     if v < -eps:
@@ -33,6 +37,14 @@ def funding_score(symbol: str) -> Tuple[int, float]:
     return 0, v
 
 
+def funding_score(symbol: str) -> Tuple[int, float]:
+    return _funding_bucket(float(FUND.get(symbol) or 0.0))
+
+
+async def funding_score_async(symbol: str) -> Tuple[int, float]:
+    return _funding_bucket(float(await FUND.aget(symbol) or 0.0))
+
+
 async def _trend_score(symbol: str, mode: str, market_type: str = 'futures') -> float:
     cfg = load_signal_config()
     P = cfg['presets'].get(mode, cfg['presets']['medium'])
@@ -60,6 +72,17 @@ async def _trend_score(symbol: str, mode: str, market_type: str = 'futures') ->
     return float(weighted_avg(sc, w_ind))
 
 
+async def trend_score_cached(symbol: str, mode: str, market_type: str = 'futures') -> float:
+    """`_trend_score` memoized until the trend-TF candle closes; shared by alt/BTC/BTCD components."""
+    tf = build_tf_map(mode)['trend']
+    key = ('trend', symbol.upper(), mode, market_type)
+    return await _MEMO.get_or_compute(
+        key,
+        lambda: seconds_to_next_bar(tf),
+        lambda: _trend_score(symbol, mode, market_type=market_type),
+    )
+
+
 def _bucket_from_score(x: float, thr_bull: float, thr_bear: float) -> str:
     if x > thr_bull:
         return 'BULL'
@@ -75,8 +98,7 @@ async def alt_btc_matrix(symbol: str, mode: str) -> Dict[str, Any]:
     thr_bear = float(C.get('thr_trend_bear', -0.25))
     boosts = C.get('boosts', { 'long_max': 0.12, 'long': 0.08, 'warn': 0.02, 'short_max': -0.12, 'short': -0.08, 'pullback_warn': -0.02 })
 
-    alt = await _trend_score(symbol, mode)
-    btc = await _trend_score('BTCUSDT', mode)
+    alt, btc = await asyncio.gather(trend_score_cached(symbol, mode), trend_score_cached('BTCUSDT', mode))
     alt_b = _bucket_from_score(alt, thr_bull, thr_bear)
     btc_b = _bucket_from_score(btc, thr_bull, thr_bear)
 
@@ -102,7 +124,7 @@ async def btcd_bias(mode: str) -> Dict[str, Any]:
     trend_tf = build_tf_map(mode)['trend']
     btcd_dir = BTCD.get_trend(tf=trend_tf)
     # btc direction via trend bucket
-    btc = await _trend_score('BTCUSDT', mode)
+    btc = await trend_score_cached('BTCUSDT', mode)
     if abs(btc) <= 0.25:
         btc_dir = 0
     else:
@@ -136,7 +158,10 @@ async def price_oi_correlation(symbol: str, mode: str) -> Dict[str, Any]:
     boosts = C.get('boosts', { 'up_strong': 0.08, 'up_weak': 0.03, 'down_strong': -0.08, 'down_weak': -0.03 })
     # price change on trend TF
     tf = build_tf_map(mode)['trend']
-    df = await _load_tf(symbol, tf, market_type='futures', limit=600)
+    df, oi = await asyncio.gather(
+        _load_tf(symbol, tf, market_type='futures', limit=600),
+        OI.aget_change(symbol, lookback_h=24),
+    )
     if df is None or df.empty or len(df) < 3:
         return { 'label': 'NAIK LEMAH', 'boost': 0.0 }
     close = df['close']
@@ -146,7 +171,7 @@ async def price_oi_correlation(symbol: str, mode: str) -> Dict[str, Any]:
     p0 = float(close.iloc[-lb])
     p1 = float(close.iloc[-1])
     pchg = (p1 - p0) / p0 if p0 > 0 else 0.0
-    oi = float(OI.get_change(symbol, lookback_h=24))
+    oi = float(oi)
     # bucket
     pdir = 1 if pchg > p_eps else (-1 if pchg < -p_eps else 0)
     oidir = 1 if oi > oi_eps else (-1 if oi < -oi_eps else 0)
@@ -163,11 +188,17 @@ def is_alt(symbol: str) -> bool:
     return symbol.upper().strip() not in { 'BTCUSDT', 'BTC/USD', 'BTC/USDT' }
 
 
+async def _none() -> None:
+    return None
+
+
 async def build_context_json(symbol: str, mode: str) -> Dict[str, Any]:
-    fs, rate = funding_score(symbol)
-    mx = await alt_btc_matrix(symbol, mode)
-    btcd = await btcd_bias(mode) if is_alt(symbol) else None
-    poi = await price_oi_correlation(symbol, mode)
+    (fs, rate), mx, btcd, poi = await asyncio.gather(
+        funding_score_async(symbol),
+        alt_btc_matrix(symbol, mode),
+        btcd_bias(mode) if is_alt(symbol) else _none(),
+        price_oi_correlation(symbol, mode),
+    )
     return {
         'funding': { 'rate': rate, 'score': int(fs) },
         'alt_btc': mx,
@@ -1,14 +1,12 @@
 from __future__ import annotations
 
+import asyncio
 import os
 import time
 from datetime import timedelta
 from typing import Optional, Dict, Tuple
 
-try:
-    import ccxt
-except Exception:  # pragma: no cover
-    ccxt = None  # type: ignore
+from .universe_service import UNIVERSE
 
 
 class FundingService:
@@ -19,16 +17,53 @@ class FundingService:
     """
 
     def __init__(self, client: object | None = None, ttl_seconds: int = 180):
-        self.client = client or (ccxt.binanceusdm() if ccxt else None)
+        self._client = client
+        self._client_built = client is not None
         self.cache: Dict[str, Tuple[float, float]] = {}
         self.ttl = float(ttl_seconds)
 
+    @property
+    def client(self):
+        """ccxt USDM client, constructed on first provider call (not at import)."""
+        if not self._client_built:
+            self._client_built = True
+            try:
+                import ccxt
+
+                self._client = ccxt.binanceusdm()
+            except Exception:  # pragma: no cover
+                self._client = None
+        return self._client
+
+    @client.setter
+    def client(self, value) -> None:
+        self._client, self._client_built = value, True
+
+    def peek(self, symbol: str) -> Optional[float]:
+        """Cached value if still fresh, without touching the provider."""
+        snap = UNIVERSE.funding(symbol)
+        if snap is not None:
+            return float(snap)
+        ts, val = self.cache.get(symbol.upper(), (0.0, None))
+        return val if val is not None and time.time() - ts <= self.ttl else None
+
+    async def aget(self, symbol: str) -> Optional[float]:
+        """Non-blocking variant of :meth:`get`: the ccxt call runs in a worker thread."""
+        val = self.peek(symbol)
+        if val is not None:
+            return val
+        return await asyncio.to_thread(self.get, symbol)
+
     def get(self, symbol: str) -> Optional[float]:
         key = symbol.upper()
         now = time.time()
         # Offline shortcut
         if os.getenv("MARKET_OFFLINE", "").strip().lower() in {"1", "true", "yes", "on"}:
             return 0.0
+        # Universe snapshot (one premiumIndex call for all symbols)
+        snap = UNIVERSE.funding(symbol)
+        if snap is not None:
+            return float(snap)
         # Cached
         if key in self.cache:
             ts, val = self.cache[key]
@@ -1,13 +1,11 @@
 from __future__ import annotations
 
+import asyncio
 import os
 import time
 from typing import Optional, Dict, Tuple
 
-try:
-    import ccxt
-except Exception:  # pragma: no cover
-    ccxt = None  # type: ignore
+from .universe_service import UNIVERSE
 
 
 class OIService:
@@ -17,18 +15,56 @@ class OIService:
     lookback window (default 24 hours). Falls back to 0.0 when offline.
     """
 
-    def __init__(self, client: object | None = None):
-        self.client = client or (ccxt.binanceusdm() if ccxt else None)
+    def __init__(self, client: object | None = None, ttl_seconds: int = 180):
+        self._client = client
+        self._client_built = client is not None
         self.cache: Dict[tuple, Tuple[float, float]] = {}
+        self.ttl = float(ttl_seconds)
+
+    @property
+    def client(self):
+        """ccxt USDM client, constructed on first provider call (not at import)."""
+        if not self._client_built:
+            self._client_built = True
+            try:
+                import ccxt
+
+                self._client = ccxt.binanceusdm()
+            except Exception:  # pragma: no cover
+                self._client = None
+        return self._client
+
+    @client.setter
+    def client(self, value) -> None:
+        self._client, self._client_built = value, True
+
+    def peek(self, symbol: str, lookback_h: int = 24) -> Optional[float]:
+        """Cached value if still fresh, without touching the provider."""
+        snap = UNIVERSE.oi_change(symbol, lookback_h)
+        if snap is not None:
+            return float(snap)
+        ts, val = self.cache.get((symbol.upper(), int(lookback_h)), (0.0, None))
+        return val if val is not None and time.time() - ts <= self.ttl else None
+
+    async def aget_change(self, symbol: str, lookback_h: int = 24) -> float:
+        """Non-blocking variant of :meth:`get_change`: the ccxt call runs in a worker thread."""
+        val = self.peek(symbol, lookback_h)
+        if val is not None:
+            return val
+        return await asyncio.to_thread(self.get_change, symbol, lookback_h)
 
     def get_change(self, symbol: str, lookback_h: int = 24) -> float:
         key = (symbol.upper(), int(lookback_h))
         now = time.time()
         if os.getenv("MARKET_OFFLINE", "").strip().lower() in {"1", "true", "yes", "on"}:
             return 0.0
+        # Local rolling OI history kept by the universe snapshot
+        snap = UNIVERSE.oi_change(symbol, lookback_h)
+        if snap is not None:
+            return float(snap)
         if key in self.cache:
             ts, val = self.cache[key]
-            if now - ts <= 180:  # 3 minutes
+            if now - ts <= self.ttl:
                 return val
         try:
             ex = self.client
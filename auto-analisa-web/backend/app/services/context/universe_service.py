@@ -0,0 +1,258 @@
+from __future__ import annotations
+
+import asyncio
+import datetime as dt
+import os
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+
+def _offline() -> bool:
+    return os.getenv("MARKET_OFFLINE", "").strip().lower() in {"1", "true", "yes", "on"}
+
+
+def norm_symbol(sym: str) -> str:
+    s = sym.upper().replace(":USDT", "").replace("/", "")
+    return s if s.endswith("USDT") else s + "USDT"
+
+
+def parse_premium(item: Dict[str, Any]) -> Dict[str, Any] | None:
+    """Map one Binance premiumIndex item to the fetch_funding_basis shape (+ basis_bp)."""
+    try:
+        mark = float(item["markPrice"])
+        index = float(item["indexPrice"])
+    except Exception:
+        return None
+    basis = mark - index
+    fr = item.get("lastFundingRate")
+    nft = item.get("nextFundingTime")
+    try:
+        fr_now = float(fr) if fr not in (None, "") else None
+    except Exception:
+        fr_now = None
+    try:
+        nft_iso = dt.datetime.fromtimestamp(int(nft) / 1000.0, tz=dt.timezone.utc).isoformat() if nft else None
+    except Exception:
+        nft_iso = None
+    return {
+        "funding_now": fr_now,
+        "next_funding_time": nft_iso,
+        "mark_price": mark,
+        "index_price": index,
+        "basis_now": basis,
+        "basis_bp": (basis / index) * 10000.0 if index else None,
+    }
+
+
+class UniverseSnapshot:
+    """Universe-wide USDM snapshot: funding, mark/index, basis and rolling OI history.
+
+    - ``refresh_premium`` pulls ``/fapi/v1/premiumIndex`` for *all* symbols in one request.
+    - ``refresh_oi`` samples open interest for the tracked symbols (bounded concurrency) and
+      appends to an in-memory rolling window mirrored in ``open_interest_history``.
+    Lookups (``premium_for``, ``funding``, ``oi_change``) are dictionary reads and return
+    None when the snapshot is stale or missing, so callers can fall back to per-symbol fetches.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = 180.0,
+        oi_retention_h: int = 48,
+        oi_concurrency: int = 8,
+        track_idle_h: float = 6.0,
+    ):
+        self.ttl = float(ttl_seconds)
+        self.oi_retention_s = float(oi_retention_h) * 3600.0
+        self.oi_concurrency = int(oi_concurrency)
+        self.track_idle_s = float(track_idle_h) * 3600.0
+        self.premium: Dict[str, Dict[str, Any]] = {}
+        self.premium_ts: float = 0.0
+        self.oi_hist: Dict[str, Deque[Tuple[float, float]]] = {}
+        # USDM symbols asked for via oi_change() -> last read; sampled until idle for track_idle_h
+        self.tracked: Dict[str, float] = {}
+
+    # --- O(1) reads ---------------------------------------------------------
+    def is_fresh(self, now: float | None = None) -> bool:
+        t = time.time() if now is None else now
+        return bool(self.premium) and (t - self.premium_ts) <= self.ttl
+
+    def premium_for(self, symbol: str) -> Dict[str, Any] | None:
+        if not self.is_fresh():
+            return None
+        return self.premium.get(norm_symbol(symbol))
+
+    def funding(self, symbol: str) -> Optional[float]:
+        p = self.premium_for(symbol)
+        return p.get("funding_now") if p else None
+
+    def oi_change(self, symbol: str, lookback_h: int = 24, now: float | None = None) -> Optional[float]:
+        """Relative OI change over ``lookback_h`` from local history, or None if history is too short."""
+        sym = norm_symbol(symbol)
+        t = time.time() if now is None else now
+        if not self.premium or sym in self.premium:
+            self.tracked[sym] = t
+        hist = self.oi_hist.get(sym)
+        if not hist or len(hist) < 2:
+            return None
+        last_ts, last = hist[-1]
+        if t - last_ts > self.ttl * 2:
+            return None
+        start = last_ts - float(lookback_h) * 3600.0
+        if hist[0][0] > start + 0.1 * float(lookback_h) * 3600.0:
+            return None  # not enough history yet
+        first = next((v for ts, v in hist if ts >= start), hist[0][1])
+        if first <= 0:
+            return None
+        return (last - first) / first
+
+    def tracked_symbols(self, now: float | None = None) -> set[str]:
+        """Symbols read within ``track_idle_h`` (idle ones are dropped)."""
+        t = time.time() if now is None else now
+        for s in [s for s, seen in self.tracked.items() if t - seen > self.track_idle_s]:
+            del self.tracked[s]
+        return set(self.tracked)
+
+    # --- writers ------------------------------------------------------------
+    def set_premium(self, items: Iterable[Dict[str, Any]], now: float | None = None) -> int:
+        snap: Dict[str, Dict[str, Any]] = {}
+        for it in items:
+            sym = str(it.get("symbol") or "").upper()
+            if not sym.endswith("USDT"):
+                continue
+            parsed = parse_premium(it)
+            if parsed is not None:
+                snap[sym] = parsed
+        if snap:
+            self.premium = snap
+            self.premium_ts = time.time() if now is None else now
+        return len(snap)
+
+    def record_oi(self, symbol: str, oi: float, ts: float | None = None) -> None:
+        sym = norm_symbol(symbol)
+        t = time.time() if ts is None else float(ts)
+        hist = self.oi_hist.setdefault(sym, deque())
+        if hist and t <= hist[-1][0]:
+            return
+        hist.append((t, float(oi)))
+        cutoff = t - self.oi_retention_s
+        while hist and hist[0][0] < cutoff:
+            hist.popleft()
+
+    async def refresh_premium(self) -> int:
+        if _offline():
+            return 0
+        from ..futures import BINANCE_FAPI, _http_get_json
+
+        data = await _http_get_json(f"{BINANCE_FAPI}/fapi/v1/premiumIndex")
+        if not isinstance(data, list):
+            return 0
+        return self.set_premium(data)
+
+    async def refresh_oi(self, symbols: Iterable[str], db=None) -> List[Tuple[str, float, float]]:
+        """Sample current OI for ``symbols`` concurrently; persist when ``db`` is given."""
+        if _offline():
+            return []
+        from ..futures import fetch_open_interest
+
+        sem = asyncio.Semaphore(self.oi_concurrency)
+        now = time.time()
+
+        async def one(sym: str) -> Tuple[str, float, float] | None:
+            async with sem:
+                v = await fetch_open_interest(sym)
+            return (sym, now, float(v)) if v is not None else None
+
+        res = await asyncio.gather(*(one(norm_symbol(s)) for s in set(symbols)))
+        rows = [r for r in res if r is not None]
+        for sym, ts, v in rows:
+            self.record_oi(sym, v, ts)
+        if db is not None and rows:
+            await self.persist_oi(db, rows)
+        return rows
+
+    # --- persistence --------------------------------------------------------
+    async def persist_oi(self, db, rows: List[Tuple[str, float, float]]) -> None:
+        from sqlalchemy import delete, insert
+        from ...models import OpenInterestHistory
+
+        def _dt(ts: float) -> dt.datetime:
+            return dt.datetime.fromtimestamp(ts, tz=dt.timezone.utc).replace(tzinfo=None)
+
+        try:
+            await db.execute(insert(OpenInterestHistory), [{"symbol": s, "ts": _dt(t), "oi": v} for s, t, v in rows])
+            cutoff = _dt(time.time() - self.oi_retention_s)
+            await db.execute(delete(OpenInterestHistory).where(OpenInterestHistory.ts < cutoff))
+            await db.commit()
+        except Exception:
+            try:
+                await db.rollback()
+            except Exception:
+                pass
+
+    async def load_oi_history(self, db) -> int:
+        """Warm the in-memory window from the table (fast restart)."""
+        from sqlalchemy import select
+        from ...models import OpenInterestHistory
+
+        cutoff = dt.datetime.now(dt.timezone.utc).replace(tzinfo=None) - dt.timedelta(seconds=self.oi_retention_s)
+        q = await db.execute(
+            select(OpenInterestHistory.symbol, OpenInterestHistory.ts, OpenInterestHistory.oi)
+            .where(OpenInterestHistory.ts >= cutoff)
+            .order_by(OpenInterestHistory.ts)
+        )
+        n = 0
+        now = time.time()
+        for sym, ts, v in q.all():
+            self.record_oi(sym, float(v), ts.replace(tzinfo=dt.timezone.utc).timestamp())
+            self.tracked.setdefault(norm_symbol(sym), now)  # keep sampling what was tracked before
+            n += 1
+        return n
+
+    # --- scheduler ----------------------------------------------------------
+    async def run(
+        self,
+        session_factory: Callable[[], Any],
+        interval_s: float = 60.0,
+        symbols_provider: Callable[[], Awaitable[Iterable[str]]] | None = None,
+    ) -> None:
+        """Refresh loop: premiumIndex every cycle, OI for tracked + provided symbols."""
+        try:
+            async with session_factory() as db:
+                await self.load_oi_history(db)
+        except Exception:
+            pass
+        while True:
+            try:
+                await self.refresh_premium()
+                syms = self.tracked_symbols()
+                if symbols_provider is not None:
+                    try:
+                        syms |= {norm_symbol(s) for s in await symbols_provider()}
+                    except Exception:
+                        pass
+                # history of symbols nobody reads or analyses any more is released
+                for s in set(self.oi_hist) - syms:
+                    del self.oi_hist[s]
+                if syms:
+                    async with session_factory() as db:
+                        await self.refresh_oi(syms, db=db)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                pass
+            await asyncio.sleep(float(interval_s))
+
+
+async def active_futures_symbols(session_factory: Callable[[], Any]) -> List[str]:
+    """Symbols with an active futures analysis or a futures watchlist entry."""
+    from sqlalchemy import select
+    from ...models import Analysis, Watchlist
+
+    async with session_factory() as db:
+        q1 = await db.execute(select(Analysis.symbol).where(Analysis.status == "active", Analysis.trade_type == "futures"))
+        q2 = await db.execute(select(Watchlist.symbol).where(Watchlist.trade_type == "futures"))
+        return sorted({s.upper() for (s,) in q1.all()} | {s.upper() for (s,) in q2.all()})
+
+
+UNIVERSE = UniverseSnapshot()
@@ -1,26 +1,36 @@
 from __future__ import annotations
 from typing import Optional, Dict, Any
+import asyncio
 import os, time
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from types import SimpleNamespace
 
-import httpx
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
-from app.models import FuturesSignalsCache
+from app.models import FuturesSignalsCache, FuturesSignalsHourly, FuturesSignalsLatest
+from app.services.http_client import get_http
 
 
 BINANCE_FAPI = "https://fapi.binance.com"
 
 
-async def _http_get_json(url: str, params: dict | None = None) -> dict | None:
-    timeout = float(os.getenv("HTTP_TIMEOUT_S", "6"))
+async def _http_get_json(url: str, params: dict | None = None, timeout: float | None = None) -> dict | None:
+    t = float(timeout if timeout is not None else os.getenv("HTTP_TIMEOUT_S", "6"))
     try:
-        async with httpx.AsyncClient(timeout=timeout) as cli:
-            r = await cli.get(url, params=params)
-            r.raise_for_status()
-            return r.json()
+        r = await get_http().get(url, params=params, timeout=t)
+        r.raise_for_status()
+        return r.json()
+    except Exception:
+        return None
+
+
+async def _bounded(coro, timeout: float):
+    """Await ``coro`` with a hard wall-clock cap; None on timeout or error."""
+    try:
+        return await asyncio.wait_for(coro, timeout)
+    except asyncio.CancelledError:
+        raise
     except Exception:
         return None
 
@@ -39,6 +49,11 @@ async def fetch_funding_basis(symbol: str) -> dict | None:
     if os.getenv("MARKET_OFFLINE", "").strip().lower() in {"1", "true", "yes", "on"}:
         return None
     sym = _norm_symbol(symbol)
+    from app.services.context.universe_service import UNIVERSE
+
+    snap = UNIVERSE.premium_for(sym)
+    if snap is not None:
+        return {k: snap[k] for k in ("funding_now", "next_funding_time", "mark_price", "index_price", "basis_now")}
     url = f"{BINANCE_FAPI}/fapi/v1/premiumIndex"
     data = await _http_get_json(url, params={"symbol": sym})
     if not data or "markPrice" not in data or "indexPrice" not in data:
@@ -74,12 +89,11 @@ async def fetch_long_short_ratio(symbol: str, interval: str = "5m") -> dict | No
     if os.getenv("MARKET_OFFLINE", "").strip().lower() in {"1", "true", "yes", "on"}:
         return None
     sym = _norm_symbol(symbol)
-    # Accounts ratio
+    # Accounts + positions ratio (concurrent)
     url_acc = f"{BINANCE_FAPI}/futures/data/globalLongShortAccountRatio"
-    acc = await _http_get_json(url_acc, params={"symbol": sym, "period": interval, "limit": 1})
-    # Positions ratio
     url_pos = f"{BINANCE_FAPI}/futures/data/globalLongShortPositionRatio"
-    pos = await _http_get_json(url_pos, params={"symbol": sym, "period": interval, "limit": 1})
+    params = {"symbol": sym, "period": interval, "limit": 1}
+    acc, pos = await asyncio.gather(_http_get_json(url_acc, params=params), _http_get_json(url_pos, params=params))
     try:
         a = float(acc[0]["longShortRatio"]) if isinstance(acc, list) and acc else None
     except Exception:
@@ -180,48 +194,130 @@ async def fetch_leverage_bracket(symbol: str) -> dict | None:
     return None
 
 
-async def refresh_signals_cache(db: AsyncSession, symbol: str) -> FuturesSignalsCache:
+def _signal_columns() -> set[str]:
+    return {c.key for c in FuturesSignalsCache.__table__.columns} - {"id", "created_at"}
+
+
+async def collect_signals(symbol: str) -> dict:
+    """Fetch every futures metric for ``symbol`` concurrently.
+
+    Returns the ``FuturesSignalsCache`` column values plus ``mark_price`` (not stored;
+    used by the scheduler to gauge volatility between refreshes).
+    """
     sym = symbol.upper()
-    fb = await fetch_funding_basis(sym) or {}
-    oi = await fetch_open_interest(sym)
-    lsr = await fetch_long_short_ratio(sym) or {}
-    td5 = await fetch_taker_delta(sym, "5m")
-    td15 = await fetch_taker_delta(sym, "15m")
-    tdh1 = await fetch_taker_delta(sym, "1h")
-    # delta OI dan orderbook metrics
+    # all metrics in parallel over the pooled client: ~1 RTT instead of ~10; a slow or
+    # failed endpoint only blanks its own field
+    t = float(os.getenv("SIGNALS_CALL_TIMEOUT_S", "4"))
+    fb, oi, lsr, td5, td15, tdh1, oi_h1, oi_h4, ob = await asyncio.gather(
+        _bounded(fetch_funding_basis(sym), t),
+        _bounded(fetch_open_interest(sym), t),
+        _bounded(fetch_long_short_ratio(sym), t),
+        _bounded(fetch_taker_delta(sym, "5m"), t),
+        _bounded(fetch_taker_delta(sym, "15m"), t),
+        _bounded(fetch_taker_delta(sym, "1h"), t),
+        # delta OI dan orderbook metrics
+        _bounded(fetch_oi_hist_delta(sym, "1h"), t),
+        _bounded(fetch_oi_hist_delta(sym, "4h"), t),
+        _bounded(fetch_orderbook_metrics(sym), t),
+    )
+    fb, lsr, ob = fb or {}, lsr or {}, ob or {}
     d1 = None
-    oi_h1 = await fetch_oi_hist_delta(sym, "1h")
-    oi_h4 = await fetch_oi_hist_delta(sym, "4h")
-    ob = await fetch_orderbook_metrics(sym) or {}
     # basis bp
     try:
         basis_bp = (float(fb.get("basis_now")) / float(fb.get("index_price"))) * 10000.0 if fb.get("index_price") else None
     except Exception:
         basis_bp = None
+    return {
+        "symbol": sym,
+        "funding_now": fb.get("funding_now"),
+        "funding_next": None,  # not provided by endpoint; left None
+        "next_funding_time": fb.get("next_funding_time"),
+        "oi_now": oi,
+        "oi_d1": d1,
+        "oi_delta_h1": oi_h1,
+        "oi_delta_h4": oi_h4,
+        "lsr_accounts": lsr.get("accounts"),
+        "lsr_positions": lsr.get("positions"),
+        "basis_now": fb.get("basis_now"),
+        "basis_bp": basis_bp,
+        "taker_delta_m5": td5,
+        "taker_delta_m15": td15,
+        "taker_delta_h1": tdh1,
+        "spread_bp": ob.get("spread_bp"),
+        "depth10bp_bid": ob.get("depth10bp_bid"),
+        "depth10bp_ask": ob.get("depth10bp_ask"),
+        "ob_imbalance": ob.get("ob_imbalance"),
+        "mark_price": fb.get("mark_price"),
+    }
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
 
-    row = FuturesSignalsCache(
-        symbol=sym,
-        funding_now=fb.get("funding_now"),
-        funding_next=None,  # not provided by endpoint; left None
-        next_funding_time=fb.get("next_funding_time"),
-        oi_now=oi,
-        oi_d1=d1,
-        oi_delta_h1=oi_h1,
-        oi_delta_h4=oi_h4,
-        lsr_accounts=lsr.get("accounts"),
-        lsr_positions=lsr.get("positions"),
-        basis_now=fb.get("basis_now"),
-        basis_bp=basis_bp,
-        taker_delta_m5=td5,
-        taker_delta_m15=td15,
-        taker_delta_h1=tdh1,
-        spread_bp=ob.get("spread_bp"),
-        depth10bp_bid=ob.get("depth10bp_bid"),
-        depth10bp_ask=ob.get("depth10bp_ask"),
-        ob_imbalance=ob.get("ob_imbalance"),
+
+async def upsert_latest(db: AsyncSession, sigs: list[dict], ts: datetime | None = None) -> None:
+    """Upsert ``futures_signals_latest`` for each collected signal (caller commits).
+
+    One dialect upsert statement, so the web path and the scheduler adding the same new
+    symbol concurrently cannot collide on the primary key; other dialects use a savepoint.
+    """
+    if not sigs:
+        return
+    cols = _signal_columns() - {"symbol"}
+    at = ts or _utcnow()
+    by_sym = {str(s["symbol"]).upper(): s for s in sigs}
+    values = [{"symbol": sym, **{k: sig.get(k) for k in cols}, "created_at": at} for sym, sig in by_sym.items()]
+    dialect = db.bind.dialect.name if db.bind is not None else ""
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as upsert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as upsert
+        stmt = upsert(FuturesSignalsLatest).values(values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["symbol"], set_={k: stmt.excluded[k] for k in (*cols, "created_at")}
+        )
+        await db.execute(stmt)
+        return
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert as upsert
+
+        stmt = upsert(FuturesSignalsLatest).values(values)
+        await db.execute(stmt.on_duplicate_key_update({k: stmt.inserted[k] for k in (*cols, "created_at")}))
+        return
+    for v in values:
+        async with db.begin_nested():
+            r = await db.get(FuturesSignalsLatest, v["symbol"])
+            if r is None:
+                db.add(FuturesSignalsLatest(**v))
+            else:
+                for k in (*cols, "created_at"):
+                    setattr(r, k, v[k])
+
+
+async def get_latest_signals_row(db: AsyncSession, symbol: str):
+    """Latest signals for ``symbol``: primary-key read, history (indexed) as fallback."""
+    sym = symbol.upper()
+    r = await db.get(FuturesSignalsLatest, sym)
+    if r is not None:
+        return r
+    q = await db.execute(
+        select(FuturesSignalsCache)
+        .where(FuturesSignalsCache.symbol == sym)
+        .order_by(FuturesSignalsCache.created_at.desc())
+        .limit(1)
     )
+    return q.scalars().first()
+
+
+async def refresh_signals_cache(db: AsyncSession, symbol: str) -> FuturesSignalsCache:
+    sig = await collect_signals(symbol)
+    cols = _signal_columns()
+    now = _utcnow()
+    row = FuturesSignalsCache(**{k: v for k, v in sig.items() if k in cols}, created_at=now)
     db.add(row)
     try:
+        await upsert_latest(db, [sig], now)
         await db.commit()
         await db.refresh(row)
         return row
@@ -257,17 +353,7 @@ async def refresh_signals_cache(db: AsyncSession, symbol: str) -> FuturesSignals
         return faux
 
 
-async def latest_signals(db: AsyncSession, symbol: str) -> dict:
-    from sqlalchemy import desc
-    q = await db.execute(select(FuturesSignalsCache).where(FuturesSignalsCache.symbol == symbol.upper()).order_by(desc(FuturesSignalsCache.created_at)))
-    r = q.scalars().first()
-    if not r:
-        # Tidak ada cache: coba refresh on-demand (akan fallback in-memory jika DB RO)
-        try:
-            fresh = await refresh_signals_cache(db, symbol)
-            r = fresh
-        except Exception:
-            r = None
+def _signals_payload(r, symbol: str) -> dict:
     if not r:
         return {"has_data": False}
     return {
@@ -281,3 +367,129 @@ async def latest_signals(db: AsyncSession, symbol: str) -> dict:
         "orderbook": {"spread_bp": getattr(r, "spread_bp", None), "depth10bp_bid": getattr(r, "depth10bp_bid", None), "depth10bp_ask": getattr(r, "depth10bp_ask", None), "imbalance": getattr(r, "ob_imbalance", None)},
         "created_at": getattr(r, "created_at", datetime.now(timezone.utc)),
     }
+
+
+async def latest_signals(db: AsyncSession, symbol: str) -> dict:
+    r = await get_latest_signals_row(db, symbol)
+    if not r:
+        # Tidak ada cache: coba refresh on-demand (akan fallback in-memory jika DB RO)
+        try:
+            fresh = await refresh_signals_cache(db, symbol)
+            r = fresh
+        except Exception:
+            r = None
+    return _signals_payload(r, symbol)
+
+
+async def latest_signals_many(db: AsyncSession, symbols: list[str], concurrency: int = 4) -> Dict[str, dict]:
+    """``latest_signals`` for many symbols: one query on the latest table; symbols without a
+    row are collected concurrently and written in one transaction."""
+    syms = list(dict.fromkeys(s.upper() for s in symbols if s))
+    if not syms:
+        return {}
+    q = await db.execute(select(FuturesSignalsLatest).where(FuturesSignalsLatest.symbol.in_(syms)))
+    rows: Dict[str, Any] = {r.symbol: r for r in q.scalars().all()}
+    missing = [s for s in syms if s not in rows]
+    if missing:
+        sem = asyncio.Semaphore(max(1, int(concurrency)))
+
+        async def one(sym: str) -> dict | None:
+            async with sem:
+                try:
+                    return await collect_signals(sym)
+                except Exception:
+                    return None
+
+        fresh = [sig for sig in await asyncio.gather(*(one(s) for s in missing)) if sig is not None]
+        if fresh:
+            cols = _signal_columns()
+            now = _utcnow()
+            try:
+                db.add_all([FuturesSignalsCache(**{k: v for k, v in sig.items() if k in cols}, created_at=now) for sig in fresh])
+                await upsert_latest(db, fresh, now)
+                await db.commit()
+            except Exception:
+                try:
+                    await db.rollback()
+                except Exception:
+                    pass
+            for sig in fresh:
+                rows[sig["symbol"]] = SimpleNamespace(**{k: v for k, v in sig.items() if k in cols}, created_at=now)
+    return {s: _signals_payload(rows.get(s), s) for s in syms}
+
+
+async def rollup_signals(
+    db: AsyncSession,
+    keep_raw_h: float | None = None,
+    keep_hourly_days: float | None = None,
+    batch: int = 5000,
+    now: datetime | None = None,
+) -> dict:
+    """Retention: fold raw rows older than ``keep_raw_h`` into hourly rollups, then delete them.
+
+    Only complete hours are rolled up. Numeric metrics are averaged (merged with an existing
+    rollup by each metric's non-null sample count, kept in ``counts``); ``next_funding_time``
+    keeps the last value. Rollups older than ``keep_hourly_days`` are dropped.
+    """
+    from sqlalchemy import Float, delete
+
+    keep_raw_h = float(keep_raw_h if keep_raw_h is not None else os.getenv("SIGNALS_RAW_RETENTION_H", "48"))
+    keep_hourly_days = float(keep_hourly_days if keep_hourly_days is not None else os.getenv("SIGNALS_HOURLY_RETENTION_D", "90"))
+    t = now or _utcnow()
+    cutoff = (t - timedelta(hours=keep_raw_h)).replace(minute=0, second=0, microsecond=0)
+    metric = [c.key for c in FuturesSignalsHourly.__table__.columns if isinstance(c.type, Float)]
+    rolled = hours = 0
+    while True:
+        q = await db.execute(
+            select(FuturesSignalsCache)
+            .where(FuturesSignalsCache.created_at < cutoff)
+            .order_by(FuturesSignalsCache.id)
+            .limit(int(batch))
+        )
+        raw = q.scalars().all()
+        if not raw:
+            break
+        groups: Dict[tuple, list] = {}
+        for r in raw:
+            groups.setdefault((r.symbol, r.created_at.replace(minute=0, second=0, microsecond=0)), []).append(r)
+        syms = {k[0] for k in groups}
+        lo, hi = min(k[1] for k in groups), max(k[1] for k in groups)
+        qh = await db.execute(
+            select(FuturesSignalsHourly).where(
+                FuturesSignalsHourly.symbol.in_(list(syms)),
+                FuturesSignalsHourly.hour >= lo,
+                FuturesSignalsHourly.hour <= hi,
+            )
+        )
+        existing = {(h.symbol, h.hour): h for h in qh.scalars().all()}
+        for (sym, hour), rows in groups.items():
+            h = existing.get((sym, hour))
+            if h is None:
+                h = FuturesSignalsHourly(symbol=sym, hour=hour, n=0)
+                db.add(h)
+            prev_n = int(h.n or 0)
+            counts = dict(h.counts or {})
+            for k in metric:
+                vals = [float(v) for v in (getattr(r, k) for r in rows) if v is not None]
+                if not vals:
+                    continue
+                old = getattr(h, k)
+                # weight by the metric's own sample count: rows where it was NULL don't count
+                prev = 0 if old is None else int(counts.get(k, prev_n))
+                if prev == 0:
+                    setattr(h, k, sum(vals) / len(vals))
+                else:
+                    setattr(h, k, (float(old) * prev + sum(vals)) / (prev + len(vals)))
+                counts[k] = prev + len(vals)
+            h.counts = counts
+            last = next((r.next_funding_time for r in reversed(rows) if r.next_funding_time), None)
+            if last:
+                h.next_funding_time = last
+            h.n = prev_n + len(rows)
+        await db.execute(delete(FuturesSignalsCache).where(FuturesSignalsCache.id.in_([r.id for r in raw])))
+        await db.commit()
+        rolled += len(raw)
+        hours += len(groups)
+    res = await db.execute(delete(FuturesSignalsHourly).where(FuturesSignalsHourly.hour < t - timedelta(days=keep_hourly_days)))
+    await db.commit()
+    return {"rolled": rolled, "hours": hours, "pruned_hourly": int(res.rowcount or 0)}
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+
+# Batch futures plan engine: bundles are fetched concurrently, while the CPU-bound part
+# (Features.enrich + scalp/swing build_plan_futures) runs on a process pool so a large batch
+# neither serializes on one core nor blocks the event loop.
+
+_POOL: Optional[ProcessPoolExecutor] = None
+
+
+def plan_workers() -> int:
+    """FUTURES_PLAN_WORKERS (default: min(4, cpus)); 0 runs plans on a thread instead."""
+    try:
+        return max(0, int(os.getenv("FUTURES_PLAN_WORKERS", str(min(4, os.cpu_count() or 1)))))
+    except ValueError:
+        return 0
+
+
+def _executor() -> Optional[Executor]:
+    global _POOL
+    n = plan_workers()
+    if n <= 0:
+        return None
+    if _POOL is None:
+        # spawn: workers must not inherit the parent's event loop, sockets or DB pool
+        _POOL = ProcessPoolExecutor(max_workers=n, mp_context=multiprocessing.get_context("spawn"))
+    return _POOL
+
+
+def shutdown_pool() -> None:
+    global _POOL
+    if _POOL is not None:
+        _POOL.shutdown(wait=False, cancel_futures=True)
+        _POOL = None
+
+
+def build_symbol_plans(symbol: str, bundle: Dict[str, Any], sig: Dict[str, Any] | None, use_llm_fixes: bool = False) -> Dict[str, Any]:
+    """Scalp plan with the swing plan under ``variants.swing`` (pure; runs in a worker)."""
+    from .rules import Features
+    from .strategy_futures import FuturesContext, build_plan_futures
+
+    feat = Features(bundle)
+    feat.enrich()
+    ctx = FuturesContext(bundle, feat, symbol)  # shared by both profiles
+    plan = build_plan_futures(
+        bundle, feat,
+        side_hint="AUTO",
+        fut_signals=sig,
+        symbol=symbol,
+        use_llm_fixes=bool(use_llm_fixes),
+        profile="scalp",
+        ctx=ctx,
+    )
+    try:
+        swing_variant = build_plan_futures(
+            bundle,
+            feat,
+            side_hint="AUTO",
+            fut_signals=sig,
+            symbol=symbol,
+            use_llm_fixes=False,
+            profile="swing",
+            ctx=ctx,
+        )
+        if isinstance(plan, dict):
+            plan.setdefault("variants", {})["swing"] = {k: v for k, v in swing_variant.items() if k != "_usage"}
+    except Exception:
+        pass
+    return plan
+
+
+async def run_symbol_plans(symbol: str, bundle: Dict[str, Any], sig: Dict[str, Any] | None, use_llm_fixes: bool = False) -> Dict[str, Any]:
+    fn = partial(build_symbol_plans, symbol, bundle, sig, use_llm_fixes)
+    loop = asyncio.get_running_loop()
+    ex = _executor()
+    if ex is None:
+        return await asyncio.to_thread(fn)
+    try:
+        return await loop.run_in_executor(ex, fn)
+    except BrokenProcessPool:
+        shutdown_pool()
+        return await asyncio.to_thread(fn)
+
+
+async def iter_batch_plans(
+    symbols: List[str],
+    signals: Dict[str, Dict[str, Any]],
+    use_llm_fixes: bool = False,
+    concurrency: int | None = None,
+) -> AsyncIterator[Tuple[str, Dict[str, Any] | None, Exception | None]]:
+    """Yield ``(symbol, plan, error)`` as each symbol completes (not in input order)."""
+    from .market import fetch_bundle
+
+    sem = asyncio.Semaphore(max(1, int(concurrency or os.getenv("FUTURES_BATCH_CONCURRENCY", "8"))))
+
+    async def one(sym: str) -> Tuple[str, Dict[str, Any] | None, Exception | None]:
+        try:
+            async with sem:
+                bundle = await fetch_bundle(sym, tfs=("4h", "1h", "15m", "5m", "1m"), market="futures")
+            return sym, await run_symbol_plans(sym, bundle, signals.get(sym), use_llm_fixes), None
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            return sym, None, e
+
+    tasks = [asyncio.create_task(one(s)) for s in symbols]
+    try:
+        for fut in asyncio.as_completed(tasks):
+            yield await fut
+    finally:
+        for t in tasks:
+            t.cancel()
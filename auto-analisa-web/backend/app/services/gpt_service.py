@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import Literal, Dict, Any, Tuple
+from typing import Literal, Dict, Any, Tuple, Callable, Optional
 import json
 
 from .prompt_templates import prompt_scalping, prompt_swing
@@ -12,7 +12,9 @@ def build_prompt(symbol: str, mode: Literal['scalping','swing'], payload: Dict[s
     return prompt_swing(symbol, payload)
 
 
-def call_gpt(prompt: str) -> Tuple[Dict[str, Any], Dict[str, int]]:
+async def call_gpt(
+    prompt: str, request: Any = None, on_delta: Optional[Callable[[str], Any]] = None
+) -> Tuple[Dict[str, Any], Dict[str, int]]:
     messages = [
         {"role": "system", "content": (
             "Anda analis trading kripto profesional. KELUARKAN HANYA JSON VALID (object) tanpa penjelasan. "
@@ -22,6 +24,6 @@ def call_gpt(prompt: str) -> Tuple[Dict[str, Any], Dict[str, int]]:
         )},
         {"role": "user", "content": prompt},
     ]
-    text, usage = ask_llm_messages(messages)
+    text, usage = await ask_llm_messages(messages, request=request, on_delta=on_delta)
     data: Dict[str, Any] = safe_json_loads(text)
     return data, (usage or {})
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import asyncio
+import os
+from typing import Dict
+
+import httpx
+
+try:  # HTTP/2 needs the optional ``h2`` package (httpx[http2])
+    import h2  # noqa: F401
+
+    _HAS_H2 = True
+except Exception:  # pragma: no cover
+    _HAS_H2 = False
+
+
+# One pooled AsyncClient per event loop for all outbound REST calls (Binance FAPI,
+# CoinGecko, ...): connections and TLS sessions are reused instead of a handshake per call.
+# Clients are bound to the loop that created them, hence the per-loop registry.
+_CLIENTS: Dict[int, tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = {}
+
+
+def _build() -> httpx.AsyncClient:
+    use_h2 = _HAS_H2 and os.getenv("HTTP2", "1").strip().lower() not in {"0", "false", "no", "off"}
+    return httpx.AsyncClient(
+        http2=use_h2,
+        timeout=float(os.getenv("HTTP_TIMEOUT_S", "6")),
+        limits=httpx.Limits(
+            max_connections=int(os.getenv("HTTP_POOL_MAX", "64")),
+            max_keepalive_connections=int(os.getenv("HTTP_POOL_KEEPALIVE", "32")),
+            keepalive_expiry=30.0,
+        ),
+        headers={"User-Agent": "autoanalisa/1.0"},
+    )
+
+
+def get_http() -> httpx.AsyncClient:
+    """Shared pooled client for the running event loop (created lazily)."""
+    loop = asyncio.get_running_loop()
+    ent = _CLIENTS.get(id(loop))
+    if ent is not None and ent[0] is loop and not ent[1].is_closed:
+        return ent[1]
+    # drop clients of loops that are gone (tests run one loop per test)
+    for k, (lp, _) in list(_CLIENTS.items()):
+        if lp.is_closed():
+            _CLIENTS.pop(k, None)
+    cli = _build()
+    _CLIENTS[id(loop)] = (loop, cli)
+    return cli
+
+
+async def aclose_http() -> None:
+    """Close the client of the running loop (app shutdown)."""
+    ent = _CLIENTS.pop(id(asyncio.get_running_loop()), None)
+    if ent is not None:
+        try:
+            await ent[1].aclose()
+        except Exception:
+            pass
@@ -1,18 +1,15 @@
 import os
 import json
-from typing import Tuple, Dict, List, Any
+from typing import Any, Callable, Dict, List, Tuple
 import re
 
-from openai import OpenAI
 from sqlalchemy.ext.asyncio import AsyncSession
 from .budget import get_or_init_settings, check_budget_and_maybe_off
+from .llm_gateway import GATEWAY, ZERO_USAGE, run_blocking
 
 
 # Default to a project-allowed model for Chat Completions
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-5-chat-latest")
-# Inisialisasi klien secara aman: jika tidak ada API key, biarkan None agar tidak error saat import
-_KEY = os.getenv("OPENAI_API_KEY")
-_client = OpenAI(api_key=_KEY) if _KEY else None
 
 
 def _opts() -> Dict[str, Any]:
@@ -23,35 +20,42 @@ def _opts() -> Dict[str, Any]:
     }
 
 
-def ask_llm(prompt: str) -> Tuple[str, Dict[str, int]]:
+def _strict() -> bool:
+    return os.getenv("OPENAI_JSON_STRICT", "").strip().lower() in {"1", "true", "yes", "on"}
+
+
+async def ask_llm(
+    prompt: str,
+    timeout: float | None = None,
+    request: Any = None,
+    cache: bool = True,
+    on_delta: Callable[[str], Any] | None = None,
+) -> Tuple[str, Dict[str, int]]:
     """Ask Chat Completions, return (text, usage).
     If OPENAI_JSON_STRICT is truthy, request JSON-only output via response_format.
+    ``request`` ties the call to the HTTP client: a disconnect cancels the completion.
+    ``cache`` serves identical prompts from the shared response cache (usage["cache_hit"]).
+    ``on_delta`` streams the text as it is generated (the full text is still returned).
     """
-    if _client is None:
-        return "", {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
-
-    strict = os.getenv("OPENAI_JSON_STRICT", "").strip().lower() in {"1", "true", "yes", "on"}
+    if not GATEWAY.available():
+        return "", dict(ZERO_USAGE)
     kwargs = {}
-    if strict:
+    if _strict():
         # Require valid JSON object response
         kwargs["response_format"] = {"type": "json_object"}
-
-    resp = _client.chat.completions.create(
-        model=OPENAI_MODEL,
-        messages=[
+    return await GATEWAY.chat(
+        [
             {"role": "system", "content": "Kamu analis kripto. Jawab dalam JSON valid (object) tanpa teks lain."},
             {"role": "user", "content": prompt},
         ],
+        model=OPENAI_MODEL,
+        timeout=timeout,
+        request=request,
+        cache=cache,
+        on_delta=on_delta,
         **_opts(),
         **kwargs,
     )
-    text = resp.choices[0].message.content or ""
-    usage = {
-        "prompt_tokens": getattr(resp.usage, "prompt_tokens", 0),
-        "completion_tokens": getattr(resp.usage, "completion_tokens", 0),
-        "total_tokens": getattr(resp.usage, "total_tokens", 0),
-    }
-    return text, usage
 
 
 async def should_use_llm(db: AsyncSession) -> tuple[bool, str | None]:
@@ -67,15 +71,20 @@ async def should_use_llm(db: AsyncSession) -> tuple[bool, str | None]:
     return True, None
 
 
-def ask_llm_messages(messages: List[Dict[str, str]]) -> Tuple[str, Dict[str, int]]:
+async def ask_llm_messages(
+    messages: List[Dict[str, str]],
+    timeout: float | None = None,
+    request: Any = None,
+    cache: bool = True,
+    on_delta: Callable[[str], Any] | None = None,
+) -> Tuple[str, Dict[str, int]]:
     """Chat Completions with explicit messages. Returns (text, usage).
     Honors OPENAI_JSON_STRICT to require JSON object responses.
     """
-    if _client is None:
-        return "", {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
-    strict = os.getenv("OPENAI_JSON_STRICT", "").strip().lower() in {"1", "true", "yes", "on"}
+    if not GATEWAY.available():
+        return "", dict(ZERO_USAGE)
     kwargs = {}
-    if strict:
+    if _strict():
         kwargs["response_format"] = {"type": "json_object"}
     # optional tool schema to encourage structured output
     try:
@@ -108,19 +117,15 @@ def ask_llm_messages(messages: List[Dict[str, str]]) -> Tuple[str, Dict[str, int
         ])
     except Exception:
         pass
-    resp = _client.chat.completions.create(
-        model=OPENAI_MODEL,
-        messages=messages,
-        **_opts(),
-        **kwargs,
+    return await GATEWAY.chat(
+        messages, model=OPENAI_MODEL, timeout=timeout, request=request, cache=cache, on_delta=on_delta, **_opts(), **kwargs
     )
-    text = resp.choices[0].message.content or ""
-    usage = {
-        "prompt_tokens": getattr(resp.usage, "prompt_tokens", 0),
-        "completion_tokens": getattr(resp.usage, "completion_tokens", 0),
-        "total_tokens": getattr(resp.usage, "total_tokens", 0),
-    }
-    return text, usage
+
+
+def ask_llm_messages_blocking(messages: List[Dict[str, str]]) -> Tuple[str, Dict[str, int]]:
+    """Synchronous ``ask_llm_messages`` for code running off the event loop (plan workers).
+    Skips the response cache: its DB sessions belong to the server's event loop."""
+    return run_blocking(lambda: ask_llm_messages(messages, cache=False))
 
 
 def safe_json_loads(text: str) -> Dict[str, Any]:
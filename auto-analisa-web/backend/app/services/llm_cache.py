@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import datetime as dt
+import hashlib
+import json
+import os
+from typing import Any, Callable, Dict, Optional
+
+
+# Content-addressed cache of LLM responses (table llm_response_cache), shared by every user,
+# endpoint and worker: two identical prompts (same endpoint, model, messages, schema and
+# options) are paid for once per TTL. Lookups are best-effort; any storage error is a miss.
+
+
+def cache_ttl_s() -> float:
+    """LLM_RESPONSE_CACHE_TTL_S (default: LLM_CACHE_TTL_S, 900); 0 disables the cache."""
+    return float(os.getenv("LLM_RESPONSE_CACHE_TTL_S", os.getenv("LLM_CACHE_TTL_S", "900")))
+
+
+def cache_key(path: str, payload: Dict[str, Any]) -> str:
+    canon = json.dumps({"path": path, **payload}, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canon.encode("utf-8")).hexdigest()
+
+
+def _utcnow() -> dt.datetime:
+    return dt.datetime.now(dt.timezone.utc).replace(tzinfo=None)
+
+
+class LLMResponseStore:
+    def __init__(self, session_factory: Optional[Callable[[], Any]] = None):
+        self._factory = session_factory
+
+    @property
+    def session_factory(self) -> Callable[[], Any]:
+        if self._factory is None:
+            from ..storage.db import SessionLocal
+
+            self._factory = SessionLocal
+        return self._factory
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        from ..models import LLMResponseCache
+
+        try:
+            async with self.session_factory() as db:
+                row = await db.get(LLMResponseCache, key)
+                if row is None or row.expires_at <= _utcnow():
+                    return None
+                return dict(row.response or {})
+        except Exception:
+            return None
+
+    async def put(self, key: str, model: str, response: Dict[str, Any], ttl_s: float) -> None:
+        from sqlalchemy import delete
+        from ..models import LLMResponseCache
+
+        now = _utcnow()
+        try:
+            async with self.session_factory() as db:
+                row = await db.get(LLMResponseCache, key)
+                if row is None:
+                    row = LLMResponseCache(key=key)
+                    db.add(row)
+                row.model = str(model or "")[:64]
+                row.response = response
+                row.created_at = now
+                row.expires_at = now + dt.timedelta(seconds=float(ttl_s))
+                await db.execute(delete(LLMResponseCache).where(LLMResponseCache.expires_at < now))
+                await db.commit()
+        except Exception:
+            pass
+
+
+LLM_CACHE = LLMResponseStore()
@@ -0,0 +1,386 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Tuple, TypeVar
+
+from fastapi import HTTPException
+
+
+# Single async gateway for every LLM call (legacy services.llm and services_v2):
+# - requests go through the shared pooled HTTP client instead of a blocking SDK call
+#   or a fresh client per request,
+# - LLM_MAX_CONCURRENCY caps in-flight completions process-wide (per event loop),
+# - every call has a deadline (LLM_TIMEOUT_S) and can be tied to the HTTP request so a
+#   client that disconnects cancels its completion,
+# - identical requests are answered from the content-addressed response cache (llm_cache),
+#   and identical requests already in flight attach to the pending completion,
+# - chat completions can be streamed: ``on_delta`` receives the text as it is generated,
+# - LLM_PROVIDER=fake answers locally (tests, offline development).
+
+T = TypeVar("T")
+
+ZERO_USAGE = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+
+
+class LLMError(Exception):
+    """Non-2xx provider response, with the provider's ``error`` object
+    (``{"code", "type", "param", "message"}``) kept as fields for callers to branch on."""
+
+    def __init__(self, status_code: int, code: str | None = None, message: str = "", type: str | None = None, param: str | None = None):
+        self.status_code = int(status_code)
+        self.code = code
+        self.type = type
+        self.param = param
+        self.message = message
+        super().__init__(f"LLM HTTP {self.status_code} ({code or type or 'error'}): {message}")
+
+    @classmethod
+    def from_response(cls, status_code: int, body: bytes) -> "LLMError":
+        try:
+            err = json.loads(body or b"{}").get("error") or {}
+        except (ValueError, AttributeError):
+            err = {}
+        if not isinstance(err, dict):
+            err = {"message": str(err)}
+        return cls(
+            status_code,
+            code=err.get("code"),
+            message=str(err.get("message") or (body or b"")[:240].decode("utf-8", "replace")),
+            type=err.get("type"),
+            param=err.get("param"),
+        )
+
+
+def _usage(data: Dict[str, Any]) -> Dict[str, Any]:
+    u = dict((data or {}).get("usage") or {})
+    out = {
+        "prompt_tokens": int(u.get("prompt_tokens") or u.get("input_tokens") or 0),
+        "completion_tokens": int(u.get("completion_tokens") or u.get("output_tokens") or 0),
+        "total_tokens": int(u.get("total_tokens") or 0),
+    }
+    if (data or {}).get("_cached"):
+        # served from the response cache or a shared in-flight call: nothing billed,
+        # report what was saved
+        hit = {
+            **ZERO_USAGE,
+            "cache_hit": True,
+            "saved_prompt_tokens": out["prompt_tokens"],
+            "saved_completion_tokens": out["completion_tokens"],
+        }
+        if data.get("_shared"):
+            hit["shared"] = True
+        return hit
+    return out
+
+
+class OpenAIProvider:
+    """OpenAI-compatible REST endpoint (``/chat/completions``, ``/responses``)."""
+
+    name = "openai"
+
+    def __init__(self, api_key: str | None = None, base_url: str | None = None):
+        self.api_key = api_key if api_key is not None else os.getenv("OPENAI_API_KEY", "")
+        self.base_url = (base_url or os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")).rstrip("/")
+
+    def available(self) -> bool:
+        return bool(self.api_key)
+
+    async def post(self, path: str, payload: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        from .http_client import get_http
+
+        r = await get_http().post(
+            f"{self.base_url}/{path.lstrip('/')}",
+            json=payload,
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            timeout=timeout,
+        )
+        if r.status_code >= 400:
+            raise LLMError.from_response(r.status_code, r.content)
+        return r.json()
+
+    async def stream(
+        self, path: str, payload: Dict[str, Any], timeout: float, on_delta: Callable[[str], Any]
+    ) -> Dict[str, Any]:
+        """Streamed chat completion: ``on_delta`` gets each content piece as it arrives; the
+        return value has the same shape as ``post`` (assembled message and usage)."""
+        from .http_client import get_http
+
+        parts: List[str] = []
+        usage: Dict[str, Any] = {}
+        async with get_http().stream(
+            "POST",
+            f"{self.base_url}/{path.lstrip('/')}",
+            json={**payload, "stream": True, "stream_options": {"include_usage": True}},
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            timeout=timeout,
+        ) as r:
+            if r.status_code >= 400:
+                raise LLMError.from_response(r.status_code, await r.aread())
+            async for line in r.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                chunk = line[5:].strip()
+                if chunk == "[DONE]":
+                    break
+                try:
+                    ev = json.loads(chunk)
+                except ValueError:
+                    continue
+                usage = ev.get("usage") or usage
+                for ch in ev.get("choices") or []:
+                    piece = (ch.get("delta") or {}).get("content")
+                    if piece:
+                        parts.append(piece)
+                        on_delta(piece)
+        return {"choices": [{"message": {"content": "".join(parts)}}], "usage": usage}
+
+
+class FakeProvider:
+    """Local provider: answers every call with ``reply`` (str, dict, or a callable taking the
+    payload) after ``delay`` seconds and records the payloads in ``calls``."""
+
+    name = "fake"
+
+    def __init__(self, reply: Any = "{}", delay: float = 0.0, usage: Dict[str, int] | None = None, chunk: int = 8):
+        self.reply = reply
+        self.delay = float(delay)
+        self.chunk = max(1, int(chunk))
+        self.usage = dict(usage or {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15})
+        self.calls: List[Dict[str, Any]] = []
+
+    def available(self) -> bool:
+        return True
+
+    def _answer(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        out = self.reply(payload) if callable(self.reply) else self.reply
+        text = out if isinstance(out, str) else json.dumps(out)
+        if path.endswith("responses"):
+            return {"output": {"content": [{"text": text}]}, "usage": dict(self.usage)}
+        return {"choices": [{"message": {"content": text}}], "usage": dict(self.usage)}
+
+    async def post(self, path: str, payload: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        self.calls.append({"path": path, **payload})
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return self._answer(path, payload)
+
+    async def stream(
+        self, path: str, payload: Dict[str, Any], timeout: float, on_delta: Callable[[str], Any]
+    ) -> Dict[str, Any]:
+        """Like ``post`` but hands the reply to ``on_delta`` in ``chunk``-sized pieces,
+        spreading ``delay`` across them."""
+        self.calls.append({"path": path, "stream": True, **payload})
+        data = self._answer(path, payload)
+        text = data["choices"][0]["message"]["content"]
+        pieces = [text[i:i + self.chunk] for i in range(0, len(text), self.chunk)]
+        for piece in pieces:
+            if self.delay:
+                await asyncio.sleep(self.delay / len(pieces))
+            on_delta(piece)
+        return data
+
+
+def provider_from_env():
+    if os.getenv("LLM_PROVIDER", "openai").strip().lower() == "fake":
+        return FakeProvider()
+    return OpenAIProvider()
+
+
+async def cancel_on_disconnect(request: Any, aw: Awaitable[T], poll_s: float | None = None) -> T:
+    """Await ``aw`` while watching ``request``; a client disconnect cancels it (HTTP 499)."""
+    if request is None:
+        return await aw
+    poll = float(poll_s if poll_s is not None else os.getenv("LLM_DISCONNECT_POLL_S", "0.5"))
+    task = asyncio.ensure_future(aw)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                raise HTTPException(499, detail={"error_code": "client_closed", "message": "Klien memutus koneksi"})
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+class LLMGateway:
+    def __init__(
+        self,
+        provider: Any = None,
+        max_concurrency: int | None = None,
+        timeout_s: float | None = None,
+        cache: Any = None,
+    ):
+        self.provider = provider
+        self.max_concurrency = max_concurrency
+        self.timeout_s = timeout_s
+        self.cache = cache
+        # semaphores are bound to the loop that first uses them (tests run one loop per test)
+        self._sems: Dict[int, Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = {}
+        # pending completions by (loop, request key) -> [task, number of waiting callers]
+        self._inflight: Dict[Tuple[asyncio.AbstractEventLoop, str], List[Any]] = {}
+
+    def _provider(self, override: Any = None):
+        if override is not None:
+            return override
+        if self.provider is None:
+            self.provider = provider_from_env()
+        return self.provider
+
+    def _sem(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        ent = self._sems.get(id(loop))
+        if ent is None or ent[0] is not loop:
+            n = self.max_concurrency or int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+            for k, (lp, _) in list(self._sems.items()):
+                if lp.is_closed():
+                    self._sems.pop(k, None)
+            ent = (loop, asyncio.Semaphore(max(1, n)))
+            self._sems[id(loop)] = ent
+        return ent[1]
+
+    def available(self) -> bool:
+        try:
+            return bool(self._provider().available())
+        except Exception:
+            return False
+
+    async def call(
+        self,
+        path: str,
+        payload: Dict[str, Any],
+        timeout: float | None = None,
+        request: Any = None,
+        provider: Any = None,
+        cache: bool = True,
+        on_delta: Callable[[str], Any] | None = None,
+    ) -> Dict[str, Any]:
+        """POST ``payload`` under the concurrency cap; ``timeout`` bounds the completion itself.
+
+        With ``cache`` an identical earlier request (same endpoint and payload) is answered
+        from the response cache. Identical concurrent requests share one completion: the
+        first caller starts it, later callers wait on it, and it is only cancelled once every
+        caller has gone. Responses not paid for by this caller carry ``_cached: True``.
+        ``on_delta`` streams the completion when this caller starts it and the provider
+        supports streaming; cached and shared responses arrive whole.
+        """
+        prov = self._provider(provider)
+        t = float(timeout or self.timeout_s or os.getenv("LLM_TIMEOUT_S", "60"))
+        from .llm_cache import LLM_CACHE, cache_key, cache_ttl_s
+
+        ttl = cache_ttl_s() if cache else 0.0
+        store = self.cache or LLM_CACHE
+        key = cache_key(f"{getattr(prov, 'base_url', '')}/{path}", payload)
+        if ttl > 0:
+            hit = await store.get(key)
+            if hit is not None:
+                return {**hit, "_cached": True}
+
+        async def run() -> Dict[str, Any]:
+            async with self._sem():
+                try:
+                    if on_delta is not None and hasattr(prov, "stream"):
+                        aw = prov.stream(path, payload, t, on_delta)
+                    else:
+                        aw = prov.post(path, payload, t)
+                    data = await asyncio.wait_for(aw, t)
+                except asyncio.TimeoutError:
+                    raise TimeoutError(f"LLM request timed out after {t:g}s") from None
+            if ttl > 0:
+                await store.put(key, str(payload.get("model") or ""), data, ttl)
+            return data
+
+        slot = (asyncio.get_running_loop(), key)
+        ent = self._inflight.get(slot)
+        owner = ent is None
+        if owner:
+            ent = [asyncio.ensure_future(run()), 0]
+            self._inflight[slot] = ent
+            ent[0].add_done_callback(lambda _t, e=ent: self._inflight.pop(slot, None) if self._inflight.get(slot) is e else None)
+        ent[1] += 1
+        try:
+            data = await cancel_on_disconnect(request, asyncio.shield(ent[0]))
+        finally:
+            ent[1] -= 1
+            if ent[1] == 0 and not ent[0].done():
+                ent[0].cancel()
+        return data if owner else {**data, "_cached": True, "_shared": True}
+
+    async def chat(
+        self,
+        messages: List[Dict[str, Any]],
+        model: str | None = None,
+        timeout: float | None = None,
+        request: Any = None,
+        cache: bool = True,
+        on_delta: Callable[[str], Any] | None = None,
+        **opts: Any,
+    ) -> Tuple[str, Dict[str, Any]]:
+        payload = {"model": model or os.getenv("OPENAI_MODEL", "gpt-5-chat-latest"), "messages": messages, **opts}
+        data = await self.call("chat/completions", payload, timeout=timeout, request=request, cache=cache, on_delta=on_delta)
+        try:
+            text = data["choices"][0]["message"].get("content") or ""
+        except Exception:
+            text = ""
+        if on_delta is not None and data.get("_cached") and text:
+            on_delta(text)
+        return text, _usage(data)
+
+    async def structured(
+        self,
+        system: str,
+        user: str,
+        json_schema: dict,
+        model: str | None = None,
+        timeout: float | None = None,
+        request: Any = None,
+        provider: Any = None,
+    ) -> Dict[str, Any]:
+        """Responses API call with a strict ``json_schema``; returns the parsed object."""
+        payload = {
+            "model": model or os.getenv("MODEL_RESPONSES", os.getenv("OPENAI_MODEL", "gpt-4.1-mini")),
+            "input": [
+                {"role": "system", "content": system},
+                {"role": "user", "content": user},
+            ],
+            "response_format": {
+                "type": "json_schema",
+                "json_schema": {"name": "AutoAnalisaV2", "schema": json_schema, "strict": True},
+            },
+        }
+        data = await self.call("responses", payload, timeout=timeout, request=request, provider=provider)
+        # Responses API returns a structured envelope; try to extract text
+        try:
+            content = data["output"]["content"][0]["text"]
+        except Exception:
+            content = data
+        if isinstance(content, str):
+            return json.loads(content)
+        return content
+
+
+GATEWAY = LLMGateway()
+
+
+def run_blocking(fn: Callable[[], Awaitable[T]]) -> T:
+    """Run a gateway coroutine from synchronous code off the event loop (plan workers)."""
+    from .http_client import aclose_http
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    else:
+        raise RuntimeError("run_blocking() called from a running event loop; await the gateway instead")
+
+    async def once() -> T:
+        try:
+            return await fn()
+        finally:
+            await aclose_http()
+
+    return asyncio.run(once())
@@ -39,3 +39,15 @@ class LockService:
             except Exception:
                 pass
         self.local.pop(namespaced, None)
+
+    async def extend(self, key: str, ttl: int = 30) -> None:
+        """Push back the expiry of a lock we hold (long-running jobs)."""
+        namespaced = f"{self.ns}:{key}"
+        if self.r:
+            try:
+                await self.r.expire(namespaced, ttl)
+                return
+            except Exception:
+                pass
+        if namespaced in self.local:
+            self.local[namespaced] = time.time() + ttl
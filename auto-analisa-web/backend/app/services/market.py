@@ -1,13 +1,32 @@
-import ccxt
+import asyncio
 import os
 import pandas as pd
-from typing import Dict
+from typing import Any, Dict
 from .cache import MarketCache
 
 
-ex = ccxt.binance()
-ex_usdm = ccxt.binanceusdm()
 _MC = MarketCache()
+_CLIENTS: Dict[str, Any] = {}
+
+
+def client(market: str = "spot"):
+    """Shared ccxt client, built on first use (ccxt import + construction stay out of app import)."""
+    kind = "futures" if str(market).lower() == "futures" else "spot"
+    c = _CLIENTS.get(kind)
+    if c is None:
+        import ccxt
+
+        c = _CLIENTS[kind] = ccxt.binanceusdm() if kind == "futures" else ccxt.binance()
+    return c
+
+
+def __getattr__(name: str):
+    # legacy module attributes ``market.ex`` / ``market.ex_usdm``
+    if name == "ex":
+        return client("spot")
+    if name == "ex_usdm":
+        return client("futures")
+    raise AttributeError(name)
 
 _TTL = {
     "1m": 30,
@@ -32,7 +51,7 @@ def _normalize_symbol(sym: str) -> str:
 
 
 async def fetch_klines(symbol: str, timeframe: str, limit: int = 500, market: str = "spot") -> pd.DataFrame:
-    # catatan: ccxt sync; untuk lokal ok dipanggil di fungsi async
+    # catatan: ccxt sync; panggilan jaringan dijalankan di worker thread agar event loop tidak terblokir
     symbol = _normalize_symbol(symbol)
     # In-memory cache to accelerate repeated calls
     ttl = _TTL.get(str(timeframe), 120)
@@ -57,7 +76,7 @@ async def fetch_klines(symbol: str, timeframe: str, limit: int = 500, market: st
             # Anchor synthetic base near spot price when possible
             base = 100.0
             try:
-                t = ex.fetch_ticker(symbol)
+                t = client("spot").fetch_ticker(symbol)
                 last = t.get("last") or t.get("close")
                 if isinstance(last, (int, float)) and last > 0:
                     base = float(last)
@@ -73,15 +92,14 @@ async def fetch_klines(symbol: str, timeframe: str, limit: int = 500, market: st
         except Exception:
             pass
     try:
-        client = ex if str(market).lower() != "futures" else ex_usdm
-        ohlcv = client.fetch_ohlcv(symbol, timeframe=timeframe, limit=limit)
+        ohlcv = await asyncio.to_thread(client(market).fetch_ohlcv, symbol, timeframe=timeframe, limit=limit)
         df = pd.DataFrame(ohlcv, columns=["ts", "open", "high", "low", "close", "volume"])
         _MC.set(key, df)
         return df
     except Exception:
         # If futures failed, try spot OHLCV as a close visual proxy
         try:
-            alt = ex.fetch_ohlcv(symbol, timeframe=timeframe, limit=limit)
+            alt = await asyncio.to_thread(client("spot").fetch_ohlcv, symbol, timeframe=timeframe, limit=limit)
             df = pd.DataFrame(alt, columns=["ts", "open", "high", "low", "close", "volume"])
             _MC.set(key, df)
             return df
@@ -100,7 +118,7 @@ async def fetch_klines(symbol: str, timeframe: str, limit: int = 500, market: st
             ts = np.array([now - step * (n - i) for i in range(n)], dtype=np.int64)
             base = 100.0
             try:
-                t = ex.fetch_ticker(symbol)
+                t = client("spot").fetch_ticker(symbol)
                 last = t.get("last") or t.get("close")
                 if isinstance(last, (int, float)) and last > 0:
                     base = float(last)
@@ -133,8 +151,7 @@ async def fetch_spread(symbol: str, market: str = "futures") -> float:
     calling from async is acceptable for local use.
     """
     try:
-        client = ex_usdm if str(market).lower() == "futures" else ex
-        ob = client.fetch_order_book(_normalize_symbol(symbol), limit=5)
+        ob = client(market).fetch_order_book(_normalize_symbol(symbol), limit=5)
         best_ask = float(ob['asks'][0][0]) if ob.get('asks') else None
         best_bid = float(ob['bids'][0][0]) if ob.get('bids') else None
         if best_ask is None or best_bid is None:
@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+# One shared Binance market-metadata index (spot + USDT-M futures) for rounding, sizing,
+# symbol lists and universe scans. Loaded once (disk snapshot first for fast cold start),
+# refreshed in the background, and read as plain dictionary lookups.
+
+META_PATH = os.getenv("MARKET_META_PATH", "/tmp/autoanalisa_market_meta.json")
+META_TTL_S = int(os.getenv("MARKET_META_TTL_S", "21600"))
+# failed network loads are retried after 30s, doubling up to 30min
+META_RETRY_S = float(os.getenv("MARKET_META_RETRY_S", "30"))
+META_RETRY_MAX_S = float(os.getenv("MARKET_META_RETRY_MAX_S", "1800"))
+
+
+def norm_key(symbol: str) -> str:
+    """'BTC/USDT', 'BTC/USDT:USDT', 'btcusdt' -> 'BTCUSDT'."""
+    s = str(symbol).upper().strip()
+    if ":" in s:
+        s = s.split(":", 1)[0]
+    return s.replace("/", "")
+
+
+def _decimals(step: float | None) -> int | None:
+    if step is None or step <= 0:
+        return None
+    s = f"{step:.12f}".rstrip('0').rstrip('.')
+    return len(s.split('.')[1]) if '.' in s else 0
+
+
+def _increment(m: Dict[str, Any], field: str, limit_key: str) -> float | None:
+    """Price/amount increment from ccxt metadata.
+
+    precision as int -> decimals (10^-p); as float -> tick size (ccxt TICK_SIZE mode);
+    otherwise limits.<field>.min as a proxy.
+    """
+    prec = (m.get("precision") or {}).get(field)
+    if isinstance(prec, int) and not isinstance(prec, bool):
+        return float(10 ** (-prec)) if prec > 0 else 1.0
+    if isinstance(prec, float) and prec > 0:
+        return prec
+    lim = ((m.get("limits") or {}).get(limit_key) or {}).get("min")
+    try:
+        return float(lim) or None
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class MarketInfo:
+    symbol: str  # normalized key, e.g. BTCUSDT
+    unified: str  # ccxt unified symbol
+    base: str
+    quote: str
+    active: bool
+    tick_size: float | None
+    step_size: float | None
+    price_decimals: int | None
+    amount_decimals: int | None
+    quote_precision: int | None = None
+
+
+def _info(m: Dict[str, Any]) -> MarketInfo:
+    tick = _increment(m, "price", "price")
+    step = _increment(m, "amount", "amount")
+    try:
+        qp = int((m.get("info") or {}).get("quotePrecision"))
+    except (TypeError, ValueError):
+        qp = None
+    return MarketInfo(
+        symbol=norm_key(m.get("symbol") or m.get("id") or ""),
+        unified=str(m.get("symbol") or ""),
+        base=str(m.get("base") or "").upper(),
+        quote=str(m.get("quote") or "").upper(),
+        active=bool(m.get("active", True) if m.get("active") is not None else True),
+        tick_size=tick,
+        step_size=step,
+        price_decimals=_decimals(tick),
+        amount_decimals=_decimals(step),
+        quote_precision=qp,
+    )
+
+
+class MarketMetaService:
+    def __init__(self, path: str | None = META_PATH, ttl_s: float = META_TTL_S):
+        self.path = Path(path) if path else None
+        self.ttl = float(ttl_s)
+        self.spot: Dict[str, MarketInfo] = {}
+        self.futures: Dict[str, MarketInfo] = {}
+        self.spot_symbols: List[str] = []  # unified spot USDT symbols
+        self.futures_symbols: List[str] = []  # unified contract symbols
+        self.loaded_at: float = 0.0
+        self.next_retry_at: float = 0.0
+        self._failures = 0
+        self._lock = threading.Lock()
+        self._bg: tuple | None = None  # (loop, future) of a background first load
+
+    # --- building -------------------------------------------------------------
+    def _exchange(self):
+        import ccxt
+
+        return ccxt.binance({"enableRateLimit": True})
+
+    def ingest(self, markets: Dict[str, Dict[str, Any]], loaded_at: float | None = None) -> None:
+        spot: Dict[str, MarketInfo] = {}
+        fut: Dict[str, MarketInfo] = {}
+        spot_syms: List[str] = []
+        fut_syms: List[str] = []
+        for key, m in markets.items():
+            m = dict(m or {})
+            m.setdefault("symbol", key)
+            if m.get("spot") and m.get("quote") == "USDT":
+                spot_syms.append(key)
+            if m.get("future") or m.get("contract"):
+                fut_syms.append(key)
+            info = _info(m)
+            if not info.symbol:
+                continue
+            if m.get("spot"):
+                spot.setdefault(info.symbol, info)
+            # perpetual linear contract wins over dated futures for the same key
+            elif (m.get("contract") or m.get("future")) and (m.get("linear") is not False):
+                if m.get("swap") or info.symbol not in fut:
+                    fut[info.symbol] = info
+        self.spot, self.futures = spot, fut
+        self.spot_symbols, self.futures_symbols = sorted(spot_syms), sorted(fut_syms)
+        self.loaded_at = time.time() if loaded_at is None else float(loaded_at)
+
+    def _fetch(self) -> Dict[str, Dict[str, Any]]:
+        return self._exchange().load_markets()
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        try:
+            doc = {
+                "loaded_at": self.loaded_at,
+                "spot": [asdict(v) for v in self.spot.values()],
+                "futures": [asdict(v) for v in self.futures.values()],
+                "spot_symbols": self.spot_symbols,
+                "futures_symbols": self.futures_symbols,
+            }
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(doc), encoding="utf-8")
+            tmp.replace(self.path)
+        except Exception:
+            pass
+
+    def _load_disk(self) -> bool:
+        if not self.path or not self.path.exists():
+            return False
+        try:
+            doc = json.loads(self.path.read_text(encoding="utf-8"))
+            self.spot = {d["symbol"]: MarketInfo(**d) for d in doc.get("spot") or []}
+            self.futures = {d["symbol"]: MarketInfo(**d) for d in doc.get("futures") or []}
+            self.spot_symbols = list(doc.get("spot_symbols") or [])
+            self.futures_symbols = list(doc.get("futures_symbols") or [])
+            self.loaded_at = float(doc.get("loaded_at") or 0.0)
+            return bool(self.spot or self.futures)
+        except Exception:
+            return False
+
+    def refresh_sync(self) -> bool:
+        try:
+            markets = self._fetch()
+        except Exception:
+            self._failures += 1
+            delay = min(META_RETRY_S * 2 ** (self._failures - 1), META_RETRY_MAX_S)
+            self.next_retry_at = time.time() + delay
+            return False
+        with self._lock:
+            self.ingest(markets)
+            self._save()
+            self._failures, self.next_retry_at = 0, 0.0
+        return True
+
+    async def refresh(self) -> bool:
+        return await asyncio.to_thread(self.refresh_sync)
+
+    def ensure_loaded(self) -> bool:
+        """Load once: disk snapshot first, network otherwise. Never raises.
+
+        While offline the network load is retried with backoff (``next_retry_at``), not on
+        every call."""
+        if self.loaded_at:
+            return bool(self.spot or self.futures)
+        with self._lock:
+            if not self.loaded_at and self._load_disk():
+                return True
+        if not self.loaded_at and time.time() >= self.next_retry_at:
+            self.refresh_sync()
+        return bool(self.spot or self.futures)
+
+    def _ensure_for_read(self) -> None:
+        """Reads on an event loop never block it on disk or network: the first load runs
+        in a worker thread (or in ``run()``) and reads return None until it lands."""
+        if self.loaded_at:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.ensure_loaded()
+            return
+        if self._bg is not None and self._bg[0] is loop and not self._bg[1].done():
+            return
+        if time.time() < self.next_retry_at:
+            return
+        self._bg = (loop, loop.run_in_executor(None, self.ensure_loaded))
+
+    def is_stale(self) -> bool:
+        return self.loaded_at <= 0 or (time.time() - self.loaded_at) > self.ttl
+
+    async def run(self, interval_s: float = 3600.0) -> None:
+        """Background refresh loop (first pass only when the disk snapshot is stale)."""
+        while True:
+            try:
+                await asyncio.to_thread(self.ensure_loaded)
+                if self.is_stale():
+                    await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                pass
+            await asyncio.sleep(float(interval_s))
+
+    def reset(self) -> None:
+        self.spot, self.futures = {}, {}
+        self.spot_symbols, self.futures_symbols = [], []
+        self.loaded_at = 0.0
+        self.next_retry_at, self._failures = 0.0, 0
+        self._bg = None
+
+    # --- O(1) reads -------------------------------------------------------------
+    def get(self, symbol: str, kind: str = "spot") -> Optional[MarketInfo]:
+        self._ensure_for_read()
+        idx = self.futures if str(kind).lower() in {"futures", "future", "usdm", "swap"} else self.spot
+        return idx.get(norm_key(symbol))
+
+    def flags(self, symbol: str) -> Dict[str, bool]:
+        self._ensure_for_read()
+        k = norm_key(symbol)
+        return {"spot": k in self.spot, "futures": k in self.futures}
+
+    def usdt_bases(self, kind: str = "futures") -> List[str]:
+        self._ensure_for_read()
+        idx = self.futures if kind == "futures" else self.spot
+        return sorted({i.base for i in idx.values() if i.active and i.quote == "USDT"})
+
+
+def snap_down(v: float, step: float | None, decimals: int | None = None) -> float:
+    """Floor ``v`` to a multiple of ``step`` (ccxt TRUNCATE semantics)."""
+    if step is None or step <= 0:
+        return float(v)
+    out = math.floor(float(v) / step + 1e-9) * step
+    return round(out, decimals) if decimals is not None else float(out)
+
+
+META = MarketMetaService()
@@ -1,95 +1,117 @@
 from __future__ import annotations
 
-from typing import List, Dict
+import asyncio
+import os
+from typing import List, Dict, Optional
 
+import numpy as np
 import pandas as pd
-import ccxt  # type: ignore
-
+from .cache import AsyncMemo, seconds_to_next_bar
 from .market import fetch_klines
+from .market_meta import META
 
 
 EX_STABLES = {"USDT", "USDC", "BUSD", "FDUSD", "DAI", "TUSD"}
 WINDOWS_H = {"fast": 12, "medium": 24, "swing": 24 * 7}  # hours
+FETCH_CONCURRENCY = int(os.getenv("OUTPERFORMER_CONCURRENCY", "16"))
+
+_MEMO = AsyncMemo()
 
 
 async def _load_symbols_usdt(market: str = 'binanceusdm') -> List[str]:
+    """USDT symbol universe from the shared market-metadata index (no per-call load_markets)."""
     market = (market or 'binanceusdm').lower()
-    if 'usdm' in market or 'futures' in market:
-        ex = ccxt.binanceusdm()
-    else:
-        ex = ccxt.binance()
+    kind = 'futures' if ('usdm' in market or 'futures' in market) else 'spot'
     try:
-        mkts = ex.load_markets()
-        syms: List[str] = []
-        for m in mkts.values():
+        await asyncio.to_thread(META.ensure_loaded)
+        syms = [f"{b}USDT" for b in META.usdt_bases(kind) if b not in EX_STABLES]
+    except Exception:
+        syms = []
+    # Fallback minimal universe
+    return syms or ["BTCUSDT", "ETHUSDT", "BNBUSDT", "XRPUSDT"]
+
+
+async def _fetch_closes(symbols: List[str], limit: int, market_type: str) -> Dict[str, pd.Series]:
+    """Fetch 1h closes concurrently (bounded); failed/short symbols are dropped."""
+    sem = asyncio.Semaphore(max(1, FETCH_CONCURRENCY))
+
+    async def one(s: str) -> Optional[pd.Series]:
+        async with sem:
             try:
-                if not m.get('active', True):
-                    continue
-                base = str(m.get('base') or '').upper()
-                quote = str(m.get('quote') or '').upper()
-                if quote != 'USDT':
-                    continue
-                # Skip stables
-                if base in EX_STABLES:
-                    continue
-                # Use unified symbol without slash (e.g., BTCUSDT) for consistency
-                syms.append(f"{base}USDT")
+                df = await fetch_klines(s, '1h', limit=limit, market=market_type)
             except Exception:
-                continue
-        # Deduplicate
-        return sorted(list(dict.fromkeys(syms)))
-    except Exception:
-        # Fallback minimal universe
-        return ["BTCUSDT", "ETHUSDT", "BNBUSDT", "XRPUSDT"]
+                return None
+        if df is None or len(df) < 2:
+            return None
+        return pd.Series(pd.to_numeric(df['close'], errors='coerce').to_numpy(dtype='float64'), index=df['ts'].to_numpy())
+
+    res = await asyncio.gather(*(one(s) for s in symbols))
+    return {s: r for s, r in zip(symbols, res) if r is not None}
+
+
+def rank_outperformers(closes: Dict[str, pd.Series], btc: pd.Series) -> pd.DataFrame:
+    """Score all symbols at once from an aligned N x T close matrix.
+
+    ret = last/first - 1 per row, rs = ret - btc_ret, alpha_z = z-score of rs across the universe.
+    """
+    if not closes or len(btc) < 2:
+        return pd.DataFrame(columns=['symbol', 'ret', 'rs', 'alpha_z', 'score'])
+    syms = list(closes.keys())
+    # align every series on the union of timestamps (T), one column per symbol (N)
+    mat = pd.concat(closes.values(), axis=1, keys=syms).sort_index().to_numpy(dtype='float64').T  # N x T
+    valid = np.isfinite(mat)
+    first_idx = valid.argmax(axis=1)
+    last_idx = mat.shape[1] - 1 - valid[:, ::-1].argmax(axis=1)
+    rows = np.arange(mat.shape[0])
+    first = mat[rows, first_idx]
+    last = mat[rows, last_idx]
+    ok = valid.any(axis=1) & (last_idx > first_idx) & (first != 0)
+    ret = np.where(ok, last / np.where(first == 0, 1.0, first) - 1.0, np.nan)
+    btc_ret = float(btc.iloc[-1] / btc.iloc[0] - 1.0)
+    rs = ret - btc_ret
+    df = pd.DataFrame({'symbol': syms, 'ret': ret, 'rs': rs})[ok].reset_index(drop=True)
+    if df.empty:
+        return pd.DataFrame(columns=['symbol', 'ret', 'rs', 'alpha_z', 'score'])
+    # alpha z-score on RS
+    x = df['rs'].to_numpy()
+    sd = float(x.std(ddof=0)) or 1.0
+    df['alpha_z'] = (x - float(x.mean())) / sd
+    # Composite score (simple): emphasize RS, add alpha_z gently
+    df['score'] = df['rs'] + 0.10 * df['alpha_z']
+    return df.sort_values('score', ascending=False, kind='stable').reset_index(drop=True)
 
 
-async def compute_outperformers(mode: str, market: str = 'binanceusdm', limit: int = 10) -> List[Dict]:
+async def _scan(mode: str, market: str) -> Optional[pd.DataFrame]:
     lookback_h = WINDOWS_H.get(str(mode), 24)
     market_type = 'futures' if ('usdm' in str(market).lower() or 'futures' in str(market).lower()) else 'spot'
+    limit = max(lookback_h + 1, 2)
 
     syms = await _load_symbols_usdt(market=market)
-
     # Benchmark BTC ret over the same 1h horizon
-    btc_df = await fetch_klines('BTCUSDT', '1h', limit=max(lookback_h + 1, 2), market=market_type)
+    btc_df = await fetch_klines('BTCUSDT', '1h', limit=limit, market=market_type)
     if btc_df is None or len(btc_df) < 2:
-        return []
-    btc_ret = float(btc_df['close'].iloc[-1] / btc_df['close'].iloc[0] - 1.0)
-
-    rows = []
-    for s in syms:
-        try:
-            df = await fetch_klines(s, '1h', limit=max(lookback_h + 1, 2), market=market_type)
-            if df is None or len(df) < 2:
-                continue
-            ret = float(df['close'].iloc[-1] / df['close'].iloc[0] - 1.0)
-            rs = ret - btc_ret
-            rows.append({'symbol': s, 'ret': ret, 'rs': rs})
-        except Exception:
-            continue
-
-    if not rows:
-        return []
+        return None  # not cached; retried on the next request
+    closes = await _fetch_closes(syms, limit, market_type)
+    table = rank_outperformers(closes, btc_df['close'].astype('float64'))
+    return table if not table.empty else None
 
-    df = pd.DataFrame(rows)
-    # alpha z-score on RS
-    try:
-        mu = float(df['rs'].mean())
-        sd = float(df['rs'].std(ddof=0) or 1.0)
-        df['alpha_z'] = (df['rs'] - mu) / sd
-    except Exception:
-        df['alpha_z'] = 0.0
-
-    # Composite score (simple): emphasize RS, add alpha_z gently
-    df['score'] = df['rs'] + 0.10 * df['alpha_z']
-    df.sort_values('score', ascending=False, inplace=True)
-
-    out: List[Dict] = []
-    for _, r in df.head(int(limit or 10)).iterrows():
-        out.append({
-            'symbol': str(r['symbol']),
-            'score': round(float(r['score']), 6),
-            'rsh': round(float(r['ret']), 6),
-            'alpha_z': round(float(r['alpha_z']), 2),
-        })
-    return out
 
+async def compute_outperformers(mode: str, market: str = 'binanceusdm', limit: int = 10) -> List[Dict]:
+    # whole-universe ranking is cached per (mode, market) until the next 1h candle closes
+    table = await _MEMO.get_or_compute(
+        ('scan', str(mode), str(market).lower()),
+        lambda: seconds_to_next_bar('1h'),
+        lambda: _scan(mode, market),
+    )
+    if table is None:
+        return []
+    top = table.head(int(limit or 10))
+    return [
+        {
+            'symbol': str(s),
+            'score': round(float(sc), 6),
+            'rsh': round(float(r), 6),
+            'alpha_z': round(float(z), 2),
+        }
+        for s, sc, r, z in zip(top['symbol'], top['score'], top['ret'], top['alpha_z'])
+    ]
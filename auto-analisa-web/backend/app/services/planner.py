@@ -1,6 +1,6 @@
 from .rules import make_levels, Features
 from .regime import detect_regime
-from .strategies_spot import plan_pb, plan_bo, plan_rr, plan_sr, plan_ff, _confirmations
+from .strategies_spot import plan_pb, plan_bo, plan_rr, plan_sr, plan_ff, _confirmations, snapshot
 from .fvg import detect_fvg
 from .supply_demand import detect_zones
 from .budget import get_or_init_settings
@@ -9,31 +9,61 @@ from .rounding import round_plan_prices
 import math
 
 
-async def build_plan_async(db, bundle, feat: "Features", score: int, mode: str = "auto"):
-    lv = make_levels(feat)
-    reg = detect_regime(bundle)
+# detect_fvg keyword defaults; the FF candidate uses these so the overlay can reuse its result
+_FVG_DEFAULTS = {"use_bodies": False, "fill_rule": "any_touch", "threshold_pct": 0.0, "threshold_auto": False}
 
-    base_candidates: list[dict] = []
-    base_candidates.append(plan_pb(bundle, lv))
-    base_candidates.append(plan_bo(bundle, lv))
-    base_candidates.append(plan_rr(bundle, lv))
-    base_candidates.append(plan_sr(bundle, lv))
 
-    # deteksi opsional FVG untuk kandidat FF
-    extras = {}
-    try:
-        extras["fvg"] = detect_fvg(bundle.get("15m") or list(bundle.values())[0])[:1]
-    except Exception:
-        extras["fvg"] = []
-    if extras.get("fvg"):
-        base_candidates.append(plan_ff(bundle, lv, fvg=extras["fvg"][0]))
+class PlanContext:
+    """Per-request market context shared by candidate generators, scoring and overlays.
 
-    candidate_results: list[dict] = []
-    for cand in base_candidates:
+    Levels, regime and the last-15m snapshot (close/ATR/VWAP/EMA) are computed once;
+    FVG and supply/demand detection are memoized by (tf, parameters) so the candidate
+    stage and the overlay stage share one run when their parameters match.
+    """
+
+    def __init__(self, bundle, feat: "Features"):
+        self.bundle = bundle
+        self.levels = make_levels(feat)
+        self.regime = detect_regime(bundle)
+        self.snap = snapshot(bundle)
+        self._fvg: dict = {}
+        self._zones: dict = {}
+
+    @property
+    def atr15(self) -> float:
+        return float(self.snap.get("a") or 0.0)
+
+    def frame(self, *tfs):
+        for tf in tfs:
+            df = self.bundle.get(tf)
+            if df is not None:
+                return df
+        return next(iter(self.bundle.values()))
+
+    def fvg(self, tf: str = "15m", **params) -> list:
+        key = (tf, tuple(sorted(params.items())))
+        if key not in self._fvg:
+            self._fvg[key] = detect_fvg(self.frame(tf, "15m"), **params)
+        return self._fvg[key]
+
+    def zones(self, tf: str = "1h", **params) -> list:
+        key = (tf, tuple(sorted(params.items())))
+        if key not in self._zones:
+            self._zones[key] = detect_zones(self.frame(tf, "15m"), **params)
+        return self._zones[key]
+
+
+def _evaluate_candidates(cands: list[dict], ctx: PlanContext) -> list[dict]:
+    """Validate and score all candidates in one pass over the shared context."""
+    lv, reg = ctx.levels, ctx.regime
+    swing_highs = lv.get("swing_highs", [])
+    swing_lows = lv.get("swing_lows", [])
+    out: list[dict] = []
+    for cand in cands:
         seed = dict(cand)
         seed.setdefault("confirmations", _confirmations(seed.get("mode")))
-        seed["swing_highs"] = lv.get("swing_highs", [])
-        seed["swing_lows"] = lv.get("swing_lows", [])
+        seed["swing_highs"] = swing_highs
+        seed["swing_lows"] = swing_lows
         normalized, warns = normalize_and_validate(
             seed,
             rr_target=1.6,
@@ -45,10 +75,34 @@ async def build_plan_async(db, bundle, feat: "Features", score: int, mode: str =
         merged["warnings"].extend(warns)
         merged.setdefault("flags", {}).update((normalized or {}).get("flags") or {})
         merged["regime"] = reg
-        score_val, score_detail = _score_candidate(merged, reg, bundle)
+        score_val, score_detail = _score_candidate(merged, reg, ctx.bundle, ctx=ctx)
         merged["score_computed"] = score_val
         merged["score_detail"] = score_detail
-        candidate_results.append(merged)
+        out.append(merged)
+    return out
+
+
+async def build_plan_async(db, bundle, feat: "Features", score: int, mode: str = "auto"):
+    ctx = PlanContext(bundle, feat)
+    lv, reg, snap = ctx.levels, ctx.regime, ctx.snap
+
+    base_candidates: list[dict] = [
+        plan_pb(bundle, lv, snap),
+        plan_bo(bundle, lv, snap),
+        plan_rr(bundle, lv, snap),
+        plan_sr(bundle, lv, snap),
+    ]
+
+    # deteksi opsional FVG untuk kandidat FF (default params; dipakai ulang oleh overlay bila sama)
+    extras = {}
+    try:
+        extras["fvg"] = ctx.fvg("15m", **_FVG_DEFAULTS)[:1]
+    except Exception:
+        extras["fvg"] = []
+    if extras.get("fvg"):
+        base_candidates.append(plan_ff(bundle, lv, fvg=extras["fvg"][0], snap=snap))
+
+    candidate_results = _evaluate_candidates(base_candidates, ctx)
 
     ordered = sorted(candidate_results, key=lambda x: x.get("score_computed", -1e9), reverse=True)
     best = ordered[0] if ordered else {}
@@ -86,10 +140,7 @@ async def build_plan_async(db, bundle, feat: "Features", score: int, mode: str =
     try:
         hard_1h = float(plan.get("invalid", 0.0)) if plan.get("invalid") is not None else None
         # Soft 15m: sedikit lebih longgar di atas hard_1h (buffer kecil berbasis ATR15m)
-        try:
-            atr15 = float(bundle["15m"].iloc[-1].atr14)
-        except Exception:
-            atr15 = 0.0
+        atr15 = ctx.atr15
         buf = max(atr15 * 0.1, abs(hard_1h) * 1e-4) if hard_1h is not None else None
         soft_15m = (hard_1h + (buf or 0.0)) if hard_1h is not None else None
         # Tactical 5m: buffer lebih kecil dari soft
@@ -107,19 +158,16 @@ async def build_plan_async(db, bundle, feat: "Features", score: int, mode: str =
     try:
         s = await get_or_init_settings(db)
         if getattr(s, "enable_fvg", False):
-            fvg_tf = str(getattr(s, "fvg_tf", "15m"))
-            df_fvg = bundle.get(fvg_tf) or bundle.get("15m") or list(bundle.values())[0]
-            plan["fvg"] = detect_fvg(
-                df_fvg,
+            plan["fvg"] = ctx.fvg(
+                str(getattr(s, "fvg_tf", "15m")),
                 use_bodies=bool(getattr(s, "fvg_use_bodies", False)),
                 fill_rule=str(getattr(s, "fvg_fill_rule", "any_touch")),
                 threshold_pct=float(getattr(s, "fvg_threshold_pct", 0.0) or 0.0),
                 threshold_auto=bool(getattr(s, "fvg_threshold_auto", False)),
             )[:10]
         if getattr(s, "enable_supply_demand", False):
-            df_sd = bundle.get("1h") or bundle.get("15m") or list(bundle.values())[0]
-            plan["sd_zones"] = detect_zones(
-                df_sd,
+            plan["sd_zones"] = ctx.zones(
+                "1h",
                 max_base=int(getattr(s, "sd_max_base", 3) or 3),
                 body_ratio=float(getattr(s, "sd_body_ratio", 0.33) or 0.33),
                 min_departure=float(getattr(s, "sd_min_departure", 1.5) or 1.5),
@@ -254,7 +302,7 @@ def _macro_notes() -> list[str]:
     ]
 
 
-def _score_candidate(plan: dict, regime: dict, bundle) -> tuple[float, dict]:
+def _score_candidate(plan: dict, regime: dict, bundle, ctx: PlanContext | None = None) -> tuple[float, dict]:
     details: dict = {}
     total = 0.0
     rr_avg = float(plan.get("rr_tp1_avg") or 0.0)
@@ -283,10 +331,15 @@ def _score_candidate(plan: dict, regime: dict, bundle) -> tuple[float, dict]:
     total += regime_bonus
 
     try:
-        last15 = bundle.get("15m").iloc[-1] if bundle and "15m" in bundle else None
-        if last15 is not None:
-            atr15 = float(getattr(last15, "atr14", 0.0) or 0.0)
-            vwap15 = float(getattr(last15, "vwap", getattr(last15, "close", 0.0)) or 0.0)
+        if ctx is not None:
+            atr15, vwap15, has15 = ctx.atr15, float(ctx.snap.get("vwap15") or 0.0), True
+        else:
+            last15 = bundle.get("15m").iloc[-1] if bundle and "15m" in bundle else None
+            has15 = last15 is not None
+            if has15:
+                atr15 = float(getattr(last15, "atr14", 0.0) or 0.0)
+                vwap15 = float(getattr(last15, "vwap", getattr(last15, "close", 0.0)) or 0.0)
+        if has15:
             entries = list(plan.get("entries") or [])
             if entries and atr15:
                 diff = abs(float(entries[0]) - vwap15)
@@ -1,45 +1,28 @@
 
 from __future__ import annotations
 from typing import Dict, Any, Tuple
-import math
-import ccxt
 
-_ex = ccxt.binanceusdm()
-_loaded = False
+from .market_meta import META, snap_down
 
-def _load():
-    global _loaded
-    if not _loaded:
-        try:
-            _ex.load_markets()
-        except Exception:
-            pass
-        _loaded = True
 
 def lot_step(symbol: str) -> Tuple[float, float]:
-    _load()
-    m = _ex.markets.get(symbol) or _ex.markets.get(symbol.replace("USDT", "/USDT"))
+    """(amount step, price tick) for a USDT-M symbol; (0.01, 0.01) when metadata is unavailable."""
+    m = META.get(symbol, "futures")
     if not m:
         return 0.01, 0.01
-    return float(m.get("precision", {}).get("amount", 2)), float(m.get("precision", {}).get("price", 4))
+    return (m.step_size or 0.01), (m.tick_size or 0.01)
 
 def round_qty(symbol: str, qty: float) -> float:
-    _load()
-    try:
-        return float(_ex.amount_to_precision(symbol, qty))
-    except Exception:
-        step, _ = lot_step(symbol)
-        k = 10 ** step
-        return math.floor(qty * k) / k
+    m = META.get(symbol, "futures")
+    if m and m.step_size:
+        return snap_down(qty, m.step_size, m.amount_decimals)
+    return snap_down(qty, 0.01, 2)
 
 def round_price(symbol: str, price: float) -> float:
-    _load()
-    try:
-        return float(_ex.price_to_precision(symbol, price))
-    except Exception:
-        _, prec = lot_step(symbol)
-        k = 10 ** prec
-        return math.floor(price * k) / k
+    m = META.get(symbol, "futures")
+    if m and m.tick_size:
+        return snap_down(price, m.tick_size, m.price_decimals)
+    return snap_down(price, 0.01, 2)
 
 def compute_position_size(symbol: str, balance_usdt: float, risk_per_trade: float,
                           leverage: int, entry_price: float, invalid_price: float) -> Dict[str, Any]:
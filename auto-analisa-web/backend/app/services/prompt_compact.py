@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+import re
+import threading
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+# Compaction of the JSON payloads the LLM endpoints paste into prompts:
+# - floats are rounded to the symbol's tick (values a tick would distort, e.g. weights or
+#   funding rates, keep 6 significant digits instead),
+# - keys the response schema does not need are dropped, as are null/empty values,
+# - repeated levels (equal after rounding, under the LEVEL_KEYS lists) and identical
+#   objects in any list are deduped; other number lists (weights, ladders) keep repeats,
+# - the result is trimmed to a token budget (LLM_PROMPT_TOKEN_BUDGET) measured with an
+#   offline estimate: optional sections go first, then the longest lists lose their
+#   oldest half.
+# Token counts per endpoint are collected in PROMPT_STATS (admin /usage).
+
+# chart/UI data the LLM schemas never read
+UNUSED_PROMPT_KEYS = ("overlay", "overlays", "candidates")
+
+LEVEL_KEYS = ("entries", "tp", "support", "resistance", "levels", "round_numbers")
+
+_WORD = re.compile(r"[^\W\d_]+|\d+|\S")
+
+
+def estimate_tokens(text: str) -> int:
+    """Offline token estimate for BPE tokenizers: words count one token per ~4 letters,
+    digit runs one per 3 digits, punctuation one each."""
+    n = 0
+    for m in _WORD.finditer(text or ""):
+        s = m.group(0)
+        if s.isdigit():
+            n += math.ceil(len(s) / 3)
+        elif s.isalpha():
+            n += math.ceil(len(s) / 4)
+        else:
+            n += 1
+    return n
+
+
+def dumps(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def tick_decimals(tick: Any) -> Optional[int]:
+    try:
+        d = Decimal(str(float(tick)))
+    except (TypeError, ValueError, ArithmeticError):
+        return None
+    if not d.is_finite() or d <= 0:
+        return None
+    return max(0, -d.normalize().as_tuple().exponent)
+
+
+def _num(x: float, dec: Optional[int]) -> Any:
+    if not math.isfinite(x):
+        return None
+    if dec is not None:
+        r = round(x, dec)
+        if abs(r - x) <= abs(x) * 1e-3 and (r != 0 or x == 0):
+            x = r
+        else:
+            x = float(f"{x:.6g}")
+    else:
+        x = float(f"{x:.6g}")
+    return int(x) if x.is_integer() and abs(x) < 1e15 else x
+
+
+def _empty(v: Any) -> bool:
+    return v is None or v == "" or v == [] or v == {}
+
+
+def compact(
+    obj: Any,
+    tick: Any = None,
+    keep: Optional[Iterable[str]] = None,
+    drop: Iterable[str] = (),
+    levels: Iterable[str] = LEVEL_KEYS,
+) -> Any:
+    """Rounded, deduped copy of ``obj``. ``keep`` whitelists top-level keys; ``drop`` removes
+    keys at any depth; number lists under ``levels`` keys are deduped."""
+    dec = tick_decimals(tick)
+    dropped = set(drop)
+    level_keys = set(levels)
+
+    def walk(v: Any, key: Any = None) -> Any:
+        if isinstance(v, bool) or v is None or isinstance(v, str):
+            return v
+        if isinstance(v, int):
+            return v
+        if isinstance(v, float):
+            return _num(v, dec)
+        if isinstance(v, dict):
+            out = {}
+            for k, x in v.items():
+                if k in dropped:
+                    continue
+                x = walk(x, k)
+                if not _empty(x):
+                    out[k] = x
+            return out
+        if isinstance(v, (list, tuple)):
+            out: List[Any] = []
+            seen = set()
+            for x in v:
+                x = walk(x)
+                if _empty(x):
+                    continue
+                if isinstance(x, (dict, list)):
+                    seen_key = dumps(x)
+                elif key in level_keys:
+                    seen_key = x
+                else:
+                    out.append(x)
+                    continue
+                if seen_key in seen:
+                    continue
+                seen.add(seen_key)
+                out.append(x)
+            return out
+        return v
+
+    if keep is not None and isinstance(obj, dict):
+        wanted = set(keep)
+        obj = {k: v for k, v in obj.items() if k in wanted}
+    return walk(obj)
+
+
+def _pop_path(obj: Any, path: str) -> bool:
+    *parents, last = path.split(".")
+    cur = obj
+    for p in parents:
+        cur = cur.get(p) if isinstance(cur, dict) else None
+    if isinstance(cur, dict) and last in cur:
+        del cur[last]
+        return True
+    return False
+
+
+def _longest_list(obj: Any) -> Optional[Tuple[Any, Any, int]]:
+    best: Optional[Tuple[Any, Any, int]] = None
+    stack = [obj]
+    while stack:
+        cur = stack.pop()
+        items = cur.items() if isinstance(cur, dict) else enumerate(cur) if isinstance(cur, list) else ()
+        for k, v in items:
+            if isinstance(v, list) and len(v) > 1 and (best is None or len(v) > best[2]):
+                best = (cur, k, len(v))
+            if isinstance(v, (dict, list)):
+                stack.append(v)
+    return best
+
+
+def fit_budget(obj: Any, budget: int, trim: Iterable[str] = ()) -> Tuple[Any, int]:
+    """Trim ``obj`` in place until its JSON fits ``budget`` estimated tokens: drop the dotted
+    paths in ``trim`` in order, then halve the longest list (keeping its newest tail)."""
+    tokens = estimate_tokens(dumps(obj))
+    for path in trim:
+        if tokens <= budget:
+            break
+        if _pop_path(obj, path):
+            tokens = estimate_tokens(dumps(obj))
+    while tokens > budget:
+        hit = _longest_list(obj)
+        if hit is None:
+            break
+        parent, key, n = hit
+        parent[key] = parent[key][n - n // 2:]
+        tokens = estimate_tokens(dumps(obj))
+    return obj, tokens
+
+
+def prompt_budget() -> int:
+    return int(os.getenv("LLM_PROMPT_TOKEN_BUDGET", "6000") or 6000)
+
+
+class PromptStats:
+    """Per-endpoint prompt token counters (this process): estimated tokens before and after
+    compaction, and the prompt tokens the provider actually billed."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows: Dict[str, Dict[str, int]] = {}
+
+    def _row(self, endpoint: str) -> Dict[str, int]:
+        return self._rows.setdefault(
+            endpoint, {"calls": 0, "raw_tokens_est": 0, "sent_tokens_est": 0, "prompt_tokens": 0}
+        )
+
+    def record_compaction(self, endpoint: str, raw_tokens: int, sent_tokens: int) -> None:
+        with self._lock:
+            row = self._row(endpoint)
+            row["raw_tokens_est"] += int(raw_tokens)
+            row["sent_tokens_est"] += int(sent_tokens)
+
+    def record_usage(self, endpoint: str, usage: Dict[str, Any] | None) -> None:
+        with self._lock:
+            row = self._row(endpoint)
+            row["calls"] += 1
+            row["prompt_tokens"] += int((usage or {}).get("prompt_tokens") or 0)
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {k: dict(v) for k, v in self._rows.items()}
+
+
+PROMPT_STATS = PromptStats()
+
+
+def compact_payload(
+    endpoint: str,
+    obj: Any,
+    tick: Any = None,
+    keep: Optional[Iterable[str]] = None,
+    drop: Iterable[str] = (),
+    trim: Iterable[str] = (),
+    budget: Optional[int] = None,
+) -> Any:
+    """Compact ``obj`` for a prompt section of ``endpoint`` (counted in PROMPT_STATS)."""
+    raw = estimate_tokens(json.dumps(obj, ensure_ascii=False, default=str))
+    out, tokens = fit_budget(compact(obj, tick=tick, keep=keep, drop=drop), budget or prompt_budget(), trim)
+    PROMPT_STATS.record_compaction(endpoint, raw, tokens)
+    return out
+
+
+def compact_json(endpoint: str, obj: Any, **kw: Any) -> str:
+    """``compact_payload`` serialized without whitespace, ready to paste into a prompt."""
+    return dumps(compact_payload(endpoint, obj, **kw))
@@ -1,6 +1,7 @@
 from __future__ import annotations
 from typing import Any, Dict
-import json
+
+from .prompt_compact import dumps
 
 
 def _schema_block() -> str:
@@ -32,7 +33,7 @@ def _schema_block() -> str:
 
 
 def prompt_scalping(symbol: str, payload: Dict[str, Any]) -> str:
-    payload_json = json.dumps(payload, ensure_ascii=False)
+    payload_json = dumps(payload)
     return (
         "Kamu adalah profesional trader futures kripto.\n"
         "Tugas: buat analisa FUTURES scalping 5m–15m untuk {symbol} berbasis payload JSON (tanpa screenshot).\n"
@@ -49,7 +50,7 @@ def prompt_scalping(symbol: str, payload: Dict[str, Any]) -> str:
 
 
 def prompt_swing(symbol: str, payload: Dict[str, Any]) -> str:
-    payload_json = json.dumps(payload, ensure_ascii=False)
+    payload_json = dumps(payload)
     return (
         "Kamu adalah profesional trader futures kripto.\n"
         "Tugas: buat analisa FUTURES swing 1H–4H untuk {symbol} berbasis payload JSON.\n"
@@ -2,103 +2,39 @@ from __future__ import annotations
 from typing import Dict, Any, List
 import math
 
-import ccxt
+from .market_meta import META, norm_key
 
 
-_ex = ccxt.binance()
-_markets_loaded = False
-
-
-def _load_markets_safe():
-    global _markets_loaded
-    if _markets_loaded:
-        return
-    try:
-        _ex.load_markets(reload=False)
-        _markets_loaded = True
-    except Exception:
-        # offline or network blocked; keep fallback mode
-        _markets_loaded = False
-
-
-def _norm_symbol(sym: str) -> str:
-    s = sym.upper().replace(":USDT", "/USDT")
-    if "/" not in s and s.endswith("USDT"):
-        s = f"{s[:-4]}/USDT"
-    return s
+def _market(symbol: str):
+    """Spot metadata first (legacy behaviour), USDT-M futures for futures-only listings."""
+    k = norm_key(symbol)
+    return META.get(k, "spot") or META.get(k, "futures")
 
 
 def _tick_size_for(symbol: str) -> float | None:
-    _load_markets_safe()
-    if not _markets_loaded:
-        return None
-    try:
-        m = _ex.market(_norm_symbol(symbol))
-        # prefer precision.decimals -> min price increment
-        if m and m.get("precision") and "price" in m["precision"] and isinstance(m["precision"]["price"], int):
-            prec = int(m["precision"]["price"]) or 0
-            return float(10 ** (-prec)) if prec > 0 else 1.0
-        # else try limits.price.min
-        lim = (m or {}).get("limits", {}).get("price", {})
-        if lim and lim.get("min"):
-            return float(lim["min"]) or None
-    except Exception:
-        return None
-    return None
+    m = _market(symbol)
+    return m.tick_size if m else None
 
 
 def _step_size_for(symbol: str) -> float | None:
-    """Return step size (amount precision) if available via ccxt metadata.
-    Falls back to None when offline.
-    """
-    _load_markets_safe()
-    if not _markets_loaded:
-        return None
-    try:
-        m = _ex.market(_norm_symbol(symbol))
-        # precision.amount as decimals → step = 10^-dec
-        if m and m.get("precision") and "amount" in m["precision"] and isinstance(m["precision"]["amount"], int):
-            prec = int(m["precision"]["amount"]) or 0
-            return float(10 ** (-prec)) if prec > 0 else 1.0
-        # fallback: limits.amount.min as a proxy (not exact step)
-        lim = (m or {}).get("limits", {}).get("amount", {})
-        if lim and lim.get("min"):
-            return float(lim["min"]) or None
-    except Exception:
-        return None
-    return None
+    """Return step size (amount increment) from the market-metadata index; None when offline."""
+    m = _market(symbol)
+    return m.step_size if m else None
 
 
 def precision_for(symbol: str) -> dict | None:
     """Return a compact precision dict for a symbol: {tickSize, stepSize, priceDecimals, amountDecimals}.
     Returns None if markets not available.
     """
-    _load_markets_safe()
-    if not _markets_loaded:
-        return None
-    out: dict = {}
-    try:
-        m = _ex.market(_norm_symbol(symbol))
-        if not m:
-            return None
-        pd = None
-        ad = None
-        try:
-            if m.get("precision") and isinstance(m["precision"].get("price"), int):
-                pd = int(m["precision"]["price"])
-            if m.get("precision") and isinstance(m["precision"].get("amount"), int):
-                ad = int(m["precision"]["amount"])
-        except Exception:
-            pd = ad = None
-        out["tickSize"] = _tick_size_for(symbol)
-        out["stepSize"] = _step_size_for(symbol)
-        if pd is not None:
-            out["priceDecimals"] = pd
-        if ad is not None:
-            out["amountDecimals"] = ad
-        return out
-    except Exception:
+    m = _market(symbol)
+    if not m:
         return None
+    out: dict = {"tickSize": m.tick_size, "stepSize": m.step_size}
+    if m.price_decimals is not None:
+        out["priceDecimals"] = m.price_decimals
+    if m.amount_decimals is not None:
+        out["amountDecimals"] = m.amount_decimals
+    return out
 
 
 def _decimals_from_tick(step: float | None) -> int:
@@ -222,12 +158,14 @@ def round_spot2_prices(symbol: str, spot2: Dict[str, Any]) -> Dict[str, Any]:
     return s2
 
 
-def round_futures_prices(symbol: str, fut: Dict[str, Any]) -> Dict[str, Any]:
+def round_futures_prices(symbol: str, fut: Dict[str, Any], tick: float | None = None) -> Dict[str, Any]:
     """Round FUTURES price fields (entries ranges, tp ranges, invalids tiers) to tick size.
+    ``tick`` skips the metadata lookup when the caller already resolved it.
     Fallback no-op if tick size unavailable.
     """
     s = dict(fut or {})
-    tick = _tick_size_for(symbol)
+    if tick is None:
+        tick = _tick_size_for(symbol)
     if tick is None:
         return s
     s["price_decimals"] = _decimals_from_tick(tick)
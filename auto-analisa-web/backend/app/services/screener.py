@@ -1,6 +1,8 @@
 from __future__ import annotations
 
-from typing import Dict, List, Any
+import asyncio
+import os
+from typing import Dict, List, Any, Optional, Tuple
 import numpy as np
 import pandas as pd
 
@@ -8,6 +10,9 @@ from .signal_mtf import load_signal_config
 from .market import fetch_klines
 
 
+FETCH_CONCURRENCY = int(os.getenv("SCREENER_CONCURRENCY", "16"))
+
+
 async def _load_close(symbol: str, tf: str, limit: int = 240, market: str = 'futures') -> pd.Series:
     df = await fetch_klines(symbol, tf, limit=limit, market=market)
     s = pd.to_numeric(df['close'], errors='coerce')
@@ -15,6 +20,22 @@ async def _load_close(symbol: str, tf: str, limit: int = 240, market: str = 'fut
     return s
 
 
+async def _load_close_many(symbols: List[str], tf: str, limit: int, market: str) -> Dict[str, Optional[pd.Series]]:
+    """Bounded concurrent `_load_close`; failures map to None."""
+    sem = asyncio.Semaphore(max(1, FETCH_CONCURRENCY))
+
+    async def one(sym: str) -> Optional[pd.Series]:
+        async with sem:
+            try:
+                return await _load_close(sym, tf, limit=limit, market=market)
+            except Exception:
+                return None
+
+    uniq = list(dict.fromkeys(symbols))
+    res = await asyncio.gather(*(one(s) for s in uniq))
+    return dict(zip(uniq, res))
+
+
 def _pct_change(s: pd.Series, n: int) -> float:
     if s is None or len(s) <= n:
         return 0.0
@@ -32,72 +53,190 @@ def _zscore(x: np.ndarray) -> float:
     return float((x[-1] - m) / sd)
 
 
+# --- single-symbol reference path (also used for rows with gaps) -----------------
+
+def _rs_single(alt: pd.Series, btc: pd.Series) -> Optional[float]:
+    """Residual RS of the last bar vs BTC; None when there is no overlap."""
+    joined = pd.concat([alt.rename('alt'), btc.rename('btc')], axis=1).dropna()
+    if joined.empty:
+        return None
+    # simple beta via covariance/variance
+    if len(joined) >= 30:
+        r_alt = joined['alt'].pct_change().dropna().values
+        r_btc = joined['btc'].pct_change().dropna().values
+        n = min(len(r_alt), len(r_btc))
+        r_alt, r_btc = r_alt[-n:], r_btc[-n:]
+        beta = float(np.cov(r_alt, r_btc)[0,1] / (np.var(r_btc) or 1.0))
+        return float(r_alt[-1] - beta * r_btc[-1])
+    # fallback: last change difference
+    return float(joined['alt'].pct_change().iloc[-1] - joined['btc'].pct_change().iloc[-1])
+
+
+def _ratio_break_single(alt_mid: pd.Series, btc_mid: pd.Series) -> bool:
+    try:
+        ratio = (alt_mid / btc_mid).dropna()
+        ma = ratio.rolling(50, min_periods=10).mean()
+        sd = ratio.rolling(50, min_periods=10).std()
+        return bool(len(ratio) and ratio.iloc[-1] > (ma.iloc[-1] + 2.0*(sd.iloc[-1] or 0)))
+    except Exception:
+        return False
+
+
+# --- batched engine ---------------------------------------------------------------
+
+def _align(series: List[pd.Series], index: pd.Index) -> np.ndarray:
+    """Stack series as rows of an N x T matrix on ``index`` (NaN where missing)."""
+    if not series:
+        return np.empty((0, len(index)))
+    return np.vstack([s.reindex(index).to_numpy(dtype='float64') for s in series])
+
+
+def _suffix_rows(valid: np.ndarray) -> np.ndarray:
+    """Rows whose valid cells form one contiguous block ending at the last column (or are empty)."""
+    if valid.shape[1] == 0:
+        return np.ones(valid.shape[0], dtype=bool)
+    monotone = np.all(np.diff(valid.astype(np.int8), axis=1) >= 0, axis=1)
+    return monotone & (valid[:, -1] | ~valid.any(axis=1))
+
+
+def batch_window_rs(A: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Rolling-free residual RS for all rows of ``A`` (N x T) against BTC ``b`` (T).
+
+    Returns (rs, present, regular). ``regular`` rows have a contiguous valid suffix and match
+    `_rs_single`; other rows must be recomputed with the reference path.
+    """
+    N, T = A.shape
+    valid = np.isfinite(A) & np.isfinite(b)[None, :]
+    regular = _suffix_rows(valid)
+    L = valid.sum(axis=1)
+    present = L > 0
+    rs = np.full(N, np.nan)
+    if T < 2:
+        return rs, present, regular
+    with np.errstate(divide='ignore', invalid='ignore'):
+        R = A[:, 1:] / A[:, :-1] - 1.0
+        rb = b[1:] / b[:-1] - 1.0
+    m = valid[:, 1:] & valid[:, :-1]
+    cnt = m.sum(axis=1).astype('float64')
+    Rz = np.where(m, R, 0.0)
+    Bz = np.where(m, rb[None, :], 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ma = Rz.sum(axis=1) / cnt
+        mb = Bz.sum(axis=1) / cnt
+        da = np.where(m, R - ma[:, None], 0.0)
+        db = np.where(m, rb[None, :] - mb[:, None], 0.0)
+        cov = (da * db).sum(axis=1) / (cnt - 1.0)
+        var_b = (db * db).sum(axis=1) / cnt
+        beta = cov / np.where(var_b == 0, 1.0, var_b)
+    last_a = R[:, -1]
+    last_b = rb[-1]
+    rs = np.where(L >= 30, last_a - beta * last_b, np.where(L >= 2, last_a - last_b, np.nan))
+    return rs, present, regular
+
+
+def batch_ratio_break(alt_mid: np.ndarray, b: np.ndarray, window: int = 50, min_periods: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+    """Ratio (alt/BTC) breakout above rolling mean + 2 sd at the last bar, for all rows at once.
+
+    Window sums come from cumulative sums of the (last-value centered) ratio matrix.
+    Returns (flag, regular) with the same ``regular`` contract as :func:`batch_window_rs`.
+    """
+    N, T = alt_mid.shape
+    with np.errstate(divide='ignore', invalid='ignore'):
+        X = alt_mid / b[None, :]
+    valid = np.isfinite(X)
+    regular = _suffix_rows(valid)
+    L = valid.sum(axis=1)
+    flag = np.zeros(N, dtype=bool)
+    if T == 0:
+        return flag, regular
+    last = np.where(valid[:, -1], X[:, -1], 0.0)
+    Xc = np.where(valid, X - last[:, None], 0.0)  # centering keeps the sum-of-squares stable
+    zero = np.zeros((N, 1))
+    S1 = np.hstack([zero, np.cumsum(Xc, axis=1)])
+    S2 = np.hstack([zero, np.cumsum(Xc * Xc, axis=1)])
+    w = np.minimum(L, window)
+    start = T - w
+    rows = np.arange(N)
+    s1 = S1[:, T] - S1[rows, start]
+    s2 = S2[:, T] - S2[rows, start]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_c = s1 / w
+        var = (s2 - s1 * mean_c) / (w - 1)
+    sd = np.sqrt(np.maximum(var, 0.0))
+    # last value is 0 after centering: breakout when 0 > mean_c + 2 sd
+    flag = (L >= min_periods) & (0.0 > mean_c + 2.0 * np.nan_to_num(sd, nan=0.0))
+    return flag, regular
+
+
 async def screener_outperformers(symbols: List[str], mode: str = 'medium', market: str = 'futures', top: int = 20) -> Dict[str, Any]:
     cfg = load_signal_config().get('outperformer', {})
     windows = cfg.get('windows', { 'short':'1h', 'mid':'4h', 'long':'1D' })
     weights = cfg.get('weights', { 'rs':0.45, 'alpha':0.25, 'ratio_breakout':0.20, 'vol_oi':0.10 })
     thr = cfg.get('thresholds', { 'score_min': 0.35, 'alpha_z_min': 0.5 })
 
+    syms = [s.upper() for s in symbols]
+    tfs = list(dict.fromkeys(windows.values()))
+    # BTC once per window + all symbols per window, fetched concurrently
+    loaded = await asyncio.gather(*(_load_close_many(['BTCUSDT'] + syms, tf, 240, market) for tf in tfs))
+    by_tf: Dict[str, Dict[str, Optional[pd.Series]]] = dict(zip(tfs, loaded))
+    btc_s = {tf: by_tf[tf].get('BTCUSDT') for tf in tfs}
+    if any(v is None for v in btc_s.values()):
+        return { 'results': [] }
+
+    # a symbol is dropped when any of its window fetches failed (as in the per-symbol loop)
+    ok_syms = [s for s in dict.fromkeys(syms) if all(by_tf[tf].get(s) is not None for tf in tfs)]
+    pos = {s: i for i, s in enumerate(ok_syms)}
+    n = len(ok_syms)
+
+    labels = list(windows.keys())
+    rs_mat = np.full((n, len(labels)), np.nan)
+    present = np.zeros((n, len(labels)), dtype=bool)
+    for j, (label, tf) in enumerate(windows.items()):
+        btc = btc_s[tf]
+        alts = [by_tf[tf][s] for s in ok_syms]
+        rs, pres, reg = batch_window_rs(_align(alts, btc.index), btc.to_numpy(dtype='float64'))
+        for i in np.flatnonzero(~reg):
+            r = _rs_single(alts[i], btc)
+            rs[i], pres[i] = (np.nan if r is None else r), r is not None
+        rs_mat[:, j] = rs
+        present[:, j] = pres
+
+    # ratio breakout on the mid window; reuse the 240-bar fetch (last 120 bars == limit=120)
+    tf_mid = windows.get('mid', '4h')
+    btc_mid = btc_s.get(tf_mid)
+    if btc_mid is None:
+        ratio_break = np.zeros(n, dtype=bool)
+    else:
+        alts_mid = [by_tf[tf_mid][s].iloc[-120:] for s in ok_syms]
+        ratio_break, reg = batch_ratio_break(_align(alts_mid, btc_mid.index), btc_mid.to_numpy(dtype='float64'))
+        for i in np.flatnonzero(~reg):
+            ratio_break[i] = _ratio_break_single(alts_mid[i], btc_mid)
+
     out: List[Dict[str, Any]] = []
-    # Load BTC closes once per window
-    btc_s: Dict[str, pd.Series] = {}
-    for _, tf in windows.items():
-        if tf not in btc_s:
-            btc_s[tf] = await _load_close('BTCUSDT', tf, limit=240, market=market)
-
-    for sym in symbols:
-        try:
-            row: Dict[str, Any] = { 'symbol': sym.upper() }
-            # returns
-            rs_score = 0.0
-            rs_parts = []
-            for label, tf in windows.items():
-                alt = await _load_close(sym, tf, limit=240, market=market)
-                btc = btc_s[tf]
-                # align indices
-                joined = pd.concat([alt.rename('alt'), btc.rename('btc')], axis=1).dropna()
-                if joined.empty:
-                    continue
-                # simple beta via covariance/variance
-                if len(joined) >= 30:
-                    r_alt = joined['alt'].pct_change().dropna().values
-                    r_btc = joined['btc'].pct_change().dropna().values
-                    n = min(len(r_alt), len(r_btc))
-                    r_alt, r_btc = r_alt[-n:], r_btc[-n:]
-                    beta = float(np.cov(r_alt, r_btc)[0,1] / (np.var(r_btc) or 1.0))
-                    rs = float(r_alt[-1] - beta * r_btc[-1])
-                else:
-                    # fallback: last change difference
-                    rs = float(joined['alt'].pct_change().iloc[-1] - joined['btc'].pct_change().iloc[-1])
-                row[f'rs_{label}'] = rs
-                rs_parts.append(rs)
-            # aggregate RS
-            if rs_parts:
-                rs_score = float(np.nanmean(rs_parts))
-            # alpha z (rough): residual mean z-score
-            alpha_z = float(_zscore(np.array(rs_parts))) if rs_parts else 0.0
-            row['alpha_z'] = alpha_z
-            # ratio breakout
-            try:
-                ratio = (await _load_close(sym, windows.get('mid','4h'), limit=120, market=market)) / (btc_s[windows.get('mid','4h')])
-                ratio = ratio.dropna()
-                ma = ratio.rolling(50, min_periods=10).mean()
-                sd = ratio.rolling(50, min_periods=10).std()
-                ratio_break = bool(len(ratio) and ratio.iloc[-1] > (ma.iloc[-1] + 2.0*(sd.iloc[-1] or 0)))
-            except Exception:
-                ratio_break = False
-            row['ratio_break'] = ratio_break
-            # score
-            score = (
-                weights.get('rs',0.45) * rs_score +
-                weights.get('alpha',0.25) * (alpha_z/3.0) +
-                weights.get('ratio_breakout',0.20) * (1.0 if ratio_break else 0.0)
-            )
-            row['score'] = float(score)
-            out.append(row)
-        except Exception:
+    for sym in syms:
+        i = pos.get(sym)
+        if i is None:
             continue
+        row: Dict[str, Any] = { 'symbol': sym }
+        rs_parts = []
+        for j, label in enumerate(labels):
+            if present[i, j]:
+                row[f'rs_{label}'] = float(rs_mat[i, j])
+                rs_parts.append(float(rs_mat[i, j]))
+        # aggregate RS
+        rs_score = float(np.nanmean(rs_parts)) if rs_parts else 0.0
+        # alpha z (rough): residual mean z-score
+        alpha_z = float(_zscore(np.array(rs_parts))) if rs_parts else 0.0
+        row['alpha_z'] = alpha_z
+        row['ratio_break'] = bool(ratio_break[i])
+        # score
+        score = (
+            weights.get('rs',0.45) * rs_score +
+            weights.get('alpha',0.25) * (alpha_z/3.0) +
+            weights.get('ratio_breakout',0.20) * (1.0 if row['ratio_break'] else 0.0)
+        )
+        row['score'] = float(score)
+        out.append(row)
 
     out_sorted = sorted(out, key=lambda x: x.get('score', 0.0), reverse=True)[:int(top or 20)]
     return { 'results': out_sorted }
-
@@ -1,22 +1,43 @@
 from __future__ import annotations
+import asyncio
+import math
+import random
+import time
 import pandas as pd
 import numpy as np
-from datetime import datetime, timezone, timedelta
-from zoneinfo import ZoneInfo
-from typing import List, Dict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, List, Dict, Tuple
 
+from .cache import AsyncMemo, seconds_to_next_bar, tf_seconds
 from .market import fetch_klines
 
 
+_MEMO = AsyncMemo()
+# max resample cells materialized at once (~16 MB of int64 indices)
+_BOOT_CELLS = 2_000_000
+
+
+def _bootstrap_means(x: np.ndarray, iters: int, seed: int = 42) -> np.ndarray:
+    """Bootstrap means from one (iters, n) index matrix, drawn in row blocks.
+
+    Same generator stream as drawing ``rng.integers(0, n, size=n)`` once per
+    iteration, so results are identical to the per-iteration loop for a fixed seed.
+    """
+    rng = np.random.default_rng(seed)
+    n = x.size
+    rows = max(1, _BOOT_CELLS // max(1, n))
+    means = np.empty(iters, dtype=float)
+    for start in range(0, iters, rows):
+        k = min(rows, iters - start)
+        means[start:start + k] = x[rng.integers(0, n, size=(k, n))].mean(axis=1)
+    return means
+
+
 def _bootstrap_mean_ci(x: np.ndarray, iters: int = 2000, alpha: float = 0.05):
     if x.size == 0:
         return 0.0, (0.0, 0.0), 1.0
-    rng = np.random.default_rng(42)
-    n = x.size
-    means = np.empty(iters, dtype=float)
-    for i in range(iters):
-        idx = rng.integers(0, n, size=n)
-        means[i] = float(np.mean(x[idx]))
+    means = _bootstrap_means(x, iters)
     lo = float(np.quantile(means, alpha / 2))
     hi = float(np.quantile(means, 1 - alpha / 2))
     m = float(np.mean(x))
@@ -27,50 +48,305 @@ def _bootstrap_mean_ci(x: np.ndarray, iters: int = 2000, alpha: float = 0.05):
     return m, (lo, hi), p
 
 
-async def btc_wib_buckets(days: int = 120, timeframe: str = "1h") -> List[Dict]:
-    # fetch enough bars; 24 per day for 1h
-    min_days = max(90, int(days or 90))
-    limit = int(min_days * 24 * (1 if timeframe in ("1h", "60m", "1H") else 2))
-    df = await fetch_klines("BTCUSDT", timeframe if timeframe != "60m" else "1h", limit=limit)
-    if df is None or len(df) == 0:
-        return []
-    # Compute returns per candle (close/open - 1)
-    df = df.copy()
-    # ccxt returns ms timestamps
-    df["ts"] = pd.to_datetime(df["ts"], unit="ms", utc=True)
-    df["open"] = pd.to_numeric(df["open"])  # ensure float
-    df["close"] = pd.to_numeric(df["close"])  # ensure float
-    df["ret"] = (df["close"] / df["open"]) - 1.0
-    # bucket by WIB hour
-    jkt = ZoneInfo("Asia/Jakarta")
-    df["hour_wib"] = df["ts"].dt.tz_convert(jkt).dt.hour
-    out: List[Dict] = []
-    N_MIN = 60  # minimum samples per bucket
-    for h in range(24):
-        x = df.loc[df["hour_wib"] == h, "ret"].to_numpy(dtype=float)
-        n = int(x.size)
-        if n < N_MIN:
-            continue
-        mean, (lo, hi), p = _bootstrap_mean_ci(x, iters=2000, alpha=0.05)
-        # hit-rate: proportion of positive returns
-        hit = float(np.mean(x > 0.0)) if n > 0 else 0.0
-        # effect size: Cohen's d
-        sd = float(np.std(x, ddof=1)) if n > 1 else 0.0
-        d = (mean / sd) if sd > 0 else 0.0
-        sig = (p <= 0.05) and (n >= N_MIN)
-        if sig:
-            out.append({
-                "hour": h,
-                "n": n,
-                "mean": round(mean, 6),
-                "hit_rate": round(hit, 4),
-                "ci_low": round(lo, 6),
-                "ci_high": round(hi, 6),
-                "p_value": round(p, 6),
-                "effect": round(d, 4),
-                "tz": "Asia/Jakarta",
-            })
-    # sort by hour
-    out.sort(key=lambda r: r["hour"])
-    return out
+N_MIN = 60  # minimum samples per bucket
+WIB_OFFSET_H = 7  # Asia/Jakarta, no DST
+RESERVOIR_K = 512
+MAX_DAYS = 365  # daily partials kept per (symbol, tf)
+DAY_MS = 86_400_000
+
+
+def _bucket_row(hour: int, n: int, mean: float, hit: float, sd: float, lo: float, hi: float, p: float) -> Dict | None:
+    """Output row for a WIB hour when the mean return is significant, else None."""
+    # effect size: Cohen's d
+    d = (mean / sd) if sd > 0 else 0.0
+    if not ((p <= 0.05) and (n >= N_MIN)):
+        return None
+    return {
+        "hour": hour,
+        "n": n,
+        "mean": round(mean, 6),
+        "hit_rate": round(hit, 4),
+        "ci_low": round(lo, 6),
+        "ci_high": round(hi, 6),
+        "p_value": round(p, 6),
+        "effect": round(d, 4),
+        "tz": "Asia/Jakarta",
+    }
+
+
+@dataclass
+class HourAgg:
+    """Running aggregates for one WIB hour: O(1) update and O(1) mean/hit-rate/sd reads."""
+
+    n: int = 0
+    sum: float = 0.0
+    sumsq: float = 0.0
+    pos: int = 0
+    sample: List[float] = field(default_factory=list)
+
+    def add(self, r: float, key: str, k: int = RESERVOIR_K) -> None:
+        self.n += 1
+        self.sum += r
+        self.sumsq += r * r
+        self.pos += int(r > 0.0)
+        # reservoir sampling (Algorithm R); deterministic slot per (key, n) so rebuilds agree
+        if len(self.sample) < k:
+            self.sample.append(r)
+        else:
+            j = random.Random(f"{key}:{self.n}").randrange(self.n)
+            if j < k:
+                self.sample[j] = r
+
+    def merge(self, other: "HourAgg") -> None:
+        self.n += other.n
+        self.sum += other.sum
+        self.sumsq += other.sumsq
+        self.pos += other.pos
+        self.sample.extend(other.sample)
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.n if self.n else 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.pos / self.n if self.n else 0.0
+
+    @property
+    def sd(self) -> float:
+        if self.n < 2:
+            return 0.0
+        var = (self.sumsq - self.sum * self.sum / self.n) / (self.n - 1)
+        return math.sqrt(var) if var > 0 else 0.0
+
+
+class SessionStatsStore:
+    """Persisted per-(symbol, tf, UTC day, WIB hour) return statistics, folded in as candles close.
 
+    The first refresh backfills ``max(90, days)`` days; later refreshes only fetch the
+    candles closed since ``last_ts`` (or backfill again when a longer window is asked for).
+    Daily partials older than ``max_days`` are dropped, and a ``days`` window is the sum
+    of its last ``days`` partials. Bootstrap CIs run on the window's returns (a reservoir
+    rescaled to the full ``n`` past ``reservoir`` returns) and are cached until the window
+    receives a new candle. Rows live in ``session_hour_stats``.
+    """
+
+    def __init__(self, reservoir: int = RESERVOIR_K, iters: int = 2000, max_days: int = MAX_DAYS):
+        self.reservoir = int(reservoir)
+        self.iters = int(iters)
+        self.max_days = int(max_days)
+        self.state: Dict[Tuple[str, str], Dict] = {}
+        self._ci: Dict[Tuple[str, str, int, int], Tuple[Tuple[int, int], Tuple[float, float, float]]] = {}
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+
+    def _entry(self, symbol: str, tf: str) -> Dict:
+        return self.state.setdefault(
+            (symbol, tf), {"first_ts": 0, "last_ts": 0, "span": 0, "days": {}, "dirty": set(), "dropped": set()}
+        )
+
+    def fold(self, symbol: str, tf: str, df: pd.DataFrame, now_ms: int | None = None) -> int:
+        """Add closed candles outside ``[first_ts, last_ts]``; returns the number folded in."""
+        st = self._entry(symbol, tf)
+        if df is None or len(df) == 0:
+            return 0
+        step_ms = tf_seconds(tf) * 1000
+        now = int(time.time() * 1000) if now_ms is None else int(now_ms)
+        ts = pd.to_numeric(df["ts"]).to_numpy(dtype="int64")
+        o = pd.to_numeric(df["open"]).to_numpy(dtype=float)
+        c = pd.to_numeric(df["close"]).to_numpy(dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ret = c / o - 1.0
+        keep = (ts + step_ms <= now) & np.isfinite(ret)
+        if st["last_ts"]:
+            keep &= (ts > st["last_ts"]) | (ts < st["first_ts"])
+        if not keep.any():
+            return 0
+        ts, ret = ts[keep], ret[keep]
+        order = np.argsort(ts, kind="stable")
+        ts, ret = ts[order], ret[order]
+        last_ts = max(int(ts[-1]), st["last_ts"])
+        cut = last_ts // DAY_MS - self.max_days  # days <= cut fall outside retention
+        live = ts // DAY_MS > cut
+        ts, ret = ts[live], ret[live]
+        hours = ((ts // 3_600_000) + WIB_OFFSET_H) % 24
+        for t, h, r in zip(ts.tolist(), hours.tolist(), ret.tolist()):
+            day = t // DAY_MS
+            part = st["days"].get(day)
+            if part is None:
+                part = st["days"][day] = [HourAgg() for _ in range(24)]
+            part[h].add(r, f"{symbol}:{tf}:{day}:{h}", self.reservoir)
+            st["dirty"].add(day)
+        for day in [d for d in st["days"] if d <= cut]:
+            del st["days"][day]
+            st["dirty"].discard(day)
+            st["dropped"].add(day)
+        if ts.size:
+            first = int(ts[0])
+            st["first_ts"] = first if not st["first_ts"] else min(st["first_ts"], first)
+        st["first_ts"] = max(st["first_ts"], (cut + 1) * DAY_MS)
+        st["last_ts"] = last_ts
+        return int(ts.size)
+
+    def window(self, symbol: str, tf: str, days: int | None = None) -> List[HourAgg]:
+        """Per-WIB-hour aggregates of the last ``days`` UTC days up to ``last_ts`` (all retained if None)."""
+        out = [HourAgg() for _ in range(24)]
+        st = self.state.get((symbol, tf))
+        if not st or not st["last_ts"]:
+            return out
+        cut = st["last_ts"] // DAY_MS - int(days) if days else None
+        for day in sorted(st["days"]):
+            if cut is not None and day <= cut:
+                continue
+            for agg, part in zip(out, st["days"][day]):
+                agg.merge(part)
+        for h, agg in enumerate(out):
+            if len(agg.sample) > self.reservoir:
+                agg.sample = random.Random(f"{symbol}:{tf}:{h}:{agg.n}").sample(agg.sample, self.reservoir)
+        return out
+
+    def _ci_for(self, symbol: str, tf: str, hour: int, agg: HourAgg, days: int = 0) -> Tuple[float, float, float]:
+        st = self.state.get((symbol, tf)) or {}
+        stamp = (agg.n, int(st.get("last_ts") or 0))
+        hit = self._ci.get((symbol, tf, int(days or 0), hour))
+        if hit is not None and hit[0] == stamp:
+            return hit[1]
+        x = np.asarray(agg.sample, dtype=float)
+        means = _bootstrap_means(x, self.iters)
+        if agg.n > x.size:
+            # reservoir mean has a wider spread than the full-sample mean: rescale around it
+            means = agg.mean + (means - float(np.mean(x))) * math.sqrt(x.size / agg.n)
+        lo = float(np.quantile(means, 0.025))
+        hi = float(np.quantile(means, 0.975))
+        p = 2 * min(float(np.mean(means >= 0)), float(np.mean(means <= 0)))
+        self._ci[(symbol, tf, int(days or 0), hour)] = (stamp, (lo, hi, p))
+        return lo, hi, p
+
+    def buckets(self, symbol: str, tf: str, days: int | None = None) -> List[Dict]:
+        if (symbol, tf) not in self.state:
+            return []
+        out: List[Dict] = []
+        for h, agg in enumerate(self.window(symbol, tf, days)):
+            if agg.n < N_MIN:
+                continue
+            lo, hi, p = self._ci_for(symbol, tf, h, agg, days or 0)
+            row = _bucket_row(h, agg.n, agg.mean, agg.hit_rate, agg.sd, lo, hi, p)
+            if row is not None:
+                out.append(row)
+        return out
+
+    # --- persistence ----------------------------------------------------------
+    async def load(self, db, symbol: str, tf: str) -> bool:
+        from sqlalchemy import select
+        from ..models import SessionHourStat
+
+        q = await db.execute(select(SessionHourStat).where(SessionHourStat.symbol == symbol, SessionHourStat.tf == tf))
+        rows = q.scalars().all()
+        if not rows:
+            return False
+        st = self._entry(symbol, tf)
+        for r in rows:
+            if 0 <= int(r.hour) < 24:
+                part = st["days"].setdefault(int(r.day), [HourAgg() for _ in range(24)])
+                part[int(r.hour)] = HourAgg(int(r.n), float(r.sum), float(r.sumsq), int(r.pos), list(r.sample or []))
+        first_day = min(st["days"])
+        # earliest candle folded in: the first day may be partial (backfill started mid-day);
+        # rows persisted before a prune may still carry a first_ts inside a dropped day
+        st["first_ts"] = max(min(int(r.first_ts or 0) for r in rows), first_day * DAY_MS)
+        st["last_ts"] = max(int(r.last_ts or 0) for r in rows)
+        st["span"] = st["last_ts"] // DAY_MS - first_day + 1
+        return True
+
+    async def persist(self, db, symbol: str, tf: str) -> None:
+        """Write the daily partials touched since the last persist; delete expired days."""
+        from sqlalchemy import delete, select
+        from ..models import SessionHourStat
+
+        st = self.state.get((symbol, tf))
+        if not st:
+            return
+        dirty, dropped = sorted(st["dirty"]), sorted(st["dropped"])
+        try:
+            where = (SessionHourStat.symbol == symbol, SessionHourStat.tf == tf)
+            if dropped:
+                await db.execute(delete(SessionHourStat).where(*where, SessionHourStat.day <= dropped[-1]))
+            rows = {}
+            if dirty:
+                q = await db.execute(select(SessionHourStat).where(*where, SessionHourStat.day.in_(dirty)))
+                rows = {(int(r.day), int(r.hour)): r for r in q.scalars().all()}
+            now = datetime.now(timezone.utc).replace(tzinfo=None)
+            for day in dirty:
+                for h, agg in enumerate(st["days"][day]):
+                    r = rows.get((day, h))
+                    if r is None:
+                        if not agg.n:
+                            continue
+                        r = SessionHourStat(symbol=symbol, tf=tf, day=day, hour=h)
+                        db.add(r)
+                    r.n, r.sum, r.sumsq, r.pos = agg.n, agg.sum, agg.sumsq, agg.pos
+                    r.sample, r.updated_at = list(agg.sample), now
+                    r.first_ts, r.last_ts = int(st["first_ts"]), int(st["last_ts"])
+            await db.commit()
+            st["dirty"].difference_update(dirty)
+            st["dropped"].difference_update(dropped)
+        except Exception:
+            await db.rollback()
+
+    async def refresh(self, symbol: str, tf: str = "1h", days: int = 120, session_factory: Callable[[], Any] | None = None) -> int:
+        """Fold newly closed candles for (symbol, tf); loads/persists via ``session_factory``."""
+        key = (symbol, tf)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            if key not in self.state and session_factory is not None:
+                try:
+                    async with session_factory() as db:
+                        await self.load(db, symbol, tf)
+                except Exception:
+                    pass
+            st = self._entry(symbol, tf)
+            step_s = tf_seconds(tf)
+            span = min(self.max_days, max(90, int(days or 90)))
+            now = time.time()
+            if st["last_ts"] and st["span"] >= span:
+                # nothing new until the bar after last_ts has closed
+                if now * 1000 < st["last_ts"] + 2 * step_s * 1000:
+                    return 0
+                limit = int((now * 1000 - st["last_ts"]) // (step_s * 1000)) + 2
+            else:
+                limit = int(span * 86400 // step_s)
+            df = await fetch_klines(symbol, tf, limit=limit)
+            n = self.fold(symbol, tf, df)
+            st["span"] = max(st["span"], span)
+            if n and session_factory is not None:
+                try:
+                    async with session_factory() as db:
+                        await self.persist(db, symbol, tf)
+                except Exception:
+                    pass
+            return n
+
+STORE = SessionStatsStore()
+
+
+def _session_factory():
+    from ..storage.db import SessionLocal
+
+    return SessionLocal
+
+
+async def session_buckets(symbol: str = "BTCUSDT", days: int = 120, timeframe: str = "1h") -> List[Dict]:
+    """Significant WIB-hour buckets for any symbol, served from the incremental store."""
+    sym = symbol.upper().replace("/", "").replace(":USDT", "")
+    tf = timeframe if timeframe != "60m" else "1h"
+    days = min(max(1, int(days or 120)), STORE.max_days)
+
+    async def _compute() -> List[Dict]:
+        await STORE.refresh(sym, tf, days, session_factory=_session_factory())
+        return STORE.buckets(sym, tf, days)
+
+    # buckets only change when a candle closes: cache per (symbol, tf, days) until then
+    out = await _MEMO.get_or_compute(("wib", sym, str(tf), days), lambda: seconds_to_next_bar(tf), _compute)
+    return list(out or [])
+
+
+async def btc_wib_buckets(days: int = 120, timeframe: str = "1h") -> List[Dict]:
+    return await session_buckets("BTCUSDT", days=days, timeframe=timeframe)
@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+import asyncio
+import datetime as dt
+import logging
+import math
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+# Long-running futures-signals refresher (scripts/futures_refresh.py):
+# - symbols are refreshed concurrently under a request-weight budget (token bucket),
+# - every cycle writes all new FuturesSignalsCache rows in one bulk insert,
+# - each symbol has its own cadence: faster for volatile or widely tracked symbols.
+
+# Approximate Binance FAPI weight of one collect_signals() (premiumIndex, openInterest,
+# depth@100 = 5, plus the futures/data endpoints which are rate limited separately).
+SYMBOL_WEIGHT = int(os.getenv("SIGNALS_SYMBOL_WEIGHT", "10"))
+# Move (bp) between two refreshes that halves the cadence.
+VOL_REF_BP = float(os.getenv("SIGNALS_VOL_REF_BP", "20"))
+
+
+class WeightBudget:
+    """Token bucket in request-weight units per minute (refilled continuously)."""
+
+    def __init__(self, per_minute: float, clock: Callable[[], float] = time.monotonic):
+        self.capacity = max(1.0, float(per_minute))
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.clock = clock
+        self.ts = clock()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.ts) * self.rate)
+        self.ts = now
+
+    async def acquire(self, weight: float) -> None:
+        w = min(float(weight), self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= w:
+                    self.tokens -= w
+                    return
+                await asyncio.sleep(min(1.0, (w - self.tokens) / self.rate))
+
+
+def next_interval(base_s: float, interest: int, vol_bp: float, min_s: float, max_s: float) -> float:
+    """Refresh interval for one symbol.
+
+    Shrinks with the number of users tracking it (log scale) and with the last observed
+    move; symbols nobody tracks drift towards ``max_s``.
+    """
+    if interest <= 0:
+        return float(max_s)
+    iv = float(base_s) / (1.0 + math.log2(1.0 + interest) / 2.0) / (1.0 + max(0.0, vol_bp) / VOL_REF_BP)
+    return min(float(max_s), max(float(min_s), iv))
+
+
+@dataclass
+class SymbolState:
+    interest: int = 1
+    next_due: float = 0.0
+    interval: float = 0.0
+    last_mark: float | None = None
+    vol_bp: float = 0.0
+
+
+class SignalsScheduler:
+    def __init__(
+        self,
+        session_factory: Callable[[], Any],
+        base_interval_s: float = 120.0,
+        min_interval_s: float = 30.0,
+        max_interval_s: float = 600.0,
+        concurrency: int = 8,
+        weight_per_min: float = 1200.0,
+        collect: Callable[[str], Awaitable[dict]] | None = None,
+    ):
+        self.session_factory = session_factory
+        self.base = float(base_interval_s)
+        self.min_s = float(min_interval_s)
+        self.max_s = float(max_interval_s)
+        self.concurrency = int(concurrency)
+        self.budget = WeightBudget(weight_per_min)
+        self._collect = collect
+        self.state: Dict[str, SymbolState] = {}
+        self.last_cycle: Dict[str, Any] = {}
+        self.last_retention: Dict[str, Any] = {}
+
+    async def collect(self, symbol: str) -> dict:
+        if self._collect is not None:
+            return await self._collect(symbol)
+        from .futures import collect_signals
+
+        return await collect_signals(symbol)
+
+    # --- universe -------------------------------------------------------------
+    async def load_interest(self) -> Dict[str, int]:
+        """{symbol: number of users tracking it} from active analyses and watchlists."""
+        from sqlalchemy import func, select
+        from ..models import Analysis, Watchlist
+
+        out: Dict[str, int] = {}
+        async with self.session_factory() as db:
+            q1 = await db.execute(
+                select(Analysis.symbol, func.count(func.distinct(Analysis.user_id)))
+                .where(Analysis.status == "active")
+                .group_by(Analysis.symbol)
+            )
+            rows = list(q1.all())
+            try:
+                q2 = await db.execute(
+                    select(Watchlist.symbol, func.count(func.distinct(Watchlist.user_id))).group_by(Watchlist.symbol)
+                )
+                rows += list(q2.all())
+            except Exception:
+                pass
+        for sym, n in rows:
+            k = str(sym).upper()
+            out[k] = out.get(k, 0) + int(n or 0)
+        return out
+
+    def set_universe(self, interest: Dict[str, int], now: float | None = None) -> None:
+        t = time.time() if now is None else now
+        for sym, n in interest.items():
+            st = self.state.get(sym)
+            if st is None:
+                self.state[sym] = SymbolState(interest=int(n), next_due=t)
+            else:
+                st.interest = int(n)
+        for sym in list(self.state):
+            if sym not in interest:
+                del self.state[sym]
+
+    def due(self, now: float | None = None) -> List[str]:
+        t = time.time() if now is None else now
+        return sorted((s for s, st in self.state.items() if st.next_due <= t), key=lambda s: self.state[s].next_due)
+
+    def _observe(self, sym: str, mark: float | None, now: float) -> None:
+        st = self.state[sym]
+        if mark and st.last_mark:
+            st.vol_bp = abs(math.log(float(mark) / st.last_mark)) * 1e4
+        if mark:
+            st.last_mark = float(mark)
+        st.interval = next_interval(self.base, st.interest, st.vol_bp, self.min_s, self.max_s)
+        st.next_due = now + st.interval
+
+    # --- one cycle ------------------------------------------------------------
+    async def cycle(self, now: float | None = None) -> Dict[str, Any]:
+        t0 = time.time() if now is None else now
+        started = time.perf_counter()
+        due = self.due(t0)
+        lags = [max(0.0, t0 - self.state[s].next_due) for s in due if self.state[s].next_due > 0]
+        sem = asyncio.Semaphore(max(1, self.concurrency))
+
+        async def one(sym: str) -> Optional[dict]:
+            async with sem:
+                await self.budget.acquire(SYMBOL_WEIGHT)
+                try:
+                    return await self.collect(sym)
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    return None
+
+        results = await asyncio.gather(*(one(s) for s in due))
+        done = time.time() if now is None else now
+        rows: List[dict] = []
+        failed = 0
+        for sym, sig in zip(due, results):
+            if sig is None:
+                failed += 1
+                # retry sooner than a normal interval, but do not hammer a broken symbol
+                self.state[sym].next_due = done + self.min_s
+                continue
+            self._observe(sym, sig.get("mark_price"), done)
+            rows.append(sig)
+        written = await self.write(rows) if rows else 0
+        self.last_cycle = {
+            "at": t0,
+            "duration_s": round(time.perf_counter() - started, 3),
+            "due": len(due),
+            "refreshed": len(rows),
+            "written": written,
+            "failed": failed,
+            "tracked": len(self.state),
+            "lag_max_s": round(max(lags), 3) if lags else 0.0,
+            "lag_avg_s": round(sum(lags) / len(lags), 3) if lags else 0.0,
+        }
+        return self.last_cycle
+
+    async def write(self, rows: List[dict]) -> int:
+        """One bulk insert + latest-row upsert (single transaction) for every row of the cycle."""
+        from sqlalchemy import insert
+        from ..models import FuturesSignalsCache
+
+        cols = {c.key for c in FuturesSignalsCache.__table__.columns} - {"id"}
+        ts = dt.datetime.now(dt.timezone.utc).replace(tzinfo=None)
+        payload = [{**{k: v for k, v in r.items() if k in cols}, "created_at": ts} for r in rows]
+        async with self.session_factory() as db:
+            try:
+                from .futures import upsert_latest
+
+                await db.execute(insert(FuturesSignalsCache), payload)
+                await upsert_latest(db, rows, ts)
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                return 0
+        return len(payload)
+
+    # --- scheduler ------------------------------------------------------------
+    async def run(
+        self,
+        tick_s: float = 5.0,
+        universe_every_s: float = 60.0,
+        symbols: Dict[str, int] | None = None,
+        on_cycle: Callable[[Dict[str, Any]], None] | None = None,
+        once: bool = False,
+        retention_every_s: float = 3600.0,
+    ) -> None:
+        """Refresh loop: reload the tracked universe periodically, run due symbols every tick,
+        roll old history into hourly aggregates every ``retention_every_s``."""
+        last_universe = 0.0
+        last_retention = 0.0
+        while True:
+            if retention_every_s > 0 and time.time() - last_retention >= retention_every_s:
+                # own try: a failing rollup must not skip the cycle, nor be retried every tick
+                last_retention = time.time()
+                try:
+                    from .futures import rollup_signals
+
+                    async with self.session_factory() as db:
+                        self.last_retention = await rollup_signals(db)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.last_retention = {"error": str(e)[:240]}
+                    logging.getLogger(__name__).warning("signals retention failed: %s", e)
+            try:
+                if symbols is not None:
+                    if not self.state:
+                        self.set_universe(symbols)
+                elif time.time() - last_universe >= universe_every_s:
+                    interest = await self.load_interest()
+                    self.set_universe(interest or {"BTCUSDT": 1})
+                    last_universe = time.time()
+                stats = await self.cycle()
+                if on_cycle is not None and (stats["due"] or once):
+                    on_cycle(stats)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                pass
+            if once:
+                return
+            await asyncio.sleep(float(tick_s))
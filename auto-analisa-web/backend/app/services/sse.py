@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+
+# Optional streaming mode (``?stream=1``) of the LLM endpoints, as server-sent events:
+#   event: delta   data: {"text": "...", ...}   completion text as it is generated
+#   event: usage   data: {...}                  tokens / cost booked for this call
+#   event: result  data: {...}                  the same body the non-streaming call returns
+#   event: error   data: {"status": 4xx/5xx, "detail": ...}
+# Errors raised before anything was streamed (auth, quota, 404) stay plain HTTP errors.
+
+Work = Callable[[Any, Callable[..., None]], Awaitable[Tuple[Dict[str, Any], Dict[str, Any]]]]
+
+
+def sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+async def sse_response(work: Work, session_factory: Optional[Callable[[], Any]] = None) -> StreamingResponse:
+    """Run ``work(db, on_delta)`` -> ``(body, usage)`` and stream it as SSE.
+
+    ``work`` gets its own DB session: the request's session is closed once the handler
+    returns, before the body is streamed. ``on_delta(text, **extra)`` emits a delta event.
+    """
+    if session_factory is None:
+        from ..storage.db import SessionLocal
+
+        session_factory = SessionLocal
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def on_delta(text: str, **extra: Any) -> None:
+        if text:
+            queue.put_nowait(("delta", {"text": text, **extra}))
+
+    async def run() -> None:
+        try:
+            async with session_factory() as db:
+                body, usage = await work(db, on_delta)
+            queue.put_nowait(("usage", usage or {}))
+            queue.put_nowait(("result", body))
+        except HTTPException as e:
+            queue.put_nowait(("error", {"status": e.status_code, "detail": e.detail}))
+        except Exception as e:
+            queue.put_nowait(("error", {"status": 500, "detail": {"error_code": "server_error", "message": str(e)[:240]}}))
+
+    task = asyncio.ensure_future(run())
+    try:
+        first = await queue.get()
+    except BaseException:
+        task.cancel()
+        raise
+    if first[0] == "error":
+        raise HTTPException(first[1]["status"], detail=first[1]["detail"])
+
+    async def body():
+        ev = first
+        try:
+            while True:
+                yield sse_event(*ev)
+                if ev[0] in ("result", "error"):
+                    return
+                ev = await queue.get()
+        finally:
+            if not task.done():
+                task.cancel()
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
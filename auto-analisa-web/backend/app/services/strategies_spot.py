@@ -27,6 +27,19 @@ def _confirmations(mode: str) -> Dict[str, List[str]]:
     }
 
 
+def snapshot(bundle) -> Dict[str, float]:
+    """Last-15m values shared by every generator (close, ATR14, VWAP, EMA20/50)."""
+    last = bundle["15m"].iloc[-1]
+    p = float(getattr(last, "close"))
+    return {
+        "p": p,
+        "a": float(getattr(last, "atr14", 0.0)),
+        "vwap15": float(getattr(last, "vwap", p)),
+        "ema20": float(getattr(last, "ema20", p)),
+        "ema50": float(getattr(last, "ema50", p)),
+    }
+
+
 def _buf(price: float, atr15: float) -> float:
     return max(float(atr15) * 0.20, abs(float(price)) * 1e-4)
 
@@ -74,15 +87,12 @@ def _tp_ladder(
     return [tp1, tp2, tp3], logic
 
 
-def plan_pb(bundle, levels: Dict) -> Dict:
-    last = bundle["15m"].iloc[-1]
-    p = float(getattr(last, "close"))
-    a = float(getattr(last, "atr14", 0.0))
+def plan_pb(bundle, levels: Dict, snap: Dict | None = None) -> Dict:
+    sn = snap or snapshot(bundle)
+    p, a = sn["p"], sn["a"]
     s1, s2 = levels["support"][:2]
     r = levels["resistance"]
-    vwap15 = float(getattr(last, "vwap", p))
-    ema20 = float(getattr(last, "ema20", p))
-    ema50 = float(getattr(last, "ema50", p))
+    vwap15, ema20, ema50 = sn["vwap15"], sn["ema20"], sn["ema50"]
     dyn_core = min(max(s1, min(vwap15, ema20)), p)
     e1 = min(dyn_core, p - a * 0.45)
     e2 = min(max(s2, ema50), e1 - a * 0.35)
@@ -108,10 +118,9 @@ def plan_pb(bundle, levels: Dict) -> Dict:
     }
 
 
-def plan_bo(bundle, levels: Dict) -> Dict:
-    last = bundle["15m"].iloc[-1]
-    p = float(getattr(last, "close"))
-    a = float(getattr(last, "atr14", 0.0))
+def plan_bo(bundle, levels: Dict, snap: Dict | None = None) -> Dict:
+    sn = snap or snapshot(bundle)
+    p, a = sn["p"], sn["a"]
     r1 = levels["resistance"][0]
     r = levels["resistance"]
     trigger = max(r1, p + a * 0.25)
@@ -142,10 +151,9 @@ def plan_bo(bundle, levels: Dict) -> Dict:
     }
 
 
-def plan_rr(bundle, levels: Dict) -> Dict:
-    last = bundle["15m"].iloc[-1]
-    p = float(getattr(last, "close"))
-    a = float(getattr(last, "atr14", 0.0))
+def plan_rr(bundle, levels: Dict, snap: Dict | None = None) -> Dict:
+    sn = snap or snapshot(bundle)
+    p, a = sn["p"], sn["a"]
     s1, s2 = levels["support"][:2]
     e1 = s1
     e2 = s2
@@ -171,10 +179,9 @@ def plan_rr(bundle, levels: Dict) -> Dict:
     }
 
 
-def plan_sr(bundle, levels: Dict) -> Dict:
-    last = bundle["15m"].iloc[-1]
-    p = float(getattr(last, "close"))
-    a = float(getattr(last, "atr14", 0.0))
+def plan_sr(bundle, levels: Dict, snap: Dict | None = None) -> Dict:
+    sn = snap or snapshot(bundle)
+    p, a = sn["p"], sn["a"]
     s1 = levels["support"][0]
     e1 = s1
     e2 = max(levels["support"][1], p - a)
@@ -200,11 +207,10 @@ def plan_sr(bundle, levels: Dict) -> Dict:
     }
 
 
-def plan_ff(bundle, levels: Dict, fvg=None) -> Dict:
+def plan_ff(bundle, levels: Dict, fvg=None, snap: Dict | None = None) -> Dict:
     # fvg: dict opsional {"mid": float, "low": float}
-    last = bundle["15m"].iloc[-1]
-    p = float(getattr(last, "close"))
-    a = float(getattr(last, "atr14", 0.0))
+    sn = snap or snapshot(bundle)
+    p, a = sn["p"], sn["a"]
     if fvg:
         e1 = fvg.get("mid", p - a * 0.5)
         e2 = fvg.get("low", p - a * 1.0)
@@ -8,7 +8,7 @@ import pandas as pd
 from .rules import Features, make_levels, last5
 from .rounding import round_futures_prices
 from .validator_futures import compute_rr_min_futures
-from .llm import ask_llm_messages
+from .llm import ask_llm_messages_blocking
 from .filters_futures import gating_signals_ok
 from .utils_num import nearest_round, round_to_step
 
@@ -113,6 +113,10 @@ def _round_number_near(price: float, symbol: str | None = None) -> float:
         tick = _tick_size_for(symbol) if symbol else None
     except Exception:
         tick = None
+    return _round_near_tick(price, tick)
+
+
+def _round_near_tick(price: float, tick: float | None) -> float:
     if tick and float(tick) > 0:
         return float(nearest_round(float(price), float(tick)))
     # fallback heuristic
@@ -165,6 +169,64 @@ def _micro_swing_price(bundle: Dict[str, pd.DataFrame], side: str) -> float | No
         return None
 
 
+def _enriched_atr(df: pd.DataFrame) -> float:
+    """Last ``atr14`` of an enriched frame; recomputed from OHLC only when missing."""
+    try:
+        val = float(df["atr14"].iloc[-1])
+        if math.isfinite(val):
+            return val
+    except Exception:
+        pass
+    return _atr(df, 14)
+
+
+class FuturesContext:
+    """Per-bundle market context shared by the scalp and swing profiles.
+
+    Price, ATR (15m/1h, read from the enriched ``atr14``), levels, the EMA-stack bias and the
+    symbol precision are computed once; volume snapshots, micro swings and round-number
+    snaps are memoized, so building the second profile on the same bundle is nearly free.
+    """
+
+    def __init__(self, bundle: Dict[str, pd.DataFrame], feat: Features, symbol: Optional[str] = None):
+        self.bundle = bundle
+        self.symbol = symbol
+        df15 = bundle["15m"]
+        self.price = float(df15["close"].iloc[-1])
+        self.atr15 = _enriched_atr(df15)
+        self.atr1h = _enriched_atr(bundle.get("1h", df15))
+        self.levels = make_levels(feat)
+        self.ema_long_ok = _ema_stack_ok(bundle, "LONG")
+        try:
+            from .rounding import precision_for
+            self.precision = precision_for(symbol or "BTCUSDT") or {}
+        except Exception:
+            self.precision = {}
+        tick = self.precision.get("tickSize")
+        self.tick = float(tick) if tick else None
+        self._vol: Dict[Tuple[str, ...], Tuple[float | None, float | None, str | None]] = {}
+        self._swing: Dict[str, float | None] = {}
+        self._round: Dict[float, float] = {}
+
+    def vol_snapshot(self, prefer: Tuple[str, ...] = ("1m", "5m")) -> Tuple[float | None, float | None, str | None]:
+        key = tuple(prefer)
+        if key not in self._vol:
+            self._vol[key] = _vol_snapshot(self.bundle, key)
+        return self._vol[key]
+
+    def micro_swing(self, side: str) -> float | None:
+        if side not in self._swing:
+            self._swing[side] = _micro_swing_price(self.bundle, side)
+        return self._swing[side]
+
+    def round_near(self, price: float) -> float:
+        key = float(price)
+        if key not in self._round:
+            # without a symbol keep the coarse heuristic, same as _round_number_near
+            self._round[key] = _round_near_tick(key, self.tick if self.symbol else None)
+        return self._round[key]
+
+
 def _tp_targets(side: str, avg_entry: float, atr: float, profile_cfg: Dict[str, Any]) -> Tuple[float, float]:
     mults = list(profile_cfg.get("tp_atr") or [1.0, 1.6])
     m1 = float(mults[0] if mults else 1.0)
@@ -259,7 +321,8 @@ def _make_scalp_candidates(bundle: Dict[str, pd.DataFrame],
                            bias: str,
                            symbol: Optional[str],
                            vol_ok: bool,
-                           fut_signals: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+                           fut_signals: Optional[Dict[str, Any]] = None,
+                           ctx: Optional[FuturesContext] = None) -> List[Dict[str, Any]]:
     df15 = bundle.get("15m")
     if df15 is None:
         df15 = next(iter(bundle.values()))
@@ -275,8 +338,8 @@ def _make_scalp_candidates(bundle: Dict[str, pd.DataFrame],
     res_levels = list(levels.get("resistance") or [])
     sup1 = float(sup_levels[0]) if sup_levels else price * 0.985
     res1 = float(res_levels[0]) if res_levels else price * 1.015
-    sup_psy = _round_number_near(sup1, symbol)
-    res_psy = _round_number_near(res1, symbol)
+    sup_psy = ctx.round_near(sup1) if ctx else _round_number_near(sup1, symbol)
+    res_psy = ctx.round_near(res1) if ctx else _round_number_near(res1, symbol)
     ema20_15 = float(getattr(last15, "ema20", price))
     vwap15 = float(getattr(last15, "vwap", ema20_15))
     ema20_5 = float(getattr(last5, "ema20", getattr(last5, "ema5", price))) if "ema20" in last5.index else price
@@ -317,13 +380,14 @@ def _make_scalp_candidates(bundle: Dict[str, pd.DataFrame],
         and body_ratio >= 0.4
     )
 
-    swing_long = _micro_swing_price(bundle, "LONG")
-    swing_short = _micro_swing_price(bundle, "SHORT")
+    swing_long = ctx.micro_swing("LONG") if ctx else _micro_swing_price(bundle, "LONG")
+    swing_short = ctx.micro_swing("SHORT") if ctx else _micro_swing_price(bundle, "SHORT")
     sl_long = _apply_sl_buffer(swing_long, "LONG", atr, profile_cfg)
     sl_short = _apply_sl_buffer(swing_short, "SHORT", atr, profile_cfg)
 
     vol_meta = {}
-    vol_curr, vol_ma, vol_tf = _vol_snapshot(bundle, tuple(profile_cfg.get("tf_exec") or ("1m", "5m")))
+    tf_exec = tuple(profile_cfg.get("tf_exec") or ("1m", "5m"))
+    vol_curr, vol_ma, vol_tf = ctx.vol_snapshot(tf_exec) if ctx else _vol_snapshot(bundle, tf_exec)
     if vol_curr is not None:
         vol_meta = {"tf": vol_tf, "current": vol_curr, "ma20": vol_ma, "mult": float(profile_cfg.get("vol_mult", 1.2))}
         vol_meta["ok"] = vol_ok
@@ -742,8 +806,15 @@ def build_plan_futures(bundle: Dict[str, pd.DataFrame],
                        llm_fix_hook=None,
                        fut_signals: Optional[Dict[str, Any]] = None,
                        symbol: Optional[str] = None,
-                       profile: str = "scalp") -> Dict[str, Any]:
-    """Bangun rencana Futures (scalp/swing) dengan kandidat dua sisi dan TTL profil."""
+                       profile: str = "scalp",
+                       ctx: Optional[FuturesContext] = None) -> Dict[str, Any]:
+    """Bangun rencana Futures (scalp/swing) dengan kandidat dua sisi dan TTL profil.
+
+    Pass one ``FuturesContext`` for every profile built on the same bundle to share the
+    market precomputation (ATR, levels, volume, precision).
+    """
+    if ctx is None:
+        ctx = FuturesContext(bundle, feat, symbol)
     profile_key = str(profile or "scalp").lower()
     cfg_raw = dict(PROFILES.get(profile_key, PROFILES["scalp"]))
     ttl_vals = list(cfg_raw.get("ttl_min") or [120, 120])
@@ -753,13 +824,13 @@ def build_plan_futures(bundle: Dict[str, pd.DataFrame],
         tp_pct = (tp_pct + tp_pct[:1])[:2]
     weights = list(cfg_raw.get("entry_weights") or [0.5, 0.5])
 
-    price = float(bundle["15m"]["close"].iloc[-1])
-    atr15 = _atr(bundle["15m"], 14)
-    atr1h = _atr(bundle.get("1h", bundle["15m"]), 14)
+    price = ctx.price
+    atr15 = ctx.atr15
+    atr1h = ctx.atr1h
     atr_pct = (atr15 / price) * 100.0 if price else 0.0
     atr_context = atr1h if str(cfg_raw.get("tf_context", "15m")).lower() == "1h" else atr15
 
-    vol_curr, vol_ma, vol_tf = _vol_snapshot(bundle, tuple(cfg_raw.get("tf_exec") or ("1m", "5m")))
+    vol_curr, vol_ma, vol_tf = ctx.vol_snapshot(tuple(cfg_raw.get("tf_exec") or ("1m", "5m")))
     vol_ok = True
     if vol_curr is not None and vol_ma not in (None, 0):
         vol_ok = vol_curr >= float(cfg_raw.get("vol_mult", 1.0)) * float(vol_ma)
@@ -768,7 +839,7 @@ def build_plan_futures(bundle: Dict[str, pd.DataFrame],
     if hint in {"LONG", "SHORT"}:
         bias = hint
     else:
-        bias = "LONG" if _ema_stack_ok(bundle, "LONG") else "SHORT"
+        bias = "LONG" if ctx.ema_long_ok else "SHORT"
         try:
             if fut_signals:
                 td15 = float((fut_signals.get("taker_delta") or {}).get("m15") or 0.0)
@@ -780,9 +851,9 @@ def build_plan_futures(bundle: Dict[str, pd.DataFrame],
         except Exception:
             pass
 
-    levels = make_levels(feat)
+    levels = ctx.levels
     if profile_key == "scalp":
-        candidate_list = _make_scalp_candidates(bundle, levels, cfg_raw, bias, symbol, vol_ok, fut_signals)
+        candidate_list = _make_scalp_candidates(bundle, levels, cfg_raw, bias, symbol, vol_ok, fut_signals, ctx=ctx)
     else:
         candidate_list = _make_swing_candidates(bundle, levels, cfg_raw, bias, symbol, price_pad_bp, fut_signals)
 
@@ -908,9 +979,9 @@ def build_plan_futures(bundle: Dict[str, pd.DataFrame],
     }
 
     try:
-        plan = round_futures_prices(symbol or "BTCUSDT", plan)
-        from .rounding import precision_for
-        prec = precision_for(symbol or "BTCUSDT") or {}
+        if ctx.tick is not None:
+            plan = round_futures_prices(symbol or "BTCUSDT", plan, tick=ctx.tick)
+        prec = ctx.precision
         plan.setdefault("metrics", {})
         if prec.get("tickSize") is not None:
             plan["metrics"]["tick_size"] = float(prec.get("tickSize"))
@@ -1002,7 +1073,7 @@ def build_plan_futures(bundle: Dict[str, pd.DataFrame],
                         "content": "\n".join(user_lines),
                     },
                 ]
-                text_llm, usage = ask_llm_messages(messages)
+                text_llm, usage = ask_llm_messages_blocking(messages)
                 from .llm import safe_json_loads
                 data = safe_json_loads(text_llm or "") if text_llm else {}
                 if not isinstance(data, dict) or not data:
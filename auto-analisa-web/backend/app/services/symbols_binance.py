@@ -1,24 +1,22 @@
 import time
 from typing import Dict, List
 
-import ccxt
+from .market_meta import META
 
 CACHE_TTL = 3600
 _state: Dict[str, object] = {"ts": 0.0, "spot": [], "futures": []}
 
 
 def refresh_symbols() -> Dict[str, List[str]]:
+    """Symbol lists from the shared market-metadata index (reloaded only when stale)."""
     global _state
-    ex = ccxt.binance({"enableRateLimit": True})
-    markets = ex.load_markets()
-    spot = sorted([
-        m for m in markets
-        if markets[m].get("spot") and markets[m].get("quote") == "USDT"
-    ])
-    futs = sorted([
-        m for m in markets
-        if markets[m].get("future") or markets[m].get("contract")
-    ])
+    META.ensure_loaded()
+    if META.is_stale():
+        META.refresh_sync()
+    spot = list(META.spot_symbols)
+    futs = list(META.futures_symbols)
+    if not spot and not futs:
+        raise RuntimeError("market metadata unavailable")
     _state = {"ts": time.time(), "spot": spot, "futures": futs}
     return {"spot": spot, "futures": futs}
 
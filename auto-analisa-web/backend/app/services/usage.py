@@ -1,4 +1,5 @@
 from __future__ import annotations
+import os
 from datetime import datetime, timezone
 from uuid import uuid4
 from sqlalchemy import select
@@ -26,6 +27,8 @@ async def inc_usage(
     cost_usd: float,
     add_call: bool = True,
     kind: str = "spot",
+    cache_hits: int = 0,
+    saved_usd: float = 0.0,
 ) -> None:
     today = _today_utc()
     month = _month_str(today)
@@ -45,6 +48,8 @@ async def inc_usage(
             output_tokens=0,
             cost_usd=0.0,
             kind=kind,
+            cache_hits=0,
+            saved_usd=0.0,
         )
         db.add(row)
         await db.flush()
@@ -54,6 +59,39 @@ async def inc_usage(
     row.input_tokens = int(row.input_tokens or 0) + int(input_tokens or 0)
     row.output_tokens = int(row.output_tokens or 0) + int(output_tokens or 0)
     row.cost_usd = float(row.cost_usd or 0.0) + float(cost_usd or 0.0)
+    if cache_hits or saved_usd:
+        row.cache_hits = int(row.cache_hits or 0) + int(cache_hits or 0)
+        row.saved_usd = float(row.saved_usd or 0.0) + float(saved_usd or 0.0)
+
+
+def llm_cost_usd(prompt_tokens: int, completion_tokens: int) -> float:
+    """Daily-usage cost with the per-MTOK prices (LLM_PRICE_*_USD_PER_MTOK)."""
+    in_price = float(os.getenv("LLM_PRICE_INPUT_USD_PER_MTOK", 0.625))
+    out_price = float(os.getenv("LLM_PRICE_OUTPUT_USD_PER_MTOK", 5.0))
+    return (int(prompt_tokens or 0) / 1_000_000.0) * in_price + (int(completion_tokens or 0) / 1_000_000.0) * out_price
+
+
+async def record_llm_usage(db: AsyncSession, *, user_id: str, model: str, usage: dict, kind: str = "spot", add_call: bool = True) -> float:
+    """``inc_usage`` from a gateway usage dict. Response-cache hits cost nothing and are
+    counted in ``cache_hits``/``saved_usd`` instead (``cache_hits`` sums several calls).
+    Returns the cost charged."""
+    usage = usage or {}
+    cost = llm_cost_usd(usage.get("prompt_tokens") or 0, usage.get("completion_tokens") or 0)
+    hits = int(usage.get("cache_hits") or (1 if usage.get("cache_hit") else 0))
+    saved = llm_cost_usd(usage.get("saved_prompt_tokens") or 0, usage.get("saved_completion_tokens") or 0)
+    await inc_usage(
+        db,
+        user_id=user_id,
+        model=model,
+        input_tokens=int(usage.get("prompt_tokens") or 0),
+        output_tokens=int(usage.get("completion_tokens") or 0),
+        cost_usd=cost,
+        add_call=add_call,
+        kind=kind,
+        cache_hits=hits,
+        saved_usd=saved,
+    )
+    return cost
 
 
 async def get_today_usage(db: AsyncSession, *, user_id: str, kind: str = "spot", limit_override: int | None = None) -> dict:
@@ -57,6 +57,23 @@ async def init_db():
                     await conn.exec_driver_sql(
                         "ALTER TABLE settings ADD COLUMN watchlist_max INT DEFAULT 20"
                     )
+                # llm_usage: response-cache counters
+                res_u = await conn.exec_driver_sql(
+                    "SELECT COLUMN_NAME FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'llm_usage'"
+                )
+                cols_u = {row[0] for row in res_u.fetchall()}
+                if "cache_hits" not in cols_u:
+                    await conn.exec_driver_sql("ALTER TABLE llm_usage ADD COLUMN cache_hits INT DEFAULT 0")
+                if "saved_usd" not in cols_u:
+                    await conn.exec_driver_sql("ALTER TABLE llm_usage ADD COLUMN saved_usd FLOAT DEFAULT 0")
+                # futures_signals_cache: composite (symbol, created_at) index for latest/retention scans
+                res3 = await conn.exec_driver_sql(
+                    "SELECT INDEX_NAME FROM INFORMATION_SCHEMA.STATISTICS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'futures_signals_cache'"
+                )
+                if "ix_futures_signals_symbol_created" not in {row[0] for row in res3.fetchall()}:
+                    await conn.exec_driver_sql(
+                        "CREATE INDEX ix_futures_signals_symbol_created ON futures_signals_cache (symbol, created_at)"
+                    )
         except Exception:
             pass
         # lightweight migrations for SQLite
@@ -297,6 +314,10 @@ async def init_db():
             cols_u = {row[1] for row in resu.fetchall()}
             if "kind" not in cols_u:
                 await conn.exec_driver_sql("ALTER TABLE llm_usage ADD COLUMN kind TEXT DEFAULT 'spot'")
+            if "cache_hits" not in cols_u:
+                await conn.exec_driver_sql("ALTER TABLE llm_usage ADD COLUMN cache_hits INTEGER DEFAULT 0")
+            if "saved_usd" not in cols_u:
+                await conn.exec_driver_sql("ALTER TABLE llm_usage ADD COLUMN saved_usd FLOAT DEFAULT 0.0")
         except Exception:
             pass
         try:
@@ -349,6 +370,9 @@ async def init_db():
                 await conn.exec_driver_sql(
                     "ALTER TABLE futures_signals_cache ADD COLUMN ob_imbalance FLOAT DEFAULT NULL"
                 )
+            await conn.exec_driver_sql(
+                "CREATE INDEX IF NOT EXISTS ix_futures_signals_symbol_created ON futures_signals_cache (symbol, created_at)"
+            )
         except Exception:
             pass
         # watchlist: add trade_type and enforce unique(user_id,symbol,trade_type)
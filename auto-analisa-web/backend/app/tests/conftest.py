@@ -26,3 +26,19 @@ def _init_db_session():
         return
     import asyncio
     asyncio.get_event_loop().run_until_complete(init_db())
+
+
+@pytest.fixture(autouse=True)
+def _reset_plan_cache():
+    # shared per-symbol plan cache must not leak fake plans between tests
+    from app.workers.analyze_worker import _PLAN_MEMO
+
+    _PLAN_MEMO.invalidate()
+    yield
+    _PLAN_MEMO.invalidate()
+
+
+@pytest.fixture(autouse=True)
+def _no_llm_response_cache(monkeypatch):
+    # the shared LLM response cache lives in test_app.db; tests that need it opt in
+    monkeypatch.setenv("LLM_RESPONSE_CACHE_TTL_S", "0")
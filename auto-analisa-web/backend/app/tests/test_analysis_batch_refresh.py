@@ -0,0 +1,131 @@
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base, Analysis
+from app.workers import analyze_worker
+
+
+@pytest.mark.asyncio
+async def test_batch_refresh_computes_once_per_symbol_and_fans_out(monkeypatch):
+    calls = []
+
+    async def fake_compute_plan(db, symbol, trade_type="spot"):
+        calls.append((symbol, trade_type))
+        if symbol == "BADUSDT":
+            raise RuntimeError("exchange down")
+        return {"symbol": symbol, "tt": trade_type, "entries": [1.0]}
+
+    monkeypatch.setattr(analyze_worker, "compute_plan", fake_compute_plan)
+
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+
+    async with factory() as db:
+        for uid in ("u1", "u2", "u3"):
+            db.add(Analysis(user_id=uid, symbol="BTCUSDT", trade_type="spot", version=2, payload_json={}, status="active"))
+        db.add(Analysis(user_id="u1", symbol="BTCUSDT", trade_type="futures", version=1, payload_json={}, status="active"))
+        db.add(Analysis(user_id="u2", symbol="ETHUSDT", trade_type="spot", version=5, payload_json={}, status="archived"))
+        db.add(Analysis(user_id="u2", symbol="BADUSDT", trade_type="spot", version=3, payload_json={"old": True}, status="active"))
+        await db.commit()
+
+    stats = await analyze_worker.refresh_active_analyses(factory)
+    assert sorted(calls) == [("BADUSDT", "spot"), ("BTCUSDT", "futures"), ("BTCUSDT", "spot")]
+    assert stats == {"groups": 3, "rows": 4, "failed": 1}
+
+    async with factory() as db:
+        rows = {(a.user_id, a.symbol, a.trade_type): a for a in (await db.execute(select(Analysis))).scalars()}
+    for uid in ("u1", "u2", "u3"):
+        a = rows[(uid, "BTCUSDT", "spot")]
+        assert a.version == 3 and a.payload_json == {"symbol": "BTCUSDT", "tt": "spot", "entries": [1.0]}
+    assert rows[("u1", "BTCUSDT", "futures")].payload_json["tt"] == "futures"
+    assert rows[("u1", "BTCUSDT", "futures")].version == 2
+    # archived cards untouched, failed groups keep their previous plan
+    assert rows[("u2", "ETHUSDT", "spot")].version == 5
+    assert rows[("u2", "BADUSDT", "spot")].version == 3 and rows[("u2", "BADUSDT", "spot")].payload_json == {"old": True}
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_run_analysis_shares_plan_across_users(monkeypatch):
+    from app.models import User
+    from app.services.budget import SETTINGS_CACHE
+
+    calls, sessions = [], []
+
+    async def fake_compute_plan(db, symbol, trade_type="spot"):
+        calls.append((symbol, trade_type))
+        sessions.append(db)
+        return {"symbol": symbol, "n": len(calls)}
+
+    monkeypatch.setattr(analyze_worker, "compute_plan", fake_compute_plan)
+    monkeypatch.setattr(SETTINGS_CACHE, "version", 100)
+    monkeypatch.setattr("time.time", lambda: 600.5)  # same closed candle throughout
+
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+
+    async with factory() as db:
+        users = [User(id=f"u{i}", email=f"u{i}@example.com", password_hash="x") for i in range(3)]
+        db.add_all(users)
+        await db.commit()
+        a0 = await analyze_worker.run_analysis(db, users[0], "btcusdt")
+        a1 = await analyze_worker.run_analysis(db, users[1], "BTCUSDT")
+        assert calls == [("BTCUSDT", "spot")]
+        assert a0.payload_json == a1.payload_json == {"symbol": "BTCUSDT", "n": 1}
+        # computed on its own session of the same database, not the caller's
+        assert sessions[0] is not db and sessions[0].bind is db.bind
+        await analyze_worker.run_analysis(db, users[0], "BTCUSDT", trade_type="futures")
+        assert len(calls) == 2
+
+        # a settings change produces a new key
+        SETTINGS_CACHE.version += 1
+        a2 = await analyze_worker.run_analysis(db, users[2], "BTCUSDT")
+        assert len(calls) == 3 and a2.payload_json["n"] == 3
+    await engine.dispose()
+
+
+def test_plan_cache_key_rolls_with_closed_candles():
+    k1 = analyze_worker.plan_cache_key("BTCUSDT", "spot", now=600.0)
+    assert k1[2:4] == (540, 300)
+    assert analyze_worker.plan_cache_key("btcusdt", "SPOT", now=659.0) == k1
+    k2 = analyze_worker.plan_cache_key("BTCUSDT", "spot", now=660.0)
+    assert k2[2:4] == (600, 300)
+
+
+@pytest.mark.asyncio
+async def test_cached_plan_outlives_the_request_that_started_it(monkeypatch):
+    import asyncio
+
+    started, release = asyncio.Event(), asyncio.Event()
+    used = []
+
+    async def fake_compute_plan(db, symbol, trade_type="spot"):
+        started.set()
+        await release.wait()
+        used.append(db)
+        return {"symbol": symbol, "open": db.is_active}
+
+    monkeypatch.setattr(analyze_worker, "compute_plan", fake_compute_plan)
+    monkeypatch.setattr("time.time", lambda: 1200.5)
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    factory = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+
+    first_db = factory()
+    first = asyncio.ensure_future(analyze_worker.cached_plan(first_db, "BTCUSDT"))
+    await started.wait()
+    async with factory() as second_db:
+        second = asyncio.ensure_future(analyze_worker.cached_plan(second_db, "BTCUSDT"))
+        await asyncio.sleep(0)
+        # the first client disconnects: its request and session go away
+        first.cancel()
+        await first_db.close()
+        release.set()
+        assert await second == {"symbol": "BTCUSDT", "open": True}
+    assert used[0] is not first_db and used[0] is not second_db
+    await engine.dispose()
@@ -0,0 +1,38 @@
+import time
+import pytest
+
+from app.services.context.btcd_service import BTCDService, FileBTCDProvider
+
+
+def _write_feed(path, values, step=86400):
+    t0 = int(time.time()) - step * len(values)
+    lines = ["ts,btcd"] + [f"{(t0 + i * step) * 1000},{v}" for i, v in enumerate(values)]
+    path.write_text("\n".join(lines), encoding="utf-8")
+
+
+@pytest.mark.asyncio
+async def test_file_feed_trend_and_cache(tmp_path):
+    feed = tmp_path / "btcd.csv"
+    _write_feed(feed, [50.0 - 0.1 * i for i in range(60)])
+    svc = BTCDService(FileBTCDProvider(feed))
+    assert await svc.refresh() == 60
+    assert svc.get_series("1D", limit=10)[-1] == pytest.approx(50.0 - 0.1 * 59)
+    assert svc.get_trend("1D") == -1
+    # slope is cached until the bar closes, even if raw points change underneath
+    svc.points.append((time.time() + 10, 99.0))
+    assert svc.get_trend("1D") == -1
+    # incremental refresh only appends points newer than what is held
+    assert await svc.refresh() == 0
+
+
+@pytest.mark.asyncio
+async def test_json_feed_and_fallback(tmp_path):
+    feed = tmp_path / "btcd.json"
+    feed.write_text('[{"ts": "2024-01-01T00:00:00Z", "btcd": 50}, {"ts": "2024-01-02T00:00:00Z", "btcd": 51},'
+                    ' {"ts": "2024-01-03T00:00:00Z", "btcd": 52}]', encoding="utf-8")
+    svc = BTCDService(FileBTCDProvider(feed))
+    await svc.refresh()
+    assert svc.get_series("1D") == [50.0, 51.0, 52.0]
+    assert svc.get_trend("1D") == 1
+    # no provider: legacy synthetic/flat series
+    assert len(BTCDService().get_series("1D", limit=5)) == 5
@@ -0,0 +1,102 @@
+import asyncio
+import pytest
+import pandas as pd
+
+from app.services.cache import AsyncMemo, seconds_to_next_bar
+
+
+def _df(n=200, base=100.0, step=0.2):
+    idx = pd.date_range("2024-01-01", periods=n, freq="15min", tz="UTC")
+    close = [base + i * step for i in range(n)]
+    return pd.DataFrame({
+        "open": [c - 0.05 for c in close],
+        "high": [c + 0.1 for c in close],
+        "low": [c - 0.1 for c in close],
+        "close": close,
+        "volume": [100.0] * n,
+    }, index=idx)
+
+
+def test_seconds_to_next_bar():
+    assert seconds_to_next_bar("1h", now=3600 * 10 + 600) == 3000
+    assert seconds_to_next_bar("15m", now=899.0, min_ttl=5) == 5.0
+
+
+@pytest.mark.asyncio
+async def test_async_memo_shares_inflight():
+    memo = AsyncMemo()
+    calls = {"n": 0}
+
+    async def factory():
+        calls["n"] += 1
+        await asyncio.sleep(0.01)
+        return 7
+
+    vals = await asyncio.gather(*[memo.get_or_compute("k", 60, factory) for _ in range(5)])
+    assert vals == [7] * 5 and calls["n"] == 1
+    assert await memo.get_or_compute("k", 60, factory) == 7 and calls["n"] == 1
+
+
+@pytest.mark.asyncio
+async def test_async_memo_survives_cancelled_leader():
+    memo = AsyncMemo()
+    started, release = asyncio.Event(), asyncio.Event()
+    state = {"cancelled": False}
+
+    async def factory():
+        started.set()
+        try:
+            await release.wait()
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+        return 7
+
+    leader = asyncio.ensure_future(memo.get_or_compute("k", 60, factory))
+    await started.wait()
+    follower = asyncio.ensure_future(memo.get_or_compute("k", 60, factory))
+    await asyncio.sleep(0)
+    leader.cancel()
+    await asyncio.sleep(0)
+    release.set()
+    assert await follower == 7 and not state["cancelled"]
+    assert leader.cancelled() and memo.peek("k") == 7
+
+    # once every caller is gone the computation is cancelled
+    started.clear()
+    release.clear()
+    only = asyncio.ensure_future(memo.get_or_compute("k2", 60, factory))
+    await started.wait()
+    only.cancel()
+    await asyncio.sleep(0.01)
+    assert state["cancelled"] and memo.peek("k2") is None
+
+
+@pytest.mark.asyncio
+async def test_build_context_json_concurrent_and_cached(monkeypatch):
+    import app.services.context.context_rules as cr
+
+    loads = []
+
+    async def fake_load(symbol, tf, market_type="futures", limit=600):
+        loads.append((symbol, tf))
+        return _df()
+
+    monkeypatch.setattr(cr, "_load_tf", fake_load, raising=True)
+    monkeypatch.setattr(cr, "_MEMO", AsyncMemo(), raising=True)
+    monkeypatch.setattr(cr.FUND, "get", lambda symbol: 0.001, raising=True)
+    monkeypatch.setattr(cr.FUND, "cache", {}, raising=True)
+    monkeypatch.setattr(cr.OI, "get_change", lambda symbol, lookback_h=24: 0.05, raising=True)
+    monkeypatch.setattr(cr.OI, "cache", {}, raising=True)
+
+    ctx = await cr.build_context_json("OPUSDT", "fast")
+    assert ctx["funding"] == {"rate": 0.001, "score": 1}
+    assert ctx["alt_btc"]["dir"] == "LONG"
+    assert ctx["price_oi"]["label"] == "NAIK KUAT"
+    assert ctx["btcd"] is not None
+    # BTC trend TF is loaded once even though alt_btc and btcd both need it
+    assert loads.count(("BTCUSDT", "15m")) == 1
+    n_first = len(loads)
+    await cr.build_context_json("OPUSDT", "fast")
+    # warm cache: only price/OI re-reads the (market-cached) trend TF
+    assert len(loads) == n_first + 1
@@ -73,8 +73,9 @@ async def test_analyze_and_save_snapshot(monkeypatch):
     from app import services
     # patch analyze worker path via services.market
     monkeypatch.setattr(services.market, "fetch_klines", fake_fetch, raising=True)
-    monkeypatch.setattr(services.llm, "ask_llm", lambda prompt: ("narasi uji", {"prompt_tokens":0, "completion_tokens":0, "total_tokens":0}), raising=True)
-    monkeypatch.setattr(services.llm, "ask_llm", lambda prompt: ("narasi uji", {"prompt_tokens":0, "completion_tokens":0, "total_tokens":0}), raising=True)
+    async def fake_ask(prompt, **kw):
+        return "narasi uji", {"prompt_tokens":0, "completion_tokens":0, "total_tokens":0}
+    monkeypatch.setattr(services.llm, "ask_llm", fake_ask, raising=True)
 
     async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
         # Auth
@@ -113,7 +114,9 @@ async def test_ohlcv_endpoint_mock(monkeypatch):
 @pytest.mark.asyncio
 async def test_macro_generate_and_today(monkeypatch):
     from app import services
-    monkeypatch.setattr(services.llm, "ask_llm", lambda prompt: ("Ringkasan makro uji", {"prompt_tokens":0,"completion_tokens":0,"total_tokens":0}), raising=True)
+    async def fake_ask(prompt, **kw):
+        return "Ringkasan makro uji", {"prompt_tokens":0,"completion_tokens":0,"total_tokens":0}
+    monkeypatch.setattr(services.llm, "ask_llm", fake_ask, raising=True)
 
     async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
         # Create user and make admin
@@ -133,3 +136,40 @@ async def test_macro_generate_and_today(monkeypatch):
         assert r.status_code == 200
         r = await client.get("/api/macro/today")
         assert r.status_code == 200 and "narrative" in r.json()
+
+
+@pytest.mark.asyncio
+async def test_macro_generate_quota_error_turns_llm_off(monkeypatch):
+    from app import services
+    from app.services.budget import SETTINGS_CACHE, load_settings_row
+    from app.services.llm_gateway import GATEWAY, FakeProvider, LLMError
+
+    def quota(payload):
+        raise LLMError(429, code="insufficient_quota", message="You exceeded your current quota.", type="insufficient_quota")
+
+    async def _allowed(db):
+        return True, None
+
+    monkeypatch.setattr(services.llm, "should_use_llm", _allowed, raising=True)
+    monkeypatch.setattr(GATEWAY, "provider", FakeProvider(reply=quota))
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        await client.post("/api/auth/register", json={"email":"quota-admin@example.com","password":"secret123"})
+        r = await client.post("/api/auth/login", json={"email":"quota-admin@example.com","password":"secret123"})
+        tok = r.json()["token"]
+        uid = (await client.get("/api/auth/me", headers={"Authorization": f"Bearer {tok}"})).json()["id"]
+        async with SessionLocal() as s:
+            u = await s.get(User, uid)
+            u.role = "admin"
+            row = await load_settings_row(s)
+            was, row.use_llm = row.use_llm, True
+            await s.commit()
+        try:
+            r = await client.post("/api/admin/macro/generate", headers={"Authorization": f"Bearer {tok}"})
+            assert r.status_code == 503
+            async with SessionLocal() as s:
+                assert (await load_settings_row(s)).use_llm is False
+        finally:
+            async with SessionLocal() as s:
+                (await load_settings_row(s)).use_llm = was
+                await s.commit()
+            await SETTINGS_CACHE.invalidate()
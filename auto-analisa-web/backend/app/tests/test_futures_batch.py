@@ -0,0 +1,192 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.main import app
+
+
+@pytest.mark.asyncio
+async def test_analyze_batch_concurrent_and_streamed(monkeypatch):
+    settings.REQUIRE_LOGIN = False
+    monkeypatch.setenv("FUTURES_PLAN_WORKERS", "0")
+    sig_calls = []
+    inflight = {"n": 0, "max": 0}
+
+    async def fake_signals_many(db, symbols):
+        sig_calls.append(list(symbols))
+        return {s: {"has_data": True, "symbol": s} for s in symbols}
+
+    async def fake_fetch_bundle(symbol, tfs=(), market="spot"):
+        inflight["n"] += 1
+        inflight["max"] = max(inflight["max"], inflight["n"])
+        # ETH finishes first
+        await asyncio.sleep(0.01 if symbol == "ETHUSDT" else 0.1)
+        inflight["n"] -= 1
+        if symbol == "BADUSDT":
+            raise RuntimeError("no market")
+        return {"market": market}
+
+    def fake_build(symbol, bundle, sig, use_llm_fixes=False):
+        return {"symbol": symbol, "sig": sig["symbol"], "market": bundle["market"], "notes": []}
+
+    monkeypatch.setattr("app.routers.futures_plan.latest_signals_many", fake_signals_many)
+    monkeypatch.setattr("app.services.market.fetch_bundle", fake_fetch_bundle)
+    monkeypatch.setattr("app.services.futures_batch.build_symbol_plans", fake_build)
+
+    body = {"symbols": ["btcusdt", "ETHUSDT", "BADUSDT", "BTCUSDT"]}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        resp = await client.post("/futures/analyze-batch", json=body)
+        assert resp.status_code == 200
+        data = resp.json()
+        assert [r["symbol"] for r in data["results"]] == ["BTCUSDT", "ETHUSDT", "BADUSDT"]  # input order, deduped
+        ok = {r["symbol"]: r for r in data["results"] if r["ok"]}
+        assert ok["BTCUSDT"]["plan"]["market"] == "futures" and ok["BTCUSDT"]["signals"]["symbol"] == "BTCUSDT"
+        assert data["results"][2] == {"ok": False, "symbol": "BADUSDT", "error": "no market"}
+        assert sig_calls == [["BTCUSDT", "ETHUSDT", "BADUSDT"]]  # one signals lookup for the batch
+        assert inflight["max"] == 3
+
+        resp = await client.post("/futures/analyze-batch", json={**body, "stream": True})
+        assert resp.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(x) for x in resp.text.splitlines() if x.strip()]
+        assert lines[0]["symbol"] == "ETHUSDT"  # completion order
+        assert lines[-1] == {"done": True, "count": 3}
+
+
+@pytest.mark.asyncio
+async def test_analyze_batch_stream_is_not_buffered_by_gzip(monkeypatch):
+    settings.REQUIRE_LOGIN = False
+    monkeypatch.setenv("FUTURES_PLAN_WORKERS", "0")
+    release = asyncio.Event()
+
+    async def fake_signals_many(db, symbols):
+        return {s: {"symbol": s} for s in symbols}
+
+    async def fake_fetch_bundle(symbol, tfs=(), market="spot"):
+        if symbol == "BTCUSDT":
+            await release.wait()  # the last symbol only finishes once the first line is out
+        return {"market": market}
+
+    def fake_build(symbol, bundle, sig, use_llm_fixes=False):
+        return {"symbol": symbol, "notes": ["x" * 2000]}  # above GZip minimum_size
+
+    monkeypatch.setattr("app.routers.futures_plan.latest_signals_many", fake_signals_many)
+    monkeypatch.setattr("app.services.market.fetch_bundle", fake_fetch_bundle)
+    monkeypatch.setattr("app.services.futures_batch.build_symbol_plans", fake_build)
+
+    body = json.dumps({"symbols": ["ETHUSDT", "BTCUSDT"], "stream": True}).encode()
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": "/futures/analyze-batch", "raw_path": b"/futures/analyze-batch",
+        "query_string": b"", "root_path": "", "client": ("test", 1), "server": ("test", 80),
+        "headers": [(b"content-type", b"application/json"), (b"accept-encoding", b"gzip"), (b"host", b"test")],
+    }
+    received = iter([{"type": "http.request", "body": body, "more_body": False}])
+
+    async def receive():
+        try:
+            return next(received)
+        except StopIteration:
+            await asyncio.Event().wait()
+
+    start, chunks = {}, []
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            start.update(message)
+        elif message.get("body"):
+            chunks.append(message["body"])
+            release.set()
+
+    await asyncio.wait_for(app(scope, receive, send), 5)
+    headers = {k.decode(): v.decode() for k, v in start["headers"]}
+    assert headers.get("content-encoding") != "gzip"
+    # ETH arrived as its own readable line while BTC was still pending
+    assert json.loads(chunks[0])["symbol"] == "ETHUSDT"
+    lines = [json.loads(x) for x in b"".join(chunks).decode().splitlines()]
+    assert [x.get("symbol") for x in lines] == ["ETHUSDT", "BTCUSDT", None] and lines[-1]["done"]
+
+
+def _frame(n, freq, seed):
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    close = 100.0 + np.cumsum(rng.normal(0.02, 0.2, n))
+    return pd.DataFrame({
+        "ts": pd.date_range("2025-01-01", periods=n, freq=freq),
+        "open": close + rng.normal(0, 0.05, n),
+        "high": close + np.abs(rng.normal(0, 0.1, n)),
+        "low": close - np.abs(rng.normal(0, 0.1, n)),
+        "close": close,
+        "volume": rng.random(n) * 1000,
+    })
+
+
+def test_build_symbol_plans_shares_market_context(monkeypatch):
+    from app.services import rounding, strategy_futures
+    from app.services.futures_batch import build_symbol_plans
+    from app.services.rules import Features
+
+    bundle = {tf: _frame(200, f, i) for i, (tf, f) in enumerate(
+        [("1m", "1min"), ("5m", "5min"), ("15m", "15min"), ("1h", "1h"), ("4h", "4h")])}
+    sig = {"taker_delta": {"m15": 0.01}, "basis": {"bp": 1.0}}
+
+    # reference: each profile built on its own, without a shared context
+    feat = Features(bundle)
+    feat.enrich()
+    kw = dict(side_hint="AUTO", fut_signals=sig, symbol="BTCUSDT")
+    scalp = strategy_futures.build_plan_futures(bundle, feat, profile="scalp", **kw)
+    swing = strategy_futures.build_plan_futures(bundle, feat, profile="swing", **kw)
+
+    calls = {"levels": 0, "precision": 0, "tick": 0}
+
+    def counting(name, fn):
+        def wrapper(*a, **k):
+            calls[name] += 1
+            return fn(*a, **k)
+        return wrapper
+
+    monkeypatch.setattr(strategy_futures, "make_levels", counting("levels", strategy_futures.make_levels))
+    monkeypatch.setattr(rounding, "precision_for", counting("precision", rounding.precision_for))
+    monkeypatch.setattr(rounding, "_tick_size_for", counting("tick", rounding._tick_size_for))
+
+    plan = build_symbol_plans("BTCUSDT", {tf: df.copy() for tf, df in bundle.items()}, sig)
+    assert calls == {"levels": 1, "precision": 1, "tick": 0}
+    assert {k: v for k, v in plan.items() if k != "variants"} == scalp
+    assert plan["variants"]["swing"] == swing
+
+
+@pytest.mark.asyncio
+async def test_single_symbol_plan_runs_llm_fix_pass_off_the_loop(monkeypatch):
+    from app.routers import futures_plan
+    from app.services.llm_gateway import GATEWAY, FakeProvider
+
+    monkeypatch.setenv("FUTURES_PLAN_WORKERS", "0")
+    bundle = {tf: _frame(200, f, i) for i, (tf, f) in enumerate(
+        [("1m", "1min"), ("5m", "5min"), ("15m", "15min"), ("1h", "1h"), ("4h", "4h")])}
+    prov = FakeProvider(reply={"entries": []})
+    monkeypatch.setattr(GATEWAY, "provider", prov)
+
+    async def fake_fetch_bundle(symbol, tfs=(), market="spot"):
+        return {tf: df.copy() for tf, df in bundle.items()}
+
+    async def fake_signals(db, symbol):
+        return {"taker_delta": {"m15": 0.01}}
+
+    async def allow(db, user, use_llm):
+        return True, None
+
+    async def passthrough(db, user, symbol, plan, sig, use_llm, allow_llm, deny_reason):
+        return plan
+
+    monkeypatch.setattr(futures_plan, "fetch_bundle", fake_fetch_bundle)
+    monkeypatch.setattr(futures_plan, "latest_signals", fake_signals)
+    monkeypatch.setattr(futures_plan, "_llm_gate", allow)
+    monkeypatch.setattr(futures_plan, "_finalize", passthrough)
+
+    plan = await futures_plan._build_futures("BTCUSDT", None, None, use_llm=True)
+    assert plan["variants"]["swing"]
+    assert len(prov.calls) == 1  # the scalp fix-pass reached the gateway
@@ -0,0 +1,160 @@
+import asyncio
+import datetime as dt
+import time
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base, FuturesSignalsCache, FuturesSignalsHourly, FuturesSignalsLatest
+from app.services import futures
+from app.services.http_client import get_http
+
+
+@pytest.mark.asyncio
+async def test_refresh_signals_cache_gathers_metrics_concurrently(monkeypatch):
+    monkeypatch.delenv("MARKET_OFFLINE", raising=False)
+    monkeypatch.setenv("SIGNALS_CALL_TIMEOUT_S", "0.5")
+    calls = []
+
+    async def fake_get(url, params=None, timeout=None):
+        calls.append(url.rsplit("/", 1)[-1])
+        if url.endswith("/depth"):
+            await asyncio.sleep(5)  # hung endpoint: capped by the per-call timeout
+        await asyncio.sleep(0.1)
+        if url.endswith("premiumIndex"):
+            return {"markPrice": "101", "indexPrice": "100", "lastFundingRate": "0.0001"}
+        if url.endswith("openInterest"):
+            return {"openInterest": "1234"}
+        if "LongShort" in url:
+            return [{"longShortRatio": "1.5"}]
+        if url.endswith("takerlongshortRatio"):
+            return [{"buyVol": "3", "sellVol": "1"}]
+        if url.endswith("openInterestHist"):
+            return [{"sumOpenInterest": "10"}, {"sumOpenInterest": "12"}]
+        return None
+
+    monkeypatch.setattr(futures, "_http_get_json", fake_get)
+
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+
+    t0 = time.perf_counter()
+    async with factory() as db:
+        row = await futures.refresh_signals_cache(db, "btcusdt")
+    elapsed = time.perf_counter() - t0
+
+    assert len(calls) == 10
+    assert elapsed < 1.5  # sequential would be >= 0.9s plus the 5s hang
+    assert row.symbol == "BTCUSDT" and row.oi_now == 1234.0
+    assert row.basis_bp == pytest.approx(100.0)
+    assert row.lsr_accounts == 1.5 and row.lsr_positions == 1.5
+    assert row.taker_delta_m5 == pytest.approx(0.5)
+    assert row.oi_delta_h1 == 2.0
+    assert row.spread_bp is None  # timed-out metric left empty
+
+    async with factory() as db:
+        latest = await db.get(FuturesSignalsLatest, "BTCUSDT")
+        assert latest.oi_now == 1234.0 and latest.created_at == row.created_at
+        sig = await futures.latest_signals(db, "btcusdt")
+        assert sig["has_data"] and sig["oi"]["now"] == 1234.0
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_http_client_is_shared_within_loop():
+    a = get_http()
+    assert get_http() is a and not a.is_closed
+
+
+@pytest.mark.asyncio
+async def test_rollup_signals_downsamples_old_history():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    now = dt.datetime(2024, 1, 10, 12, 30)
+    async with factory() as db:
+        # two old hours (3 + 1 samples), one recent sample, one ancient rollup
+        for minute, oi in ((0, 10.0), (20, 20.0), (40, None)):
+            db.add(FuturesSignalsCache(symbol="BTCUSDT", oi_now=oi, next_funding_time=f"t{minute}", created_at=dt.datetime(2024, 1, 5, 3, minute)))
+        db.add(FuturesSignalsCache(symbol="BTCUSDT", oi_now=5.0, created_at=dt.datetime(2024, 1, 5, 4, 10)))
+        db.add(FuturesSignalsCache(symbol="BTCUSDT", oi_now=99.0, created_at=now - dt.timedelta(hours=1)))
+        db.add(FuturesSignalsHourly(symbol="BTCUSDT", hour=dt.datetime(2023, 1, 1), n=1, oi_now=1.0))
+        await db.commit()
+
+        stats = await futures.rollup_signals(db, keep_raw_h=48, keep_hourly_days=90, batch=2, now=now)
+        assert stats == {"rolled": 4, "hours": 3, "pruned_hourly": 1}
+        hourly = {h.hour: h for h in (await db.execute(select(FuturesSignalsHourly))).scalars()}
+        h3 = hourly[dt.datetime(2024, 1, 5, 3)]
+        # batch=2 splits hour 03 across two passes; the merge keeps the mean exact
+        assert h3.n == 3 and h3.oi_now == pytest.approx(15.0) and h3.next_funding_time == "t40"
+        assert hourly[dt.datetime(2024, 1, 5, 4)].oi_now == 5.0
+        left = (await db.execute(select(func.count()).select_from(FuturesSignalsCache))).scalar_one()
+        assert left == 1
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_rollup_merge_weights_each_metric_by_its_own_samples():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    async with factory() as db:
+        # batch=2: [10, None] then [40]; the NULL must not weigh the first mean
+        for minute, oi in ((0, 10.0), (20, None), (40, 40.0)):
+            db.add(FuturesSignalsCache(symbol="BTCUSDT", oi_now=oi, basis_bp=1.0, created_at=dt.datetime(2024, 1, 5, 3, minute)))
+        await db.commit()
+        await futures.rollup_signals(db, keep_raw_h=48, batch=2, now=dt.datetime(2024, 1, 10))
+        h = (await db.execute(select(FuturesSignalsHourly))).scalar_one()
+        assert h.n == 3 and h.oi_now == pytest.approx(25.0) and h.basis_bp == pytest.approx(1.0)
+        assert h.counts["oi_now"] == 2 and h.counts["basis_bp"] == 3
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_upsert_latest_is_one_statement_per_batch(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'latest.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    t0, t1 = dt.datetime(2024, 1, 1), dt.datetime(2024, 1, 1, 0, 1)
+    async with factory() as a, factory() as b:
+        # both writers see no ETH row yet; the second insert must update, not collide
+        assert (await a.get(FuturesSignalsLatest, "ETHUSDT")) is None
+        await futures.upsert_latest(b, [{"symbol": "ETHUSDT", "oi_now": 1.0}], t0)
+        await b.commit()
+        await futures.upsert_latest(a, [{"symbol": "ethusdt", "oi_now": 2.0}, {"symbol": "BTCUSDT", "oi_now": 3.0}], t1)
+        await a.commit()
+    async with factory() as db:
+        rows = {r.symbol: r for r in (await db.execute(select(FuturesSignalsLatest))).scalars()}
+    assert rows["ETHUSDT"].oi_now == 2.0 and rows["ETHUSDT"].created_at == t1
+    assert rows["BTCUSDT"].oi_now == 3.0
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_latest_signals_many_collects_only_missing(monkeypatch):
+    collected = []
+
+    async def fake_collect(sym):
+        collected.append(sym)
+        return {"symbol": sym, "oi_now": 7.0, "mark_price": 1.0}
+
+    monkeypatch.setattr(futures, "collect_signals", fake_collect)
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    async with factory() as db:
+        db.add(FuturesSignalsLatest(symbol="BTCUSDT", oi_now=1.0))
+        await db.commit()
+        out = await futures.latest_signals_many(db, ["btcusdt", "ETHUSDT", "ETHUSDT"])
+        assert collected == ["ETHUSDT"]
+        assert out["BTCUSDT"]["oi"]["now"] == 1.0 and out["ETHUSDT"]["oi"]["now"] == 7.0
+        assert (await db.get(FuturesSignalsLatest, "ETHUSDT")).oi_now == 7.0
+    await engine.dispose()
@@ -20,7 +20,7 @@ async def test_gpt_analyze_persist_and_fetch(monkeypatch):
     async def _get_today_usage(db, user_id, kind, limit_override=None):
         return {"remaining": 5}
 
-    async def _inc_usage(db, **kwargs):
+    async def _record_llm_usage(db, **kwargs):
         return None
 
     class _Settings:
@@ -29,7 +29,7 @@ async def test_gpt_analyze_persist_and_fetch(monkeypatch):
     async def _get_or_init_settings(db):
         return _Settings()
 
-    def _call_gpt(prompt):
+    async def _call_gpt(prompt, **kw):
         return (
             {
                 "text": {
@@ -56,7 +56,7 @@ async def test_gpt_analyze_persist_and_fetch(monkeypatch):
 
     monkeypatch.setattr("app.routers.gpt_analyze.should_use_llm", _should_use_llm)
     monkeypatch.setattr("app.routers.gpt_analyze.get_today_usage", _get_today_usage)
-    monkeypatch.setattr("app.routers.gpt_analyze.inc_usage", _inc_usage)
+    monkeypatch.setattr("app.routers.gpt_analyze.record_llm_usage", _record_llm_usage)
     monkeypatch.setattr("app.routers.gpt_analyze.get_or_init_settings", _get_or_init_settings)
     monkeypatch.setattr("app.routers.gpt_analyze.call_gpt", _call_gpt)
 
@@ -103,3 +103,39 @@ async def test_gpt_analyze_persist_and_fetch(monkeypatch):
 
         r4 = await client.get("/api/gpt/futures/report", params={"symbol": "BTCUSDT", "mode": "scalping"})
         assert r4.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_gpt_analyze_streams_deltas_then_result(monkeypatch):
+    import json
+    from app.services.llm_gateway import GATEWAY, FakeProvider
+
+    monkeypatch.setattr(settings, "REQUIRE_LOGIN", False)
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+
+    async def _should_use_llm(db):
+        return True, None
+
+    monkeypatch.setattr("app.routers.gpt_analyze.should_use_llm", _should_use_llm)
+    reply = {"text": {"section_swing": {"posisi": "SHORT", "tp": [0.9], "sl": 1.1}}, "overlay": {"tf": "15m", "lines": []}}
+    prov = FakeProvider(reply=reply, chunk=16, usage={"prompt_tokens": 40, "completion_tokens": 20, "total_tokens": 60})
+    monkeypatch.setattr(GATEWAY, "provider", prov)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        resp = await client.post(
+            "/api/gpt/futures/analyze",
+            params={"stream": 1},
+            json={"symbol": "ethusdt", "mode": "swing", "payload": {}, "opts": {}},
+        )
+    assert resp.status_code == 200 and resp.headers["content-type"].startswith("text/event-stream")
+    events = []
+    for block in resp.text.strip().split("\n\n"):
+        ev, data = block.split("\n", 1)
+        events.append((ev[len("event: "):], json.loads(data[len("data: "):])))
+    kinds = [e for e, _ in events]
+    assert kinds[-2:] == ["usage", "result"] and kinds.count("delta") > 2
+    streamed = "".join(d["text"] for e, d in events if e == "delta")
+    assert json.loads(streamed) == reply and prov.calls[0]["stream"] is True
+    usage, result = events[-2][1], events[-1][1]
+    assert usage["prompt_tokens"] == 40 and usage["cost_usd"] > 0
+    assert result["report_id"] > 0 and result["text"]["section_swing"]["posisi"] == "SHORT"
@@ -0,0 +1,26 @@
+import os
+import subprocess
+import sys
+
+from app.services import market
+from app.services.context.funding_service import FundingService
+
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+def test_app_import_does_not_load_heavy_clients():
+    code = "import sys, app.main; print(','.join(m for m in ('ccxt', 'openai') if m in sys.modules))"
+    out = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == ""
+
+
+def test_clients_built_on_first_use():
+    svc = FundingService()
+    assert svc._client is None
+    assert svc.client is not None and svc.client is svc.client
+    injected = object()
+    assert FundingService(client=injected).client is injected
+    # legacy module attributes still resolve to the shared clients
+    assert market.ex is market.client("spot")
+    assert market.ex_usdm is market.client("futures")
@@ -0,0 +1,186 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from app.services import llm
+from app.services.llm_gateway import GATEWAY, FakeProvider, LLMGateway
+from app.services_v2.llm_client import LlmClient
+
+
+class _Tracking(FakeProvider):
+    def __init__(self, **kw):
+        super().__init__(**kw)
+        self.inflight = 0
+        self.max_inflight = 0
+        self.cancelled = 0
+
+    async def post(self, path, payload, timeout):
+        self.inflight += 1
+        self.max_inflight = max(self.max_inflight, self.inflight)
+        try:
+            return await super().post(path, payload, timeout)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.inflight -= 1
+
+
+@pytest.mark.asyncio
+async def test_gateway_caps_concurrency_and_times_out():
+    prov = _Tracking(reply={"ok": True}, delay=0.05)
+    gw = LLMGateway(prov, max_concurrency=2)
+    out = await asyncio.gather(*(gw.chat([{"role": "user", "content": str(i)}]) for i in range(5)))
+    assert prov.max_inflight == 2 and len(prov.calls) == 5
+    assert out[0] == ('{"ok": true}', {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15})
+
+    slow = LLMGateway(_Tracking(delay=5), max_concurrency=1)
+    with pytest.raises(TimeoutError):
+        await slow.chat([{"role": "user", "content": "x"}], timeout=0.05)
+
+
+@pytest.mark.asyncio
+async def test_gateway_cancels_when_client_disconnects(monkeypatch):
+    monkeypatch.setenv("LLM_DISCONNECT_POLL_S", "0.01")
+    prov = _Tracking(delay=5)
+    gw = LLMGateway(prov)
+
+    class _Req:
+        polls = 0
+
+        async def is_disconnected(self):
+            self.polls += 1
+            return self.polls >= 3
+
+    with pytest.raises(HTTPException) as exc:
+        await asyncio.wait_for(gw.chat([{"role": "user", "content": "x"}], request=_Req()), 2.0)
+    assert exc.value.status_code == 499
+    await asyncio.sleep(0)
+    assert prov.cancelled == 1 and prov.inflight == 0
+
+
+@pytest.mark.asyncio
+async def test_legacy_and_v2_clients_use_gateway(monkeypatch):
+    prov = FakeProvider(reply=lambda payload: {"model": payload["model"]})
+    monkeypatch.setattr(GATEWAY, "provider", prov)
+    monkeypatch.setenv("OPENAI_JSON_STRICT", "1")
+
+    text, usage = await llm.ask_llm_messages([{"role": "user", "content": "hi"}])
+    assert json.loads(text) == {"model": llm.OPENAI_MODEL} and usage["total_tokens"] == 15
+    assert prov.calls[0]["path"] == "chat/completions"
+    assert prov.calls[0]["response_format"] == {"type": "json_object"}
+
+    out = await LlmClient(model="m-v2").structured_response("sys", "user", {"type": "object"})
+    assert out == {"model": "m-v2"} and prov.calls[1]["path"] == "responses"
+
+
+@pytest.mark.asyncio
+async def test_response_cache_shared_across_users_and_counted(monkeypatch):
+    from sqlalchemy import select
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.models import Base, LLMUsage
+    from app.services.llm_cache import LLMResponseStore
+    from app.services.usage import llm_cost_usd, record_llm_usage
+
+    monkeypatch.setenv("LLM_RESPONSE_CACHE_TTL_S", "60")
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    prov = FakeProvider(reply={"verdict": "valid"}, usage={"prompt_tokens": 1000, "completion_tokens": 200, "total_tokens": 1200})
+    gw = LLMGateway(prov, cache=LLMResponseStore(factory))
+    msgs = [{"role": "user", "content": "plan A"}]
+
+    text1, u1 = await gw.chat(msgs, model="m", temperature=0.2)
+    text2, u2 = await gw.chat(msgs, model="m", temperature=0.2)
+    assert text1 == text2 and len(prov.calls) == 1
+    assert u1["prompt_tokens"] == 1000 and not u1.get("cache_hit")
+    assert u2 == {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "cache_hit": True,
+                  "saved_prompt_tokens": 1000, "saved_completion_tokens": 200}
+    # different options or messages are different keys; cache=False bypasses it
+    await gw.chat(msgs, model="m", temperature=0.5)
+    await gw.chat([{"role": "user", "content": "plan B"}], model="m", temperature=0.2)
+    await gw.chat(msgs, model="m", temperature=0.2, cache=False)
+    assert len(prov.calls) == 4
+
+    async with factory() as db:
+        await record_llm_usage(db, user_id="u1", model="m", usage=u1, kind="futures")
+        await record_llm_usage(db, user_id="u2", model="m", usage=u2, kind="futures")
+        await db.commit()
+        rows = {r.user_id: r for r in (await db.execute(select(LLMUsage))).scalars()}
+    assert rows["u1"].cost_usd == pytest.approx(llm_cost_usd(1000, 200)) and rows["u1"].cache_hits == 0
+    assert rows["u2"].cost_usd == 0.0 and rows["u2"].calls == 1
+    assert rows["u2"].cache_hits == 1 and rows["u2"].saved_usd == pytest.approx(llm_cost_usd(1000, 200))
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_identical_inflight_calls_share_one_completion(monkeypatch):
+    monkeypatch.setenv("LLM_DISCONNECT_POLL_S", "0.01")
+    prov = _Tracking(reply={"verdict": "confirm"}, delay=0.2)
+    gw = LLMGateway(prov)
+    msgs = [{"role": "user", "content": "verify 42"}]
+
+    class _Gone:
+        async def is_disconnected(self):
+            return True
+
+    # the first tab closes; the double click and the second tab still get the shared answer
+    gone = asyncio.ensure_future(gw.chat(msgs, request=_Gone()))
+    out = await asyncio.gather(gw.chat(msgs), gw.chat(msgs), gw.chat([{"role": "user", "content": "other"}]))
+    with pytest.raises(HTTPException):
+        await gone
+    assert len(prov.calls) == 2 and prov.cancelled == 0
+    assert out[0][0] == out[1][0] == '{"verdict": "confirm"}'
+    assert out[0][1] == {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "cache_hit": True,
+                         "saved_prompt_tokens": 10, "saved_completion_tokens": 5, "shared": True}
+    assert out[1][1] == out[0][1] and not out[2][1].get("cache_hit")
+
+    # once every caller has gone the completion itself is cancelled
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(asyncio.gather(gw.chat(msgs), gw.chat(msgs)), 0.05)
+    await asyncio.sleep(0.01)
+    assert prov.cancelled == 1 and prov.inflight == 0 and not gw._inflight
+
+
+@pytest.mark.asyncio
+async def test_streamed_chat_relays_deltas_and_shares_with_plain_callers():
+    prov = FakeProvider(reply={"verdict": "tweak", "reasons": ["rr"]}, delay=0.1, chunk=4)
+    gw = LLMGateway(prov)
+    msgs = [{"role": "user", "content": "stream me"}]
+    pieces, joined = [], []
+
+    streamed, plain = await asyncio.gather(
+        gw.chat(msgs, on_delta=pieces.append),
+        gw.chat(msgs, on_delta=joined.append),
+    )
+    assert len(prov.calls) == 1 and prov.calls[0]["stream"] is True
+    assert len(pieces) > 3 and "".join(pieces) == streamed[0] == plain[0]
+    assert streamed[1]["prompt_tokens"] == 10
+    # the caller that joined the stream gets the whole text at once, unbilled
+    assert joined == [plain[0]] and plain[1]["shared"] is True
+
+
+@pytest.mark.asyncio
+async def test_openai_provider_errors_carry_status_and_code(monkeypatch):
+    import httpx
+    from app.services import http_client
+    from app.services.llm_gateway import LLMError, OpenAIProvider
+
+    body = {"error": {"message": "You exceeded your current quota.", "type": "insufficient_quota", "param": None, "code": "insufficient_quota"}}
+    client = httpx.AsyncClient(transport=httpx.MockTransport(lambda req: httpx.Response(429, json=body)))
+    monkeypatch.setattr(http_client, "get_http", lambda: client)
+    prov = OpenAIProvider(api_key="k", base_url="http://llm.test/v1")
+    for call in (
+        lambda: prov.post("chat/completions", {"model": "m"}, 5),
+        lambda: prov.stream("chat/completions", {"model": "m"}, 5, lambda _t: None),
+    ):
+        with pytest.raises(LLMError) as exc:
+            await call()
+        assert exc.value.status_code == 429 and exc.value.code == "insufficient_quota"
+        assert exc.value.message == "You exceeded your current quota."
+    await client.aclose()
@@ -56,7 +56,7 @@ async def test_verify_llm_accepts_string_numbers_and_rounds(monkeypatch):
         (json.dumps(payload), {"prompt_tokens": 10, "completion_tokens": 20}),
         (json.dumps({"verdict": "confirm", "reasons": [], "summary": "OK"}), {"prompt_tokens": 5, "completion_tokens": 3}),
     ]
-    def fake_ask(prompt):
+    async def fake_ask(prompt, **kw):
         if not calls:
             return (json.dumps({"verdict": "confirm", "reasons": []}), {"prompt_tokens": 0, "completion_tokens": 0})
         return calls.pop(0)
@@ -123,7 +123,9 @@ async def test_verify_llm_missing_entries_or_tp_rejected(monkeypatch):
             (json.dumps(bad1), {"prompt_tokens": 1, "completion_tokens": 1}),
             (json.dumps({"verdict": "confirm", "reasons": []}), {"prompt_tokens": 0, "completion_tokens": 0}),
         ]
-        monkeypatch.setattr(r_analyses, "ask_llm", lambda prompt: calls.pop(0), raising=True)
+        async def fake_ask(prompt, **kw):
+            return calls.pop(0)
+        monkeypatch.setattr(r_analyses, "ask_llm", fake_ask, raising=True)
         r = await client.post(f"/api/analyses/{aid}/verify", headers=H)
         assert r.status_code == 422
 
@@ -138,6 +140,8 @@ async def test_verify_llm_missing_entries_or_tp_rejected(monkeypatch):
             (json.dumps(bad2), {"prompt_tokens": 1, "completion_tokens": 1}),
             (json.dumps({"verdict": "confirm", "reasons": []}), {"prompt_tokens": 0, "completion_tokens": 0}),
         ]
-        monkeypatch.setattr(r_analyses, "ask_llm", lambda prompt: calls2.pop(0), raising=True)
+        async def fake_ask2(prompt, **kw):
+            return calls2.pop(0)
+        monkeypatch.setattr(r_analyses, "ask_llm", fake_ask2, raising=True)
         r = await client.post(f"/api/analyses/{aid2}/verify", headers=H2)
         assert r.status_code == 422
@@ -0,0 +1,140 @@
+import pytest
+
+from app.services import position_sizing as ps
+from app.services import rounding as rnd
+from app.services.market_meta import MarketMetaService, norm_key
+
+
+MARKETS = {
+    # ccxt TICK_SIZE mode: precision is the increment itself
+    "BTC/USDT": {"symbol": "BTC/USDT", "base": "BTC", "quote": "USDT", "spot": True, "active": True,
+                 "precision": {"price": 0.01, "amount": 0.00001}, "info": {"quotePrecision": "8"}},
+    # DECIMAL_PLACES mode: precision is a digit count
+    "ETH/USDT": {"symbol": "ETH/USDT", "base": "ETH", "quote": "USDT", "spot": True, "active": True,
+                 "precision": {"price": 2, "amount": 4}},
+    "BTC/USDT:USDT": {"symbol": "BTC/USDT:USDT", "base": "BTC", "quote": "USDT", "contract": True, "swap": True,
+                      "linear": True, "active": True, "precision": {"price": 0.1, "amount": 0.001}},
+    "BTC/USDT:USDT-251226": {"symbol": "BTC/USDT:USDT-251226", "base": "BTC", "quote": "USDT", "contract": True,
+                             "future": True, "linear": True, "active": True, "precision": {"price": 0.5, "amount": 0.01}},
+    "SOLO/USDT:USDT": {"symbol": "SOLO/USDT:USDT", "base": "SOLO", "quote": "USDT", "contract": True, "swap": True,
+                       "linear": True, "active": True, "limits": {"price": {"min": 0.0001}, "amount": {"min": 1}}},
+}
+
+
+class _Ex:
+    calls = 0
+
+    def load_markets(self):
+        _Ex.calls += 1
+        return MARKETS
+
+
+@pytest.fixture
+def meta(monkeypatch, tmp_path):
+    _Ex.calls = 0
+    m = MarketMetaService(path=str(tmp_path / "meta.json"))
+    monkeypatch.setattr(m, "_exchange", lambda: _Ex())
+    for mod in (rnd, ps):
+        monkeypatch.setattr(mod, "META", m)
+    return m
+
+
+def test_norm_key():
+    assert norm_key("btc/usdt") == "BTCUSDT"
+    assert norm_key("BTC/USDT:USDT") == "BTCUSDT"
+    assert norm_key("BTCUSDT") == "BTCUSDT"
+
+
+def test_index_flags_and_increments(meta):
+    assert meta.flags("BTCUSDT") == {"spot": True, "futures": True}
+    assert meta.flags("SOLOUSDT") == {"spot": False, "futures": True}
+    btc = meta.get("BTC/USDT")
+    assert btc.tick_size == 0.01 and btc.price_decimals == 2 and btc.quote_precision == 8
+    assert meta.get("ETHUSDT").tick_size == pytest.approx(0.01)
+    assert meta.get("ETHUSDT").amount_decimals == 4
+    # perpetual wins over the dated contract for the same key
+    assert meta.get("BTCUSDT", "futures").tick_size == 0.1
+    assert meta.get("SOLOUSDT", "futures").tick_size == 0.0001
+    assert meta.usdt_bases("futures") == ["BTC", "SOLO"]
+    assert _Ex.calls == 1  # loaded once, every read is a dict lookup
+
+
+def test_rounding_and_sizing_use_index(meta):
+    assert rnd._tick_size_for("BTCUSDT") == 0.01
+    assert rnd._step_size_for("ETH/USDT") == pytest.approx(0.0001)
+    assert rnd.precision_for("BTCUSDT") == {"tickSize": 0.01, "stepSize": 0.00001, "priceDecimals": 2, "amountDecimals": 5}
+    assert rnd._tick_size_for("SOLOUSDT") == 0.0001  # futures-only listing
+    assert rnd.precision_for("NOPEUSDT") is None
+    assert ps.round_qty("BTCUSDT", 0.12345) == 0.123
+    assert ps.round_price("BTCUSDT", 65000.17) == 65000.1
+    assert ps.lot_step("BTCUSDT") == (0.001, 0.1)
+
+
+def test_disk_snapshot_warm_start(meta, monkeypatch):
+    meta.ensure_loaded()
+    cold = MarketMetaService(path=str(meta.path))
+
+    def _boom():
+        raise AssertionError("network should not be used")
+
+    monkeypatch.setattr(cold, "_exchange", _boom)
+    assert cold.get("BTCUSDT", "futures").step_size == 0.001
+    assert cold.futures_symbols == meta.futures_symbols
+
+
+def test_offline_falls_back_to_none(monkeypatch):
+    m = MarketMetaService(path=None)
+
+    def _boom():
+        raise RuntimeError("offline")
+
+    monkeypatch.setattr(m, "_exchange", _boom)
+    monkeypatch.setattr(rnd, "META", m)
+    assert rnd._tick_size_for("BTCUSDT") is None
+    assert rnd.round_plan_prices("BTCUSDT", {"entries": [1.23456]}) == {"entries": [1.23456]}
+
+
+def test_offline_load_retries_with_backoff(monkeypatch):
+    import app.services.market_meta as mm
+
+    now = [1000.0]
+    monkeypatch.setattr(mm.time, "time", lambda: now[0])
+    m = MarketMetaService(path=None)
+    online = [False]
+
+    def _exchange():
+        if not online[0]:
+            raise RuntimeError("offline")
+        return _Ex()
+
+    monkeypatch.setattr(m, "_exchange", _exchange)
+    assert m.ensure_loaded() is False
+    assert m.next_retry_at == 1000.0 + mm.META_RETRY_S
+    online[0] = True
+    assert m.get("BTCUSDT") is None  # still backing off: no network call
+    now[0] = m.next_retry_at
+    assert m.ensure_loaded() is True
+    assert m.get("BTCUSDT").tick_size == 0.01 and m.next_retry_at == 0.0
+
+
+@pytest.mark.asyncio
+async def test_reads_on_the_event_loop_never_block(meta, monkeypatch):
+    import asyncio
+    import threading
+
+    release, seen = threading.Event(), []
+
+    class _Slow(_Ex):
+        def load_markets(self):
+            seen.append(threading.get_ident())
+            release.wait(5)
+            return super().load_markets()
+
+    monkeypatch.setattr(meta, "_exchange", lambda: _Slow())
+    assert meta.get("BTCUSDT") is None  # cold: returns at once, load runs in a worker
+    assert meta.flags("BTCUSDT") == {"spot": False, "futures": False}
+    release.set()
+    await meta._bg[1]
+    assert seen and threading.get_ident() not in seen
+    assert meta.get("BTCUSDT").tick_size == 0.01
+    assert _Ex.calls == 1  # the second cold read joined the first load
@@ -0,0 +1,104 @@
+import math
+import pytest
+import httpx
+import numpy as np
+import pandas as pd
+
+from app.main import app
+
+
+def _df(n=60, base=100.0):
+    ts = [1_700_000_000_000 + i * 60_000 for i in range(n)]
+    close = [base + i * 0.1 for i in range(n)]
+    return pd.DataFrame({
+        "ts": ts,
+        "open": [c - 0.05 for c in close],
+        "high": [c + 0.1 for c in close],
+        "low": [c - 0.1 for c in close],
+        "close": close,
+        "volume": [100 + i for i in range(n)],
+    })
+
+
+def test_finite_list_masks_nan():
+    from app.services.columnar import finite_list, int_list
+    assert finite_list(np.array([1.0, np.nan, np.inf, 2.5])) == [1.0, None, None, 2.5]
+    assert int_list(np.array([1, -1, 0], dtype="int8")) == [1, -1, 0]
+
+
+@pytest.mark.asyncio
+async def test_spark_rows_columns_and_f64(monkeypatch):
+    from app.services.columnar import decode_f64, F64_MEDIA_TYPE
+    import app.services.signal_mtf as smtf
+    import app.routers.ohlcv as r_ohlcv
+
+    async def fake_fetch(symbol, tf, limit=200, market="futures"):
+        return _df(60)
+
+    monkeypatch.setattr(smtf.market, "fetch_klines", fake_fetch, raising=True)
+    r_ohlcv._CACHE.clear()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        r = await client.get("/api/spark", params={"symbol": "OPUSDT", "tf": "15m", "limit": 60})
+        assert r.status_code == 200
+        rows = r.json()["data"]
+        assert len(rows) == 60 and rows[0]["ts"].endswith("+00:00")
+        r = await client.get("/api/spark", params={"symbol": "OPUSDT", "tf": "15m", "limit": 60, "shape": "columns"})
+        assert r.status_code == 200
+        cols = r.json()["data"]
+        assert cols["ts"][0] == 1_700_000_000_000
+        assert len(cols["close"]) == 60
+        assert [row["close"] for row in rows] == cols["close"]
+        assert all(v in (-1, 1) for v in cols["trend"])
+        assert all(v is None or math.isfinite(v) for v in cols["st_line"])
+        r = await client.get("/api/spark", params={"symbol": "OPUSDT", "tf": "15m", "limit": 60, "shape": "f64"})
+        assert r.status_code == 200 and r.headers["content-type"].startswith(F64_MEDIA_TYPE)
+        f64 = decode_f64(r.content)
+        assert f64["ts"][0] == 1_700_000_000_000 and np.allclose(f64["close"], cols["close"])
+        # the binary shape is only asked for one way
+        r = await client.get("/api/spark", params={"symbol": "OPUSDT", "tf": "15m", "limit": 60, "fmt": "f64"})
+        assert r.headers["content-type"].startswith("application/json")
+
+
+@pytest.mark.asyncio
+async def test_ohlcv_columns_shape(monkeypatch):
+    async def fake_fetch(symbol, tf, limit):
+        return _df(30, base=50.0)
+    import app.routers.market as r_market
+    monkeypatch.setattr(r_market, "fetch_klines", fake_fetch, raising=True)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        await client.post("/api/auth/register", json={"email": "c1@example.com", "password": "secret123"})
+        r = await client.post("/api/auth/login", json={"email": "c1@example.com", "password": "secret123"})
+        H = {"Authorization": f"Bearer {r.json()['token']}"}
+        r = await client.get("/api/ohlcv", params={"symbol": "OPUSDT", "tf": "1m", "limit": 30, "shape": "columns"}, headers=H)
+        assert r.status_code == 200
+        cols = r.json()
+        assert set(cols) == {"t", "o", "h", "l", "c", "v"}
+        assert len(cols["t"]) == 30 and cols["c"][0] == 50.0
+
+
+@pytest.mark.asyncio
+async def test_ohlcv_f64_roundtrip_and_gzip(monkeypatch):
+    from app.services.columnar import decode_f64, F64_MEDIA_TYPE
+    df = _df(500, base=50.0)
+
+    async def fake_fetch(symbol, tf, limit):
+        return df
+    import app.routers.market as r_market
+    monkeypatch.setattr(r_market, "fetch_klines", fake_fetch, raising=True)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        await client.post("/api/auth/register", json={"email": "c2@example.com", "password": "secret123"})
+        r = await client.post("/api/auth/login", json={"email": "c2@example.com", "password": "secret123"})
+        H = {"Authorization": f"Bearer {r.json()['token']}"}
+        r = await client.get("/api/ohlcv", params={"symbol": "OPUSDT", "tf": "1m", "limit": 500, "shape": "f64"}, headers=H)
+        assert r.status_code == 200
+        assert r.headers["content-type"].startswith(F64_MEDIA_TYPE)
+        cols = decode_f64(r.content)
+        assert list(cols) == ["t", "o", "h", "l", "c", "v"]
+        assert np.allclose(cols["c"], df["close"].to_numpy())
+        assert int(cols["t"][0]) == int(df["ts"].iloc[0])
+        H = {"Authorization": H["Authorization"], "Accept-Encoding": "gzip"}
+        r = await client.get("/api/ohlcv", params={"symbol": "OPUSDT", "tf": "5m", "limit": 500}, headers=H)
+        assert r.status_code == 200 and r.headers.get("content-encoding") == "gzip"
+        assert len(r.json()) == 500
@@ -0,0 +1,46 @@
+import pytest
+import pandas as pd
+
+import app.services.outperformer_service as ops
+from app.services.cache import AsyncMemo
+
+
+def _df(n, drift, start=1_700_000_000_000):
+    ts = [start + i * 3_600_000 for i in range(n)]
+    close = [100.0 * (1 + drift) ** i for i in range(n)]
+    return pd.DataFrame({"ts": ts, "open": close, "high": close, "low": close, "close": close, "volume": [1.0] * n})
+
+
+DRIFTS = {"BTCUSDT": 0.001, "AAAUSDT": 0.01, "BBBUSDT": -0.005, "CCCUSDT": 0.003}
+
+
+@pytest.mark.asyncio
+async def test_outperformers_vectorized_scan_and_cache(monkeypatch):
+    calls = {"n": 0}
+
+    async def fake_fetch(symbol, tf, limit=200, market="futures"):
+        calls["n"] += 1
+        if symbol == "BADUSDT":
+            raise RuntimeError("boom")
+        return _df(limit, DRIFTS[symbol])
+
+    async def fake_universe(market="binanceusdm"):
+        return sorted(list(DRIFTS) + ["BADUSDT"])
+
+    monkeypatch.setattr(ops, "fetch_klines", fake_fetch, raising=True)
+    monkeypatch.setattr(ops, "_load_symbols_usdt", fake_universe, raising=True)
+    monkeypatch.setattr(ops, "_MEMO", AsyncMemo(), raising=True)
+
+    out = await ops.compute_outperformers("fast", limit=3)
+    assert [r["symbol"] for r in out] == ["AAAUSDT", "CCCUSDT", "BTCUSDT"]
+    # reference: per-symbol loop from the original implementation
+    n = ops.WINDOWS_H["fast"] + 1
+    btc_ret = (1.001) ** (n - 1) - 1
+    rs = {s: (1 + d) ** (n - 1) - 1 - btc_ret for s, d in DRIFTS.items()}
+    mu = sum(rs.values()) / len(rs)
+    sd = (sum((v - mu) ** 2 for v in rs.values()) / len(rs)) ** 0.5
+    exp = rs["AAAUSDT"] + 0.10 * (rs["AAAUSDT"] - mu) / sd
+    assert out[0]["score"] == pytest.approx(round(exp, 6))
+    first_calls = calls["n"]
+    await ops.compute_outperformers("fast", limit=2)
+    assert calls["n"] == first_calls  # cached until the next 1h close
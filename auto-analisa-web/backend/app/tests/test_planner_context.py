@@ -0,0 +1,73 @@
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services import planner
+from app.services.rules import Features
+
+
+def _frame(n: int, step_ms: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0.0005, 0.006, size=n)))
+    open_ = np.r_[close[0], close[:-1]]
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.002, size=n))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.002, size=n))
+    ts = 1_700_000_000_000 + step_ms * np.arange(n)
+    return pd.DataFrame({"ts": ts, "open": open_, "high": high, "low": low, "close": close, "volume": rng.uniform(10, 20, size=n)})
+
+
+def _bundle():
+    b = {tf: _frame(400, ms, i) for i, (tf, ms) in enumerate({"4h": 14_400_000, "1h": 3_600_000, "15m": 900_000, "5m": 300_000}.items())}
+    return b, Features(b).enrich()
+
+
+@pytest.mark.asyncio
+async def test_build_plan_shares_context_and_reuses_fvg(monkeypatch):
+    bundle, feat = _bundle()
+    calls = {"fvg": 0, "sd": 0}
+    real_fvg, real_sd = planner.detect_fvg, planner.detect_zones
+
+    def count_fvg(*a, **k):
+        calls["fvg"] += 1
+        return real_fvg(*a, **k)
+
+    def count_sd(*a, **k):
+        calls["sd"] += 1
+        return real_sd(*a, **k)
+
+    settings = types.SimpleNamespace(
+        enable_fvg=True, enable_supply_demand=True, fvg_tf="15m", fvg_use_bodies=False, fvg_fill_rule="any_touch",
+        fvg_threshold_pct=0.0, fvg_threshold_auto=False, sd_max_base=3, sd_body_ratio=0.33, sd_min_departure=1.5,
+        sd_mode="swing", sd_vol_div=20, sd_vol_threshold_pct=10.0,
+    )
+
+    async def fake_settings(db):
+        return settings
+
+    monkeypatch.setattr(planner, "detect_fvg", count_fvg)
+    monkeypatch.setattr(planner, "detect_zones", count_sd)
+    monkeypatch.setattr(planner, "get_or_init_settings", fake_settings)
+
+    plan = await planner.build_plan_async(None, bundle, feat, 30)
+    modes = {c["mode"] for c in plan["candidates"]}
+    assert {"PB", "BO", "RR", "SR"} <= modes
+    assert plan["fvg"] and "FF" in modes
+    assert "sd_zones" in plan
+    # candidate stage and overlay share one FVG run when parameters match
+    assert calls == {"fvg": 1, "sd": 1}
+
+    settings.fvg_use_bodies = True
+    await planner.build_plan_async(None, bundle, feat, 30)
+    assert calls["fvg"] == 3
+
+
+def test_batch_scoring_matches_per_candidate_path():
+    bundle, feat = _bundle()
+    ctx = planner.PlanContext(bundle, feat)
+    cands = [f(bundle, ctx.levels) for f in (planner.plan_pb, planner.plan_bo, planner.plan_rr, planner.plan_sr)]
+    assert cands == [f(bundle, ctx.levels, ctx.snap) for f in (planner.plan_pb, planner.plan_bo, planner.plan_rr, planner.plan_sr)]
+    for merged in planner._evaluate_candidates(cands, ctx):
+        ref, _ = planner._score_candidate(merged, ctx.regime, bundle)
+        assert merged["score_computed"] == pytest.approx(ref)
@@ -0,0 +1,79 @@
+import json
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.services.prompt_compact import PROMPT_STATS, compact, dumps, estimate_tokens, fit_budget, tick_decimals
+
+
+def test_compact_rounds_to_tick_dedupes_levels_and_drops_fields():
+    assert [tick_decimals(t) for t in (0.01, 0.5, 1, 10, 1e-8, None, 0)] == [2, 1, 0, 0, 8, None, None]
+    plan = {
+        "entries": [100.0012, 100.0049, 98.339, None],
+        "weights": [0.5, 0.5],
+        "funding": 0.00005123,
+        "sr": {"support": [97.001, 97.0, 95.5], "resistance": []},
+        "tp": [{"name": "TP1", "price": 110.004}, {"name": "TP1", "price": 110.0}],
+        "overlay": {"lines": [1, 2, 3]},
+        "candidates": [{"x": 1}],
+        "mtf_summary": {"h1": "", "h4": None},
+    }
+    out = compact(plan, tick=0.01, drop=("overlay", "candidates"))
+    assert out == {
+        "entries": [100, 98.34],
+        "weights": [0.5, 0.5],  # not a level list: repeats are meaningful
+        "funding": 5.123e-05,  # a tick would zero it: significant digits kept
+        "sr": {"support": [97, 95.5]},
+        "tp": [{"name": "TP1", "price": 110}],
+    }
+    assert compact(plan, keep=("entries", "tp"), tick=0.01).keys() == {"entries", "tp"}
+    assert estimate_tokens(dumps(out)) < estimate_tokens(json.dumps(plan))
+
+
+def test_fit_budget_drops_optional_sections_then_oldest_bars():
+    payload = {
+        "futures": {"entries": [1, 2], "macro": {"note": "x " * 400}},
+        "ohlcv15m": [{"t": i, "c": 100 + i} for i in range(400)],
+    }
+    out, tokens = fit_budget(compact(payload), 300, trim=("futures.macro", "futures.missing"))
+    assert tokens <= 300 and "macro" not in out["futures"]
+    assert out["futures"]["entries"] == [1, 2]
+    bars = out["ohlcv15m"]
+    assert 0 < len(bars) < 400 and bars[-1]["t"] == 399  # newest bars kept
+
+
+@pytest.mark.asyncio
+async def test_gpt_analyze_sends_compacted_payload_and_counts_tokens(monkeypatch):
+    from app.main import app
+    from app.services.llm_gateway import GATEWAY, FakeProvider
+
+    monkeypatch.setattr(settings, "REQUIRE_LOGIN", False)
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+
+    async def _should_use_llm(db):
+        return True, None
+
+    monkeypatch.setattr("app.routers.gpt_analyze.should_use_llm", _should_use_llm)
+    prov = FakeProvider(reply={"text": {"section_scalping": {"posisi": "LONG"}}}, usage={"prompt_tokens": 321, "completion_tokens": 9, "total_tokens": 330})
+    monkeypatch.setattr(GATEWAY, "provider", prov)
+    before = PROMPT_STATS.snapshot().get("gpt.analyze", {"calls": 0, "prompt_tokens": 0})
+
+    payload = {
+        "futures": {"entries": [2.34561, 2.34559], "overlay": {"lines": [{"price": 2.5}] * 50}, "candidates": [{"e": 1}]},
+        "ohlcv15m": [{"t": 1.0 * i, "c": 2.3456789} for i in range(5)],
+    }
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        r = await client.post(
+            "/api/gpt/futures/analyze",
+            json={"symbol": "xrpusdt", "mode": "scalping", "payload": payload, "opts": {"tick_size": 0.0001}},
+        )
+    assert r.status_code == 200
+    sent = prov.calls[0]["messages"][1]["content"]
+    sent_payload = json.loads(sent.split("PAYLOAD: ", 1)[1])["payload"]
+    assert sent_payload["futures"] == {"entries": [2.3456]}
+    assert sent_payload["ohlcv15m"][1] == {"t": 1, "c": 2.3457}
+    after = PROMPT_STATS.snapshot()["gpt.analyze"]
+    assert after["calls"] == before["calls"] + 1
+    assert after["prompt_tokens"] == before["prompt_tokens"] + 321
+    assert after["sent_tokens_est"] < after["raw_tokens_est"]
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import app.services.screener as scr
+
+
+def _series(n, seed, tf_ms, end=1_700_000_000_000, drop=None):
+    rng = np.random.default_rng(seed)
+    ts = [end - tf_ms * (n - 1 - i) for i in range(n)]
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    df = pd.DataFrame({"ts": ts, "open": close, "high": close, "low": close, "close": close, "volume": 1.0})
+    if drop:
+        df = df.drop(index=drop).reset_index(drop=True)
+    return df
+
+
+TF_MS = {"1h": 3_600_000, "4h": 14_400_000, "1D": 86_400_000}
+
+
+async def _reference(symbols, market="futures"):
+    """Per-symbol loop equivalent to the pre-batch implementation."""
+    windows = {"short": "1h", "mid": "4h", "long": "1D"}
+    w = {"rs": 0.45, "alpha": 0.25, "ratio_breakout": 0.20}
+    btc_s = {tf: await scr._load_close("BTCUSDT", tf, limit=240, market=market) for tf in windows.values()}
+    out = []
+    for sym in symbols:
+        row = {"symbol": sym.upper()}
+        parts = []
+        for label, tf in windows.items():
+            r = scr._rs_single(await scr._load_close(sym, tf, limit=240, market=market), btc_s[tf])
+            if r is None:
+                continue
+            row[f"rs_{label}"] = r
+            parts.append(r)
+        rs_score = float(np.nanmean(parts)) if parts else 0.0
+        alpha_z = float(scr._zscore(np.array(parts))) if parts else 0.0
+        row["alpha_z"] = alpha_z
+        row["ratio_break"] = scr._ratio_break_single(await scr._load_close(sym, "4h", limit=120, market=market), btc_s["4h"])
+        row["score"] = w["rs"] * rs_score + w["alpha"] * alpha_z / 3.0 + w["ratio_breakout"] * (1.0 if row["ratio_break"] else 0.0)
+        out.append(row)
+    return sorted(out, key=lambda x: x["score"], reverse=True)
+
+
+@pytest.mark.asyncio
+async def test_batch_matches_reference(monkeypatch):
+    specs = {
+        "BTCUSDT": dict(n=240, seed=0),
+        "AAAUSDT": dict(n=240, seed=1),
+        "BBBUSDT": dict(n=40, seed=2),           # young listing: shorter contiguous suffix
+        "CCCUSDT": dict(n=20, seed=3),           # < 30 bars: fallback RS branch
+        "DDDUSDT": dict(n=240, seed=4, drop=[100, 101]),  # gaps: reference path
+    }
+    def fake_df(symbol, tf, limit):
+        sp = specs[symbol]
+        df = _series(sp["n"], sp["seed"] * 10 + list(TF_MS).index(tf), TF_MS[tf], drop=sp.get("drop"))
+        if symbol == "AAAUSDT" and tf == "4h":  # force a ratio breakout
+            df.loc[df.index[-1], "close"] *= 1.5
+        return df.tail(limit).reset_index(drop=True)
+
+    async def fake_fetch(symbol, tf, limit=240, market="futures"):
+        return fake_df(symbol, tf, limit)
+
+    monkeypatch.setattr(scr, "fetch_klines", fake_fetch, raising=True)
+    syms = ["AAAUSDT", "BBBUSDT", "CCCUSDT", "DDDUSDT"]
+    got = (await scr.screener_outperformers(syms, top=10))["results"]
+    exp = await _reference(syms)
+    assert [r["symbol"] for r in got] == [r["symbol"] for r in exp]
+    for g, e in zip(got, exp):
+        assert set(g) == set(e)
+        assert g["ratio_break"] == e["ratio_break"]
+        for k in g:
+            if k not in ("symbol", "ratio_break"):
+                assert g[k] == pytest.approx(e[k], rel=1e-9, abs=1e-12, nan_ok=True), (g["symbol"], k)
+    assert next(r for r in got if r["symbol"] == "AAAUSDT")["ratio_break"] is True
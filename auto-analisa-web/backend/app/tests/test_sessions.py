@@ -41,3 +41,165 @@ async def test_sessions_btc_wib_significant(monkeypatch):
         # Should include hour 9 (WIB)
         hours = [b["hour"] for b in buckets]
         assert 9 in hours
+
+
+def test_bootstrap_matches_reference_loop(monkeypatch):
+    import numpy as np
+    import app.services.sessions as sess
+
+    x = np.random.default_rng(7).normal(0.001, 0.01, size=97)
+    # reference: one draw per iteration
+    rng = np.random.default_rng(42)
+    ref = np.array([float(np.mean(x[rng.integers(0, x.size, size=x.size)])) for _ in range(500)])
+    monkeypatch.setattr(sess, "_BOOT_CELLS", 97 * 64)  # force several row blocks
+    assert np.array_equal(sess._bootstrap_means(x, 500), ref)
+    m, (lo, hi), p = sess._bootstrap_mean_ci(x, iters=500)
+    assert lo == float(np.quantile(ref, 0.025)) and hi == float(np.quantile(ref, 0.975))
+
+
+@pytest.mark.asyncio
+async def test_sessions_cached_until_candle_close(monkeypatch):
+    import app.services.sessions as sess
+
+    ts = _make_ts_hours_utc(datetime(2024, 1, 1), 80, 2)
+    df = pd.DataFrame({"ts": ts, "open": 100.0, "high": 100.4, "low": 99.9, "close": 100.3, "volume": 1000})
+    calls = {"n": 0}
+
+    async def fake_fetch(symbol, tf, limit):
+        calls["n"] += 1
+        return df
+
+    monkeypatch.setattr(sess, "fetch_klines", fake_fetch, raising=True)
+    monkeypatch.setattr(sess, "_MEMO", sess.AsyncMemo(), raising=True)
+    a = await sess.btc_wib_buckets(days=120, timeframe="1h")
+    b = await sess.btc_wib_buckets(days=120, timeframe="1h")
+    assert a == b and [r["hour"] for r in a] == [9]
+    assert calls["n"] == 1
+    await sess.btc_wib_buckets(days=90, timeframe="1h")
+    assert calls["n"] == 2
+
+
+def _hourly_df(days: int, start=datetime(2024, 1, 1, tzinfo=timezone.utc), seed: int = 3):
+    import numpy as np
+
+    n = days * 24
+    ts = [int((start + timedelta(hours=i)).timestamp() * 1000) for i in range(n)]
+    r = np.random.default_rng(seed).normal(0.0, 0.004, size=n)
+    hours_wib = [((t // 3_600_000) + 7) % 24 for t in ts]
+    r = r + np.array([0.003 if h == 9 else 0.0 for h in hours_wib])
+    return pd.DataFrame({"ts": ts, "open": 100.0, "close": 100.0 * (1 + r), "high": 101.0, "low": 99.0, "volume": 1.0})
+
+
+def test_store_matches_full_recompute_and_folds_incrementally():
+    import numpy as np
+    import app.services.sessions as sess
+
+    df = _hourly_df(100)
+    store = sess.SessionStatsStore()
+    now_ms = int(df["ts"].iloc[-1]) + 3_600_000
+    assert store.fold("BTCUSDT", "1h", df.iloc[:-24], now_ms=now_ms) == len(df) - 24
+    assert store.fold("BTCUSDT", "1h", df, now_ms=now_ms) == 24  # only the new closed candles
+    assert store.fold("BTCUSDT", "1h", df, now_ms=now_ms) == 0
+
+    ret = (df["close"] / df["open"] - 1.0).to_numpy()
+    hours = ((df["ts"] // 3_600_000) + 7) % 24
+    x = ret[(hours == 9).to_numpy()]
+    agg = store.window("BTCUSDT", "1h")[9]
+    assert agg.n == x.size and agg.pos == int((x > 0).sum())
+    assert agg.mean == pytest.approx(float(np.mean(x)), abs=1e-12)
+    assert agg.sd == pytest.approx(float(np.std(x, ddof=1)), rel=1e-9)
+    # reservoir holds the whole bucket -> identical bootstrap to the raw-history path
+    m, (lo, hi), p = sess._bootstrap_mean_ci(x)
+    row = next(r for r in store.buckets("BTCUSDT", "1h") if r["hour"] == 9)
+    assert (row["ci_low"], row["ci_high"], row["p_value"]) == (round(lo, 6), round(hi, 6), round(p, 6))
+
+
+def test_store_reservoir_bounded_and_rescaled():
+    import numpy as np
+    import app.services.sessions as sess
+
+    df = _hourly_df(200, seed=5)
+    store = sess.SessionStatsStore(reservoir=64, iters=500)
+    store.fold("ETHUSDT", "1h", df, now_ms=int(df["ts"].iloc[-1]) + 3_600_000)
+    agg = store.window("ETHUSDT", "1h")[9]
+    assert agg.n == 200 and len(agg.sample) == 64
+    lo, hi, p = store._ci_for("ETHUSDT", "1h", 9, agg)
+    se = agg.sd / np.sqrt(agg.n)
+    assert lo < agg.mean < hi
+    assert (hi - lo) == pytest.approx(2 * 1.96 * se, rel=0.35)
+
+
+@pytest.mark.asyncio
+async def test_store_persist_roundtrip():
+    import app.services.sessions as sess
+    from app.storage.db import SessionLocal
+
+    df = _hourly_df(90, seed=11)
+    a = sess.SessionStatsStore()
+    a.fold("TESTRTUSDT", "1h", df, now_ms=int(df["ts"].iloc[-1]) + 3_600_000)
+    async with SessionLocal() as db:
+        await a.persist(db, "TESTRTUSDT", "1h")
+    b = sess.SessionStatsStore()
+    async with SessionLocal() as db:
+        assert await b.load(db, "TESTRTUSDT", "1h")
+    assert b.buckets("TESTRTUSDT", "1h") == a.buckets("TESTRTUSDT", "1h")
+    assert b.state[("TESTRTUSDT", "1h")]["last_ts"] == int(df["ts"].iloc[-1])
+
+
+@pytest.mark.asyncio
+async def test_days_selects_a_rolling_window_of_daily_partials(monkeypatch):
+    import numpy as np
+    import app.services.sessions as sess
+
+    # WIB 09:00 drifts up only over the last 80 of 200 days
+    df = _hourly_df(200, seed=13)
+    ts = pd.to_numeric(df["ts"])
+    late = ((ts // 3_600_000 + 7) % 24 != 9) | (ts < ts.iloc[-1] - 80 * 86_400_000)
+    df.loc[late, "close"] = 100.0 * (1 + np.random.default_rng(1).normal(0.0, 0.004, size=int(late.sum())))
+
+    async def fake_fetch(symbol, tf, limit):
+        return df
+
+    monkeypatch.setattr(sess, "fetch_klines", fake_fetch, raising=True)
+    monkeypatch.setattr(sess, "_MEMO", sess.AsyncMemo(), raising=True)
+    monkeypatch.setattr(sess, "STORE", sess.SessionStatsStore(iters=500), raising=True)
+    monkeypatch.setattr(sess, "_session_factory", lambda: None, raising=True)
+    recent = await sess.session_buckets("WINUSDT", days=80)
+    full = await sess.session_buckets("WINUSDT", days=200)
+    assert recent != full
+    row = next(r for r in recent if r["hour"] == 9)
+    assert row["n"] == 80
+    assert 9 not in [r["hour"] for r in full] or next(r for r in full if r["hour"] == 9)["mean"] < row["mean"]
+    assert sess.STORE.window("WINUSDT", "1h", 200)[9].n == 200
+
+
+def test_daily_partials_older_than_retention_are_dropped():
+    import app.services.sessions as sess
+
+    df = _hourly_df(200, seed=17)
+    store = sess.SessionStatsStore(max_days=100)
+    store.fold("BTCUSDT", "1h", df, now_ms=int(df["ts"].iloc[-1]) + 3_600_000)
+    st = store.state[("BTCUSDT", "1h")]
+    assert len(st["days"]) == 100
+    assert store.window("BTCUSDT", "1h")[9].n == 100
+    assert st["first_ts"] == min(st["days"]) * sess.DAY_MS
+
+
+@pytest.mark.asyncio
+async def test_reload_keeps_the_partial_first_day_extendable():
+    import app.services.sessions as sess
+    from app.storage.db import SessionLocal
+
+    df = _hourly_df(30, seed=19)
+    now_ms = int(df["ts"].iloc[-1]) + 3_600_000
+    a = sess.SessionStatsStore()
+    a.fold("TESTFTUSDT", "1h", df.iloc[12:], now_ms=now_ms)  # backfill started at 12:00 UTC
+    async with SessionLocal() as db:
+        await a.persist(db, "TESTFTUSDT", "1h")
+    b = sess.SessionStatsStore()
+    async with SessionLocal() as db:
+        assert await b.load(db, "TESTFTUSDT", "1h")
+    assert b.state[("TESTFTUSDT", "1h")]["first_ts"] == int(df["ts"].iloc[12])
+    # a longer backfill adds the first day's earlier hours, and nothing twice
+    assert b.fold("TESTFTUSDT", "1h", df, now_ms=now_ms) == 12
+    assert sum(agg.n for agg in b.window("TESTFTUSDT", "1h")) == len(df)
@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+from app.services import budget
+from app.storage.db import SessionLocal
+
+
+@pytest.mark.asyncio
+async def test_settings_read_through_and_invalidate(monkeypatch):
+    cache = budget.SettingsCache(ttl_s=60)
+    monkeypatch.setattr(budget, "SETTINGS_CACHE", cache)
+    loads = {"n": 0}
+    real_load = budget.load_settings_row
+
+    async def counting_load(db):
+        loads["n"] += 1
+        return await real_load(db)
+
+    monkeypatch.setattr(budget, "load_settings_row", counting_load)
+    async with SessionLocal() as db:
+        a = await budget.get_or_init_settings(db)
+        b = await budget.get_or_init_settings(db)
+        assert a is b and loads["n"] == 1
+
+        row = await real_load(db)
+        original = row.default_weight_profile
+        row.default_weight_profile = "TEST_PROFILE"
+        await db.commit()
+        assert (await budget.get_or_init_settings(db)).default_weight_profile == original  # still cached
+        await cache.invalidate()
+        assert (await budget.get_or_init_settings(db)).default_weight_profile == "TEST_PROFILE"
+        assert loads["n"] == 2
+
+        row.default_weight_profile = original
+        await db.commit()
+        await cache.invalidate()
+
+
+@pytest.mark.asyncio
+async def test_load_racing_invalidation_is_not_stored():
+    cache = budget.SettingsCache(ttl_s=60)
+    async with SessionLocal() as db:
+        row = await budget.load_settings_row(db)
+    v = cache.version
+    cache.invalidate_local()  # another writer committed while we were loading
+    cache.put(row, v)
+    assert cache.get() is None
+
+
+@pytest.mark.asyncio
+async def test_cross_worker_invalidation_via_pubsub():
+    published = []
+
+    class FakePubSub:
+        async def subscribe(self, channel):
+            self.channel = channel
+
+        async def listen(self):
+            yield {"type": "subscribe", "data": 1}
+            while not published:
+                await asyncio.sleep(0.01)
+            yield {"type": "message", "data": published[-1]}
+            await asyncio.sleep(3600)
+
+    class FakeRedis:
+        def pubsub(self):
+            return FakePubSub()
+
+        async def publish(self, channel, msg):
+            published.append(msg)
+
+    writer, reader = budget.SettingsCache(ttl_s=60), budget.SettingsCache(ttl_s=60)
+    async with SessionLocal() as db:
+        row = await budget.load_settings_row(db)
+    reader.put(row, reader.version)
+    assert reader.get() is not None
+    task = asyncio.create_task(reader.listen(FakeRedis()))
+    writer.redis = FakeRedis()
+    await writer.invalidate()
+    for _ in range(100):
+        if reader.get() is None:
+            break
+        await asyncio.sleep(0.01)
+    task.cancel()
+    assert reader.get() is None
@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Analysis, Base, FuturesSignalsCache
+from app.services.signals_scheduler import SignalsScheduler, WeightBudget, next_interval
+
+
+def test_next_interval_adapts_to_interest_and_volatility():
+    base = next_interval(120, 1, 0.0, 30, 600)
+    assert next_interval(120, 10, 0.0, 30, 600) < base
+    assert next_interval(120, 1, 40.0, 30, 600) < base
+    assert next_interval(120, 0, 0.0, 30, 600) == 600
+    assert next_interval(120, 1000, 1000.0, 30, 600) == 30
+
+
+@pytest.mark.asyncio
+async def test_weight_budget_blocks_when_exhausted():
+    clock = {"t": 0.0}
+    b = WeightBudget(60, clock=lambda: clock["t"])  # 1 unit/s
+    await b.acquire(60)
+    waiter = asyncio.create_task(b.acquire(10))
+    await asyncio.sleep(0.01)
+    assert not waiter.done()
+    clock["t"] = 10.0
+    await asyncio.wait_for(waiter, 2.0)
+
+
+@pytest.mark.asyncio
+async def test_cycle_bulk_inserts_and_schedules_per_symbol():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    async with factory() as db:
+        for uid in ("u1", "u2", "u3"):
+            db.add(Analysis(user_id=uid, symbol="BTCUSDT", trade_type="futures", payload_json={}, status="active"))
+        db.add(Analysis(user_id="u1", symbol="ETHUSDT", trade_type="futures", payload_json={}, status="active"))
+        await db.commit()
+
+    marks = {"BTCUSDT": 100.0, "ETHUSDT": 10.0, "BADUSDT": None}
+    inflight = {"n": 0, "max": 0}
+
+    async def fake_collect(sym):
+        inflight["n"] += 1
+        inflight["max"] = max(inflight["max"], inflight["n"])
+        await asyncio.sleep(0.05)
+        inflight["n"] -= 1
+        if sym == "BADUSDT":
+            raise RuntimeError("boom")
+        return {"symbol": sym, "oi_now": 1.0, "mark_price": marks[sym]}
+
+    sched = SignalsScheduler(factory, concurrency=8, collect=fake_collect)
+    interest = await sched.load_interest()
+    assert interest == {"BTCUSDT": 3, "ETHUSDT": 1}
+    sched.set_universe({**interest, "BADUSDT": 1}, now=1000.0)
+
+    stats = await sched.cycle(now=1000.0)
+    assert stats["due"] == 3 and stats["refreshed"] == 2 and stats["written"] == 2 and stats["failed"] == 1
+    assert inflight["max"] == 3  # collected concurrently
+    assert {"duration_s", "lag_max_s", "lag_avg_s"} <= set(stats)
+    btc, eth = sched.state["BTCUSDT"], sched.state["ETHUSDT"]
+    assert btc.interval < eth.interval  # more users -> faster cadence
+    assert sched.state["BADUSDT"].next_due == 1000.0 + sched.min_s
+
+    # nothing due yet; then ETH moves 1% and gets a faster cadence than before
+    assert (await sched.cycle(now=1001.0))["due"] == 0
+    marks["ETHUSDT"] = 10.1
+    before = eth.interval
+    stats = await sched.cycle(now=eth.next_due + 5)
+    assert eth.vol_bp == pytest.approx(99.5, abs=0.1) and btc.vol_bp == 0.0
+    assert eth.interval < before
+    assert stats["lag_max_s"] >= 5
+
+    async with factory() as db:
+        n = (await db.execute(select(func.count()).select_from(FuturesSignalsCache))).scalar_one()
+    assert n >= 4
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_failing_retention_does_not_skip_the_cycle(monkeypatch):
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+
+    async def broken_rollup(db):
+        raise RuntimeError("disk full")
+
+    async def fake_collect(sym):
+        return {"symbol": sym, "oi_now": 1.0, "mark_price": 100.0}
+
+    monkeypatch.setattr("app.services.futures.rollup_signals", broken_rollup)
+    cycles = []
+    sched = SignalsScheduler(factory, collect=fake_collect)
+    await sched.run(symbols={"BTCUSDT": 1}, on_cycle=cycles.append, once=True)
+    assert sched.last_retention == {"error": "disk full"}
+    assert cycles and cycles[0]["written"] == 1
+    await engine.dispose()
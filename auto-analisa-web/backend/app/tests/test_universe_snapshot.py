@@ -0,0 +1,79 @@
+import time
+import pytest
+
+from app.services.context.universe_service import UniverseSnapshot, UNIVERSE
+
+
+PREMIUM = [
+    {"symbol": "BTCUSDT", "markPrice": "60010", "indexPrice": "60000", "lastFundingRate": "0.0001", "nextFundingTime": 1700000000000},
+    {"symbol": "OPUSDT", "markPrice": "1.5", "indexPrice": "1.5", "lastFundingRate": "-0.0002", "nextFundingTime": 1700000000000},
+    {"symbol": "ETHBTC", "markPrice": "0.05", "indexPrice": "0.05"},
+]
+
+
+def test_premium_snapshot_lookup():
+    u = UniverseSnapshot()
+    assert u.set_premium(PREMIUM) == 2
+    p = u.premium_for("BTC/USDT:USDT")
+    assert p["basis_now"] == pytest.approx(10.0)
+    assert p["basis_bp"] == pytest.approx(10 / 60000 * 1e4)
+    assert u.funding("OPUSDT") == pytest.approx(-0.0002)
+    u.premium_ts = time.time() - 10_000
+    assert u.funding("OPUSDT") is None  # stale snapshot -> caller falls back
+
+
+def test_oi_change_from_rolling_history():
+    u = UniverseSnapshot(oi_retention_h=48)
+    now = time.time()
+    assert u.oi_change("OPUSDT", 24, now=now) is None
+    assert "OPUSDT" in u.tracked
+    for i in range(25):
+        u.record_oi("OPUSDT", 100.0 + i, ts=now - (24 - i) * 3600)
+    assert u.oi_change("OPUSDT", 24, now=now) == pytest.approx(0.24)
+    # too little history for a 48h window
+    assert u.oi_change("OPUSDT", 48, now=now) is None
+
+
+def test_tracked_symbols_bounded_to_universe_and_expire_when_idle():
+    u = UniverseSnapshot(track_idle_h=1)
+    u.set_premium(PREMIUM)
+    now = time.time()
+    u.oi_change("BTCUSDT", now=now)
+    u.oi_change("NOTLISTEDUSDT", now=now)  # not a USDM symbol: never sampled
+    u.oi_change("OPUSDT", now=now - 3000)
+    assert u.tracked_symbols(now=now) == {"BTCUSDT", "OPUSDT"}
+    assert u.tracked_symbols(now=now + 1000) == {"BTCUSDT"}
+    u.oi_change("BTCUSDT", now=now + 3000)  # reads keep it alive
+    assert u.tracked_symbols(now=now + 4000) == {"BTCUSDT"}
+    assert u.tracked_symbols(now=now + 8000) == set()
+
+
+def test_services_read_universe(monkeypatch):
+    from app.services.context.funding_service import FundingService
+    from app.services.context.oi_service import OIService
+
+    class Boom:
+        def fetchFundingRate(self, symbol):
+            raise AssertionError("per-symbol call should not happen")
+
+    monkeypatch.setattr(UNIVERSE, "premium", {}, raising=True)
+    UNIVERSE.set_premium(PREMIUM)
+    assert FundingService(client=Boom()).get("BTCUSDT") == pytest.approx(0.0001)
+    now = time.time()
+    monkeypatch.setattr(UNIVERSE, "oi_hist", {}, raising=True)
+    UNIVERSE.record_oi("BTCUSDT", 200.0, ts=now - 24 * 3600)
+    UNIVERSE.record_oi("BTCUSDT", 220.0, ts=now)
+    assert OIService(client=object()).peek("BTCUSDT", 24) == pytest.approx(0.1)
+
+
+@pytest.mark.asyncio
+async def test_oi_history_persist_and_reload():
+    from app.storage.db import SessionLocal
+    u = UniverseSnapshot()
+    now = time.time()
+    async with SessionLocal() as db:
+        await u.persist_oi(db, [("ZZZUSDT", now - 3600, 10.0), ("ZZZUSDT", now, 12.0)])
+    u2 = UniverseSnapshot()
+    async with SessionLocal() as db:
+        assert await u2.load_oi_history(db) >= 2
+    assert [v for _, v in u2.oi_hist["ZZZUSDT"]][-2:] == [10.0, 12.0]
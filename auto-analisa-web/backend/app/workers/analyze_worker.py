@@ -1,18 +1,24 @@
 from fastapi import HTTPException
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy import select, func, update, bindparam
 
 from ..services.market import fetch_bundle
 from ..services.rules import Features, score_symbol
 from ..services.planner import build_plan_async, build_spot2_from_plan
 from ..services.budget import (
+    SETTINGS_CACHE,
     get_or_init_settings,
 )
+from ..services.cache import AsyncMemo, seconds_to_next_bar, tf_seconds
 from ..services.rounding import round_plan_prices
 from ..models import Analysis, User
 from datetime import datetime, timezone
+import asyncio
+import copy
 import json
 import os
+import time
+from typing import Any, Callable, Dict, Hashable, List, Tuple
 
 
 MAX_ACTIVE_CARDS: dict[str, int] = {"spot": 4, "futures": 4}
@@ -27,6 +33,76 @@ def _normalize_trade_type(value: str | None) -> str:
     return "spot"
 
 
+async def compute_plan(db: AsyncSession, symbol: str, trade_type: str = "spot") -> dict:
+    """Rules-only plan for a symbol: bundle -> features -> score -> plan (+spot2, tick rounding).
+
+    Depends only on market data and Settings, never on the user.
+    """
+    sym = symbol.upper()
+    tt = _normalize_trade_type(trade_type)
+    bundle = await fetch_bundle(
+        sym,
+        ("4h", "1h", "15m", "5m", "1m"),
+        market=("futures" if tt == "futures" else "spot"),
+    )
+    feat = Features(bundle).enrich()
+    score = score_symbol(feat)
+    plan = await build_plan_async(db, bundle, feat, score, "auto")
+    try:
+        spot2 = await build_spot2_from_plan(db, sym, plan, bundle=bundle)
+        plan["spot2"] = spot2
+    except Exception:
+        pass
+    # Snap prices to tick size if available
+    try:
+        plan = round_plan_prices(sym, plan)
+    except Exception:
+        pass
+    return plan
+
+
+# Shared per-symbol plan cache: the rules-only plan depends on market data and Settings only,
+# so concurrent/nearby analyses of the same symbol reuse one computation.
+_PLAN_MEMO = AsyncMemo()
+
+
+def _last_closed_open_ts(tf: str, now: float) -> int:
+    step = tf_seconds(tf)
+    return int(now // step) * step - step
+
+
+def plan_cache_key(symbol: str, trade_type: str = "spot", now: float | None = None) -> Hashable:
+    """(symbol, trade_type, last closed 1m ts, last closed 5m ts, settings version)."""
+    t = time.time() if now is None else float(now)
+    return (
+        symbol.upper(),
+        _normalize_trade_type(trade_type),
+        _last_closed_open_ts("1m", t),
+        _last_closed_open_ts("5m", t),
+        SETTINGS_CACHE.version,
+    )
+
+
+async def cached_plan(db: AsyncSession, symbol: str, trade_type: str = "spot") -> dict:
+    """``compute_plan`` through the shared cache; valid until the next 1m candle closes.
+
+    The shared computation runs on its own session (same database as ``db``): it can
+    outlive the request that started it. Returns a private copy so per-request edits
+    never leak into the cache.
+    """
+    key = plan_cache_key(symbol, trade_type)
+    plan = _PLAN_MEMO.peek(key)
+    if plan is None:
+        _PLAN_MEMO.prune()
+
+        async def _compute() -> dict:
+            async with async_sessionmaker(db.bind, expire_on_commit=False)() as own:
+                return await compute_plan(own, symbol, trade_type)
+
+        plan = await _PLAN_MEMO.get_or_compute(key, lambda: seconds_to_next_bar("1m"), _compute)
+    return copy.deepcopy(plan)
+
+
 async def run_analysis(db: AsyncSession, user: User, symbol: str, trade_type: str = "spot") -> Analysis:
     # Check if analysis for this symbol already exists (active)
     sym = symbol.upper()
@@ -58,25 +134,8 @@ async def run_analysis(db: AsyncSession, user: User, symbol: str, trade_type: st
                 f"Maksimum {limit} analisa aktif {label} per user. Arsipkan salah satu dulu.",
             )
 
-    # compute baseline plan using existing rules engine
-    bundle = await fetch_bundle(
-        symbol,
-        ("4h", "1h", "15m", "5m", "1m"),
-        market=("futures" if tt == "futures" else "spot"),
-    )
-    feat = Features(bundle).enrich()
-    score = score_symbol(feat)
-    plan = await build_plan_async(db, bundle, feat, score, "auto")
-    try:
-        spot2 = await build_spot2_from_plan(db, sym, plan, bundle=bundle)
-        plan["spot2"] = spot2
-    except Exception:
-        pass
-    # Snap prices to tick size if available
-    try:
-        plan = round_plan_prices(sym, plan)
-    except Exception:
-        pass
+    # compute baseline plan using existing rules engine (shared across users)
+    plan = await cached_plan(db, sym, tt)
 
     # No auto LLM narrative: keep rules-only plan per blueprint
 
@@ -119,23 +178,7 @@ async def refresh_analysis_rules_only(db: AsyncSession, user: User, analysis: An
     """Recompute plan using rules engine only (no LLM), bump version and timestamp."""
     sym = analysis.symbol.upper()
     tt = _normalize_trade_type(getattr(analysis, "trade_type", "spot"))
-    bundle = await fetch_bundle(
-        sym,
-        ("4h", "1h", "15m", "5m", "1m"),
-        market=("futures" if tt == "futures" else "spot"),
-    )
-    feat = Features(bundle).enrich()
-    score = score_symbol(feat)
-    plan = await build_plan_async(db, bundle, feat, score, "auto")
-    try:
-        spot2 = await build_spot2_from_plan(db, sym, plan, bundle=bundle)
-        plan["spot2"] = spot2
-    except Exception:
-        pass
-    try:
-        plan = round_plan_prices(sym, plan)
-    except Exception:
-        pass
+    plan = await compute_plan(db, sym, tt)
 
     # compute next version per user+symbol and update
     q2 = await db.execute(
@@ -152,3 +195,76 @@ async def refresh_analysis_rules_only(db: AsyncSession, user: User, analysis: An
     await db.commit()
     await db.refresh(analysis)
     return analysis
+
+
+async def refresh_active_analyses(session_factory: Callable[[], Any], concurrency: int = 4) -> Dict[str, int]:
+    """Batch refresh of every active card.
+
+    Active rows are grouped by (symbol, trade_type); the plan is computed once per group
+    (bounded concurrency, one session per group) and fanned out to every user's row in a
+    single bulk UPDATE, so cost scales with distinct symbols rather than users.
+    Groups whose computation fails keep their previous plan.
+    """
+    async with session_factory() as db:
+        q = await db.execute(
+            select(Analysis.id, Analysis.symbol, func.coalesce(Analysis.trade_type, "spot")).where(Analysis.status == "active")
+        )
+        groups: Dict[Tuple[str, str], List[int]] = {}
+        for aid, sym, tt in q.all():
+            groups.setdefault((str(sym).upper(), _normalize_trade_type(tt)), []).append(aid)
+    if not groups:
+        return {"groups": 0, "rows": 0, "failed": 0}
+
+    sem = asyncio.Semaphore(max(1, int(concurrency)))
+
+    async def one(key: Tuple[str, str]) -> dict | None:
+        async with sem:
+            try:
+                async with session_factory() as gdb:
+                    return await compute_plan(gdb, key[0], key[1])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                return None
+
+    keys = list(groups)
+    plans = await asyncio.gather(*(one(k) for k in keys))
+    for (sym, tt), plan in zip(keys, plans):
+        if plan is not None:
+            # warm the shared cache so run_analysis in the same candle reuses it
+            _PLAN_MEMO.set(plan_cache_key(sym, tt), plan, seconds_to_next_bar("1m"))
+    now = datetime.now(timezone.utc)
+    params = [
+        {"_id": aid, "_payload": plan, "_ts": now}
+        for key, plan in zip(keys, plans)
+        if plan is not None
+        for aid in groups[key]
+    ]
+    if params:
+        # unique (user, symbol, trade_type) -> the row's own version is the per-user max
+        stmt = (
+            update(Analysis)
+            .where(Analysis.id == bindparam("_id"), Analysis.status == "active")
+            .values(version=Analysis.version + 1, payload_json=bindparam("_payload"), created_at=bindparam("_ts"))
+            .execution_options(synchronize_session=False)
+        )
+        async with session_factory() as db:
+            await (await db.connection()).execute(stmt, params)
+            await db.commit()
+    return {
+        "groups": len(keys),
+        "rows": len(params),
+        "failed": sum(1 for p in plans if p is None),
+    }
+
+
+async def run_batch_refresh(session_factory: Callable[[], Any], interval_s: float = 900.0, concurrency: int = 4) -> None:
+    """Background loop for ``refresh_active_analyses``."""
+    while True:
+        try:
+            await refresh_active_analyses(session_factory, concurrency=concurrency)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            pass
+        await asyncio.sleep(float(interval_s))
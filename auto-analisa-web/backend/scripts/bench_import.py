@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Import-time budget check for the API (worker boot / test collection cost).
+
+Runs ``python -X importtime -c "import app.main"`` a few times in fresh interpreters,
+reports the median cumulative time and the heaviest modules, and fails when:
+- the median exceeds the budget (``--budget-ms`` / IMPORT_BUDGET_MS), or
+- a module that must stay lazy (ccxt, openai by default) is imported by ``app.main``.
+
+Usage: python scripts/bench_import.py [--runs 5] [--budget-ms 1600] [--top 15]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+LAZY_MODULES = ("ccxt", "openai")
+
+
+def parse_importtime(stderr: str) -> Dict[str, Tuple[int, int]]:
+    """{module: (self_us, cumulative_us)} from ``-X importtime`` output (last entry wins)."""
+    out: Dict[str, Tuple[int, int]] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cum_us, name = line[len("import time:"):].split("|", 2)
+            out[name.strip()] = (int(self_us), int(cum_us))
+        except ValueError:
+            continue
+    return out
+
+
+def run_once(target: str) -> Dict[str, Tuple[int, int]]:
+    env = {k: v for k, v in os.environ.items() if k != "PYTHONDONTWRITEBYTECODE"}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=str(ROOT), env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise SystemExit(f"import {target} failed:\n{proc.stderr[-2000:]}")
+    return parse_importtime(proc.stderr)
+
+
+def main(argv: List[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description="Measure app import time against a budget")
+    ap.add_argument("--target", default="app.main")
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_BUDGET_MS", "1600")))
+    ap.add_argument("--top", type=int, default=15)
+    args = ap.parse_args(argv)
+
+    run_once(args.target)  # warm .pyc files so runs measure import, not compilation
+    samples = [run_once(args.target) for _ in range(max(1, args.runs))]
+    totals = [s.get(args.target, (0, 0))[1] / 1000.0 for s in samples]
+    median_ms = statistics.median(totals)
+
+    last = samples[-1]
+    print(f"{args.target}: median {median_ms:.0f} ms over {len(totals)} runs (min {min(totals):.0f}, max {max(totals):.0f}); budget {args.budget_ms:.0f} ms")
+    print("heaviest top-level imports (cumulative ms):")
+    top = sorted(((cum, name) for name, (_, cum) in last.items() if "." not in name), reverse=True)
+    for cum, name in top[: args.top]:
+        print(f"  {cum / 1000.0:8.1f}  {name}")
+
+    failed = False
+    eager = [m for m in LAZY_MODULES if m in last]
+    if eager:
+        print(f"FAIL: imported eagerly by {args.target}: {', '.join(eager)}")
+        failed = True
+    if median_ms > args.budget_ms:
+        print(f"FAIL: import time {median_ms:.0f} ms exceeds budget {args.budget_ms:.0f} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,23 +2,39 @@
 import asyncio
 import argparse
 import fcntl
+import json
 import os
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from app.config import settings
-from app.models import Base, Analysis, Watchlist
-from app.services.futures import refresh_signals_cache
-from sqlalchemy import select
+from app.models import Base
 from app.services.locks import LockService
+from app.services.signals_scheduler import SignalsScheduler
 
 try:
     from redis.asyncio import Redis  # type: ignore
 except Exception:  # pragma: no cover
     Redis = None  # type: ignore
 
+LOCK_KEY = "job:futures_refresh"
+LOCK_TTL = 180
+
+
+async def _keep_lock(locks: LockService) -> None:
+    while True:
+        await asyncio.sleep(LOCK_TTL / 3)
+        await locks.extend(LOCK_KEY, ttl=LOCK_TTL)
+
 
 async def main():
-    ap = argparse.ArgumentParser(description="Refresh Futures signals cache for symbols")
+    ap = argparse.ArgumentParser(description="Refresh Futures signals cache for symbols (long-running scheduler)")
     ap.add_argument("--symbols", nargs="*", help="Symbols to refresh (default: all from active analyses & watchlist)")
+    ap.add_argument("--once", action="store_true", help="Run a single cycle over all symbols and exit (cron/timer mode)")
+    ap.add_argument("--tick", type=float, default=float(os.getenv("SIGNALS_TICK_S", "5")), help="Scheduler tick in seconds")
+    ap.add_argument("--interval", type=float, default=float(os.getenv("SIGNALS_BASE_INTERVAL_S", "120")), help="Base per-symbol refresh interval")
+    ap.add_argument("--min-interval", type=float, default=float(os.getenv("SIGNALS_MIN_INTERVAL_S", "30")))
+    ap.add_argument("--max-interval", type=float, default=float(os.getenv("SIGNALS_MAX_INTERVAL_S", "600")))
+    ap.add_argument("--concurrency", type=int, default=int(os.getenv("SIGNALS_CONCURRENCY", "8")))
+    ap.add_argument("--weight-per-min", type=float, default=float(os.getenv("SIGNALS_WEIGHT_PER_MIN", "1200")), help="Binance request-weight budget per minute")
     args = ap.parse_args()
 
     # Try Redis-based distributed lock first
@@ -29,7 +45,7 @@ async def main():
         except Exception:
             rcli = None
     locks = LockService(rcli)
-    got = await locks.acquire("job:futures_refresh", ttl=180)
+    got = await locks.acquire(LOCK_KEY, ttl=LOCK_TTL)
     if not got:
         print("Another futures_refresh is running (redis lock).")
         return
@@ -40,7 +56,7 @@ async def main():
             fcntl.flock(lf, fcntl.LOCK_EX | fcntl.LOCK_NB)
         except BlockingIOError:
             print("Another futures_refresh is running (filelock).")
-            await locks.release("job:futures_refresh")
+            await locks.release(LOCK_KEY)
             return
 
         db_url = getattr(settings, "DATABASE_URL", None) or settings.SQLITE_URL
@@ -54,29 +70,30 @@ async def main():
         async with engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
         Session = async_sessionmaker(engine, expire_on_commit=False)
-        async with Session() as db:
-            symbols = set([s.upper() for s in (args.symbols or [])])
-            if not symbols:
-                # collect from active analyses & watchlist
-                q1 = await db.execute(select(Analysis.symbol).where(Analysis.status == "active"))
-                for (sym,) in q1.all():
-                    symbols.add(sym.upper())
-                try:
-                    q2 = await db.execute(select(Watchlist.symbol))
-                    for (sym,) in q2.all():
-                        symbols.add(sym.upper())
-                except Exception:
-                    pass
-            if not symbols:
-                symbols = {"BTCUSDT"}
-            for sym in sorted(symbols):
-                try:
-                    row = await refresh_signals_cache(db, sym)
-                    print(f"OK refreshed {sym} at {row.created_at}")
-                except Exception as e:
-                    print(f"ERR refreshing {sym}: {e}")
-        # release redis lock
-        await locks.release("job:futures_refresh")
+
+        sched = SignalsScheduler(
+            Session,
+            base_interval_s=args.interval,
+            min_interval_s=args.min_interval,
+            max_interval_s=args.max_interval,
+            concurrency=args.concurrency,
+            weight_per_min=args.weight_per_min,
+        )
+        symbols = {s.upper(): 1 for s in (args.symbols or [])} or None
+        keeper = asyncio.create_task(_keep_lock(locks))
+        try:
+            # one metrics line per cycle: duration, due/refreshed/failed, lag behind schedule
+            await sched.run(
+                tick_s=args.tick,
+                symbols=symbols,
+                on_cycle=lambda m: print(json.dumps({"event": "futures_refresh_cycle", **m}), flush=True),
+                once=args.once,
+            )
+        finally:
+            keeper.cancel()
+            await engine.dispose()
+            # release redis lock
+            await locks.release(LOCK_KEY)
 
 
 if __name__ == "__main__":
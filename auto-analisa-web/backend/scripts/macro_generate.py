@@ -8,6 +8,7 @@ from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from app.config import settings
 from app.models import Base, MacroDaily
 from app.services.llm import ask_llm
+from app.services.http_client import aclose_http
 from sqlalchemy import select
 from app.services.locks import LockService
 
@@ -46,83 +47,87 @@ async def main():
         print("Another macro_generate is running for this slot (redis lock).")
         sys.exit(0)
 
-    lock_path = f"/tmp/autoanalisa_macro_{slot}.lock"
-    with open(lock_path, "w") as lf:
-        try:
-            fcntl.flock(lf, fcntl.LOCK_EX | fcntl.LOCK_NB)
-        except BlockingIOError:
-            print("Another macro_generate is running for this slot (filelock).")
-            await locks.release(f"job:macro:{slot}")
-            sys.exit(0)
-
-        db_url = getattr(settings, "DATABASE_URL", None) or settings.SQLITE_URL
-        kwargs = {"echo": False, "future": True}
-        if db_url.startswith("sqlite+"):
-            kwargs["connect_args"] = {"timeout": 15}
-        else:
-            kwargs["pool_pre_ping"] = True
-            kwargs["pool_recycle"] = 1800
-        engine = create_async_engine(db_url, **kwargs)
-        async with engine.begin() as conn:
-            await conn.run_sync(Base.metadata.create_all)
-        Session = async_sessionmaker(engine, expire_on_commit=False)
-        async with Session() as db:
-            prompt = (
-                "Balas dalam JSON dengan kunci: {date_utc (opsional), summary, "
-                "sections:[{title,bullets:[]}], sources}. Bahasa Indonesia, netral, ringkas. "
-                "Cakup 24-48 jam: DXY, yield riil, likuiditas kripto, ETF/flow, berita utama."
-            )
-            text, _ = ask_llm(prompt)
-
-            # Parse JSON if possible
-            narrative = text
-            sources: str | list | None = ""
-            sections: list | dict | str | None = []
+    try:
+        lock_path = f"/tmp/autoanalisa_macro_{slot}.lock"
+        with open(lock_path, "w") as lf:
             try:
-                parsed = json.loads(text)
-                narrative = parsed.get("summary") or parsed.get("narrative") or narrative
-                sections = parsed.get("sections") or []
-                sources = parsed.get("sources") or ""
-                if isinstance(sections, str):
-                    try:
-                        sections = json.loads(sections)
-                    except Exception:
-                        sections = []
-                if isinstance(sections, dict):
-                    sections = [sections]
-            except Exception:
-                pass
+                fcntl.flock(lf, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                print("Another macro_generate is running for this slot (filelock).")
+                sys.exit(0)
 
-            today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-            q = await db.execute(select(MacroDaily).where(MacroDaily.date_utc == today, MacroDaily.slot == slot))
-            row = q.scalar_one_or_none()
-            def _src_to_text(src):
-                if isinstance(src, list):
-                    try:
-                        return "\n".join(map(str, src))
-                    except Exception:
-                        return "\n".join([str(x) for x in src])
-                return str(src or "")
-
-            if row:
-                row.narrative = narrative
-                row.sources = _src_to_text(sources)
-                try:
-                    row.sections = sections if isinstance(sections, list) else []
-                    row.last_run_status = "ok"
-                except Exception:
-                    pass
+            db_url = getattr(settings, "DATABASE_URL", None) or settings.SQLITE_URL
+            kwargs = {"echo": False, "future": True}
+            if db_url.startswith("sqlite+"):
+                kwargs["connect_args"] = {"timeout": 15}
             else:
-                row = MacroDaily(date_utc=today, slot=slot, narrative=narrative, sources=_src_to_text(sources))
+                kwargs["pool_pre_ping"] = True
+                kwargs["pool_recycle"] = 1800
+            engine = create_async_engine(db_url, **kwargs)
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            Session = async_sessionmaker(engine, expire_on_commit=False)
+            async with Session() as db:
+                prompt = (
+                    "Balas dalam JSON dengan kunci: {date_utc (opsional), summary, "
+                    "sections:[{title,bullets:[]}], sources}. Bahasa Indonesia, netral, ringkas. "
+                    "Cakup 24-48 jam: DXY, yield riil, likuiditas kripto, ETF/flow, berita utama."
+                )
+                # fixed prompt whose answer depends on today's news: never from the response cache
+                text, _ = await ask_llm(prompt, cache=False)
+
+                # Parse JSON if possible
+                narrative = text
+                sources: str | list | None = ""
+                sections: list | dict | str | None = []
                 try:
-                    row.sections = sections if isinstance(sections, list) else []
-                    row.last_run_status = "ok"
+                    parsed = json.loads(text)
+                    narrative = parsed.get("summary") or parsed.get("narrative") or narrative
+                    sections = parsed.get("sections") or []
+                    sources = parsed.get("sources") or ""
+                    if isinstance(sections, str):
+                        try:
+                            sections = json.loads(sections)
+                        except Exception:
+                            sections = []
+                    if isinstance(sections, dict):
+                        sections = [sections]
                 except Exception:
                     pass
-                db.add(row)
-            await db.commit()
-            print(f"OK MacroDaily generated for {today} slot={slot} (sections={len(sections)})")
+
+                today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+                q = await db.execute(select(MacroDaily).where(MacroDaily.date_utc == today, MacroDaily.slot == slot))
+                row = q.scalar_one_or_none()
+                def _src_to_text(src):
+                    if isinstance(src, list):
+                        try:
+                            return "\n".join(map(str, src))
+                        except Exception:
+                            return "\n".join([str(x) for x in src])
+                    return str(src or "")
+
+                if row:
+                    row.narrative = narrative
+                    row.sources = _src_to_text(sources)
+                    try:
+                        row.sections = sections if isinstance(sections, list) else []
+                        row.last_run_status = "ok"
+                    except Exception:
+                        pass
+                else:
+                    row = MacroDaily(date_utc=today, slot=slot, narrative=narrative, sources=_src_to_text(sources))
+                    try:
+                        row.sections = sections if isinstance(sections, list) else []
+                        row.last_run_status = "ok"
+                    except Exception:
+                        pass
+                    db.add(row)
+                await db.commit()
+                print(f"OK MacroDaily generated for {today} slot={slot} (sections={len(sections)})")
+    finally:
+        # release even when the LLM call or the DB write fails
         await locks.release(f"job:macro:{slot}")
+        await aclose_http()
 
 
 if __name__ == "__main__":
@@ -1,7 +1,7 @@
 import time
-import types
 
 from app.services import symbols_binance as sb
+from app.services.market_meta import MarketMetaService
 
 
 def test_get_symbols_cache(monkeypatch):
@@ -16,7 +16,9 @@ def test_get_symbols_cache(monkeypatch):
                 "BTCUSDT": {"future": True},
             }
 
-    monkeypatch.setattr(sb, "ccxt", types.SimpleNamespace(binance=lambda cfg=None: DummyExchange()))
+    meta = MarketMetaService(path=None)
+    monkeypatch.setattr(meta, "_exchange", lambda: DummyExchange())
+    monkeypatch.setattr(sb, "META", meta)
     sb._state = {"ts": 0.0, "spot": [], "futures": []}
 
     spot = sb.get_symbols("spot")
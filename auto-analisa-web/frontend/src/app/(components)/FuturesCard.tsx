@@ -3,6 +3,7 @@
 import { useCallback, useEffect, useMemo, useState } from "react"
 import { api } from "../../app/api"
 import ChartOHLCV from "./ChartOHLCV"
+import { fetchOhlcv } from "../../lib/ohlcv"
 import { GptReportBox } from "./LLMReport"
 
 import type { AxiosError } from "axios"
@@ -114,7 +115,7 @@ export default function FuturesCard({ symbol, llmEnabled, llmRemaining, onRefres
     async function loadOhlcv() {
       try {
         setLoadingOhlcv(true)
-        const { data } = await api.get("ohlcv", { params: { symbol, tf, limit: 200, market: "futures" } })
+        const data = await fetchOhlcv({ symbol, tf, limit: 200, market: "futures" })
         if (!cancelled) setOhlcv(data)
       } catch (e) {
         if (!cancelled) setOhlcv([])
@@ -261,13 +262,13 @@ export default function FuturesCard({ symbol, llmEnabled, llmRemaining, onRefres
       }
       if (tf !== "15m") {
         try {
-          const { data } = await api.get("ohlcv", { params: { symbol, tf: "15m", limit: 200, market: "futures" } })
+          const data = await fetchOhlcv({ symbol, tf: "15m", limit: 200, market: "futures" })
           payload.ohlcv15m = data
         } catch {}
       }
       if (mode === "scalping") {
         try {
-          const { data } = await api.get("ohlcv", { params: { symbol, tf: "5m", limit: 200, market: "futures" } })
+          const data = await fetchOhlcv({ symbol, tf: "5m", limit: 200, market: "futures" })
           payload.ohlcv5m = data
         } catch {}
       }
@@ -5,6 +5,7 @@ import ChartOHLCV from './ChartOHLCV'
 import LLMReport from './LLMReport'
 import Spot2View from './Spot2View'
 import { getSymbolMeta } from '../../lib/meta'
+import { fetchOhlcv } from '../../lib/ohlcv'
 
 export default function PlanCard({plan, onUpdate, llmEnabled, llmRemaining, onAfterVerify}:{plan:any,onUpdate:()=>void, llmEnabled?:boolean, llmRemaining?:number, onAfterVerify?:()=>void}){
   const p=plan.payload
@@ -52,7 +53,7 @@ export default function PlanCard({plan, onUpdate, llmEnabled, llmRemaining, onAf
     setTf(t)
   },[tab])
   useEffect(()=>{ (async()=>{
-    try{ setLoading(true); const {data}=await api.get('ohlcv', { params:{ symbol:plan.symbol, tf, limit:200, market: 'spot' } }); setOhlcv(data) }catch{} finally{ setLoading(false) }
+    try{ setLoading(true); const data=await fetchOhlcv({ symbol:plan.symbol, tf, limit:200, market: 'spot' }); setOhlcv(data) }catch{} finally{ setLoading(false) }
   })() },[tf, plan.symbol])
   const invalids = useMemo(()=>{
     const s2 = p?.spot2 || {}
@@ -15,10 +15,13 @@ export default function Spark({ symbol, tf, mode, kind='close', limit=200 }: { s
     let alive = true
     async function run(){
       try{
-        const r = await api.get('/spark', { params: { symbol, tf, mode, kind, limit } })
-        const data = Array.isArray(r?.data?.data) ? r.data.data : []
+        const r = await api.get('/spark', { params: { symbol, tf, mode, kind, limit, shape: 'columns' } })
+        const cols = r?.data?.data || {}
+        const ts: any[] = Array.isArray(cols.ts) ? cols.ts : []
+        const close: any[] = Array.isArray(cols.close) ? cols.close : []
+        const st: any[] = Array.isArray(cols.st_line) ? cols.st_line : []
         if (!alive) return
-        const mapped = data.map((d:any)=>({ ts: String(d.ts||''), close: Number(d.close||0), st_line: Number(d.st_line||0) }))
+        const mapped = ts.map((t:any, i:number)=>({ ts: String(t||''), close: Number(close[i]||0), st_line: Number(st[i]||0) }))
         setRows(mapped)
       }catch(e:any){ if(alive) setErr('load fail') }
     }
@@ -0,0 +1,34 @@
+import { api } from "./http";
+
+// Compact OHLCV loader: requests the raw little-endian float64 column format
+// from /api/ohlcv (shape=f64) and rebuilds the legacy {t,o,h,l,c,v}[] rows.
+
+export type OhlcvRow = { t: number, o: number, h: number, l: number, c: number, v: number }
+
+const MAGIC = "AAF1"
+
+export function decodeF64(buf: ArrayBuffer): Record<string, Float64Array> {
+  const view = new DataView(buf)
+  const magic = String.fromCharCode(view.getUint8(0), view.getUint8(1), view.getUint8(2), view.getUint8(3))
+  if (magic !== MAGIC) throw new Error("bad f64 payload")
+  const n = view.getUint32(4, true)
+  const k = view.getUint16(8, true)
+  const nl = view.getUint16(10, true)
+  const names = k ? new TextDecoder().decode(new Uint8Array(buf, 12, nl)).split(",") : []
+  let off = 12 + nl
+  off += (8 - (off % 8)) % 8
+  const out: Record<string, Float64Array> = {}
+  names.forEach((name, i) => { out[name] = new Float64Array(buf, off + i * n * 8, n) })
+  return out
+}
+
+export async function fetchOhlcv(params: { symbol: string, tf: string, limit?: number, market?: string }): Promise<OhlcvRow[]> {
+  const { data } = await api.get("ohlcv", { params: { limit: 200, ...params, shape: "f64" }, responseType: "arraybuffer" })
+  const cols = decodeF64(data as ArrayBuffer)
+  const t = cols.t || new Float64Array(0)
+  const rows: OhlcvRow[] = new Array(t.length)
+  for (let i = 0; i < t.length; i++) {
+    rows[i] = { t: t[i], o: cols.o[i], h: cols.h[i], l: cols.l[i], c: cols.c[i], v: cols.v[i] }
+  }
+  return rows
+}
@@ -298,7 +298,7 @@ WorkingDirectory=$PROJECT_DIR/backend
 Environment=APP_ENV=prod
 Environment=PYBIN=$PROJECT_DIR/backend/.venv/bin/python
 EnvironmentFile=$PROJECT_DIR/.env
-ExecStart=/bin/bash -lc 'PY=${PYBIN}; if [ ! -x "$PY" ]; then PY=$(command -v python3); fi; export PYTHONPATH=$PWD; exec "$PY" scripts/futures_refresh.py'
+ExecStart=/bin/bash -lc 'PY=${PYBIN}; if [ ! -x "$PY" ]; then PY=$(command -v python3); fi; export PYTHONPATH=$PWD; exec "$PY" scripts/futures_refresh.py --once'
 User=$RUN_USER
 Group=$RUN_USER
 
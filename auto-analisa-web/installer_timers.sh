@@ -112,7 +112,7 @@ WorkingDirectory=$BACK_DIR
 Environment=APP_ENV=prod
 $( [[ -n "$ENV_FILE" ]] && echo "EnvironmentFile=$ENV_FILE" )
 Environment=PYBIN=$PYBIN
-ExecStart=/bin/bash -lc 'PY=${PYBIN}; if [ ! -x "\$PY" ]; then PY=\$(command -v python3); fi; export PYTHONPATH=\$PWD; exec "\$PY" scripts/futures_refresh.py'
+ExecStart=/bin/bash -lc 'PY=${PYBIN}; if [ ! -x "\$PY" ]; then PY=\$(command -v python3); fi; export PYTHONPATH=\$PWD; exec "\$PY" scripts/futures_refresh.py --once'
 User=$RUN_USER
 Group=$RUN_USER
 